@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+import sys
+import tempfile
+from pathlib import Path
+from time import perf_counter
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from core.crypto.authentication import AuthenticationService  # noqa: E402
+from core.crypto.placeholder import AES256Placeholder  # noqa: E402
+from core.key_manager import KeyManager  # noqa: E402
+from core.state_manager import StateManager  # noqa: E402
+from core.vault.async_vault import AsyncVault  # noqa: E402
+from database.db import Database  # noqa: E402
+from database.repositories import VaultRepository  # noqa: E402
+
+
+async def heartbeat(stop: asyncio.Event, lags: list[float], period: float = 0.001) -> None:
+    # Задержка пробуждения показывает, насколько event loop занят чужой работой.
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        expected = loop.time() + period
+        await asyncio.sleep(period)
+        lags.append(max(0.0, loop.time() - expected))
+
+
+async def run_readers(call, readers: int, reads: int, ids: list[int]) -> tuple[float, list[float]]:
+    stop = asyncio.Event()
+    lags: list[float] = []
+    beat = asyncio.create_task(heartbeat(stop, lags))
+
+    async def reader(seed: int) -> None:
+        rng = random.Random(seed)
+        for step in range(reads):
+            if step % 5 == 4:
+                await call("page", 50)
+            else:
+                await call("get", rng.choice(ids))
+
+    started = perf_counter()
+    await asyncio.gather(*(reader(seed) for seed in range(readers)))
+    elapsed = perf_counter() - started
+    stop.set()
+    await beat
+    return elapsed, sorted(lags)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Много одновременных читателей через AsyncVault и блокирующие вызовы.")
+    parser.add_argument("--entries", type=int, default=5000)
+    parser.add_argument("--readers", type=int, nargs="+", default=[10, 100, 500])
+    parser.add_argument("--reads", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(Path(tmp) / "vault.db")
+        db.connect()
+        key_manager = KeyManager(db)
+        auth = AuthenticationService(key_manager=key_manager, state=StateManager())
+        auth.setup_master_password("UltraSafeA1!Key", username="bench")
+        vault = VaultRepository(db=db, crypto=AES256Placeholder(key_manager))
+        ids = vault.add_many(
+            [{"title": f"title-{index}", "password": f"StrongPassA1!{index}"} for index in range(args.entries)],
+            chunk_size=5000,
+        )
+        facade = AsyncVault(vault)
+
+        async def blocking(kind: str, value: int):
+            # Так выглядит прямой вызов синхронного API из корутины.
+            return vault.get_by_id(value) if kind == "get" else vault.list_page(value)
+
+        async def offloaded(kind: str, value: int):
+            return await (facade.get_by_id(value) if kind == "get" else facade.list_page(value))
+
+        for readers in args.readers:
+            for name, call in (("blocking", blocking), ("AsyncVault", offloaded)):
+                elapsed, lags = asyncio.run(run_readers(call, readers, args.reads, ids))
+                total = readers * args.reads
+                p99 = lags[int(len(lags) * 0.99)] if lags else 0.0
+                worst = lags[-1] if lags else 0.0
+                print(
+                    f"readers={readers:<4} {name:<10} ops/s={total / elapsed:8.0f} "
+                    f"loop_lag_p99={p99 * 1000:7.2f} ms loop_lag_max={worst * 1000:7.2f} ms heartbeats={len(lags)}"
+                )
+        facade.close()
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
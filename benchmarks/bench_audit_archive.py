@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import argparse
+import sys
+import tempfile
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from time import perf_counter
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from database.audit_archive import AuditArchive  # noqa: E402
+from database.db import Database  # noqa: E402
+from database.repositories import AuditRepository  # noqa: E402
+
+
+def timed(fn, repeat: int = 1):
+    started = perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return result, (perf_counter() - started) / repeat * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Ротация audit_log в сегменты и выборка по времени.")
+    parser.add_argument("--rows", type=int, default=500000)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--keep-rows", type=int, default=50000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(Path(tmp) / "vault.db")
+        db.connect()
+        audit_repo = AuditRepository(db)
+        now = datetime.now(timezone.utc)
+        step = timedelta(days=args.days) / args.rows
+        batch = 10000
+        for start in range(0, args.rows, batch):
+            audit_repo.write_many(
+                [
+                    (
+                        "EntryUpdated",
+                        (now - step * (args.rows - index)).isoformat(timespec="seconds"),
+                        index,
+                        {"entry_id": index, "title": f"title-{index}"},
+                    )
+                    for index in range(start, min(start + batch, args.rows))
+                ]
+            )
+        archive = AuditArchive(db)
+        day_from = (now - timedelta(days=args.days // 2)).isoformat(timespec="seconds")
+        day_to = (now - timedelta(days=args.days // 2 - 1)).isoformat(timespec="seconds")
+        db_size = lambda: db.db_path.stat().st_size / 2**20  # noqa: E731
+
+        _, last_ms = timed(lambda: audit_repo.last(50), repeat=50)
+        old_day, old_day_ms = timed(lambda: archive.query(day_from, day_to), repeat=5)
+        print(f"before: rows={args.rows} db={db_size():.1f} MiB last(50)={last_ms:.3f} ms one_day={old_day_ms:.1f} ms ({len(old_day)} rows)")
+
+        segments, rotate_ms = timed(lambda: archive.rotate(keep_rows=args.keep_rows, max_age_days=args.days * 2))
+        archived = sum(segment.size for segment in segments) / 2**20
+        print(
+            f"rotate: {sum(segment.rows for segment in segments)} rows into {len(segments)} segments "
+            f"({archived:.1f} MiB gzip) in {rotate_ms:.0f} ms"
+        )
+
+        _, last_ms = timed(lambda: audit_repo.last(50), repeat=50)
+        day, day_ms = timed(lambda: archive.query(day_from, day_to), repeat=5)
+        opened = len(archive.segments_between(day_from, day_to))
+        recent_from = (now - timedelta(days=1)).isoformat(timespec="seconds")
+        recent, recent_ms = timed(lambda: archive.query(recent_from), repeat=5)
+        print(
+            f"after:  last(50)={last_ms:.3f} ms one_day(archived)={day_ms:.1f} ms ({len(day)} rows, {opened} segment) "
+            f"one_day(live)={recent_ms:.1f} ms ({len(recent)} rows)"
+        )
+        assert [record.id for record in day] == [record.id for record in old_day]
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import argparse
+import sys
+import tempfile
+from pathlib import Path
+from time import perf_counter
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from core.audit_logger import AuditLogger  # noqa: E402
+from core.audit_writer import BufferedAuditWriter  # noqa: E402
+from core.crypto.authentication import AuthenticationService  # noqa: E402
+from core.crypto.placeholder import AES256Placeholder  # noqa: E402
+from core.events import EventBus  # noqa: E402
+from core.key_manager import KeyManager  # noqa: E402
+from core.state_manager import StateManager  # noqa: E402
+from database.db import Database  # noqa: E402
+from database.repositories import AuditRepository, VaultRepository  # noqa: E402
+
+
+def run(entries: int, buffered: bool, max_batch: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(Path(tmp) / "vault.db")
+        db.connect()
+        key_manager = KeyManager(db)
+        auth = AuthenticationService(key_manager=key_manager, state=StateManager())
+        auth.setup_master_password("UltraSafeA1!Key", username="bench")
+        bus = EventBus()
+        audit_repo = AuditRepository(db)
+        writer = BufferedAuditWriter(audit_repo, max_batch=max_batch) if buffered else None
+        if writer is not None:
+            writer.start()
+        AuditLogger(bus, writer or audit_repo).start()
+        vault = VaultRepository(db=db, crypto=AES256Placeholder(key_manager), bus=bus)
+
+        latencies = []
+        started = perf_counter()
+        for index in range(entries):
+            op_started = perf_counter()
+            vault.add(title=f"title-{index}", username="bench", password=f"StrongPassA1!{index}")
+            latencies.append(perf_counter() - op_started)
+        elapsed = perf_counter() - started
+        stop_started = perf_counter()
+        if writer is not None:
+            writer.stop()
+        stop_ms = (perf_counter() - stop_started) * 1000
+        with db.read_session() as conn:
+            audited = conn.execute("SELECT COUNT(*) FROM audit_log").fetchone()[0]
+
+        latencies.sort()
+        label = f"buffered(max_batch={max_batch})" if buffered else "synchronous"
+        line = (
+            f"{label:<24} adds/s={entries / elapsed:7.0f} p50={latencies[len(latencies) // 2] * 1000:6.3f} ms "
+            f"p99={latencies[int(len(latencies) * 0.99)] * 1000:6.3f} ms audit_rows={audited}"
+        )
+        if writer is not None:
+            stats = writer.stats()
+            line += (
+                f" batches={stats.batches} flush_mean={stats.flush_latency.mean_ms:.2f} ms"
+                f" final_flush={stop_ms:.1f} ms"
+            )
+        print(line)
+        bus.shutdown()
+        db.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Создание записей с синхронным и отложенным аудитом.")
+    parser.add_argument("--entries", type=int, default=3000)
+    parser.add_argument("--max-batch", type=int, default=256)
+    args = parser.parse_args()
+    run(args.entries, buffered=False, max_batch=args.max_batch)
+    run(args.entries, buffered=True, max_batch=args.max_batch)
+
+
+if __name__ == "__main__":
+    main()
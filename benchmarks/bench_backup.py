@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+from pathlib import Path
+from time import perf_counter, sleep
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from database.db import Database  # noqa: E402
+
+
+def fill_vault(db: Database, entries: int, blob_size: int) -> None:
+    # Синтетические строки: шифротексты заменены случайными байтами той же длины.
+    batch = 5000
+    for start in range(0, entries, batch):
+        rows = [
+            (os.urandom(blob_size), os.urandom(blob_size // 4), "2024-01-01T00:00:00+00:00", "2024-01-01T00:00:00+00:00", "")
+            for _ in range(min(batch, entries - start))
+        ]
+        with db.session() as conn:
+            conn.executemany(
+                """
+                INSERT INTO vault_entries (encrypted_data, encrypted_secret, created_at, updated_at, tags)
+                VALUES (?, ?, ?, ?, ?)
+                """,
+                rows,
+            )
+
+
+def measure_backup(db: Database, target: Path, pages_per_step: int, sleep_sec: float) -> tuple[float, list[float]]:
+    # Параллельный писатель коммитит маленькие транзакции, пока идет копия.
+    latencies: list[float] = []
+    done = threading.Event()
+
+    def writer() -> None:
+        while not done.is_set():
+            started = perf_counter()
+            with db.session() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO settings (setting_key, setting_value, encrypted) VALUES ('bench', ?, 0)",
+                    (str(started),),
+                )
+            latencies.append(perf_counter() - started)
+            sleep(0.002)
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    started = perf_counter()
+    try:
+        db.backup(target, pages_per_step=pages_per_step, sleep_sec=sleep_sec)
+    finally:
+        elapsed = perf_counter() - started
+        done.set()
+        thread.join()
+    return elapsed, latencies
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Онлайн-backup и restore большой синтетической базы.")
+    parser.add_argument("--entries", type=int, default=200000)
+    parser.add_argument("--blob-size", type=int, default=600)
+    parser.add_argument("--pages-per-step", type=int, nargs="+", default=[64, 1024, 16384])
+    parser.add_argument("--sleep", type=float, default=0.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(Path(tmp) / "vault.db")
+        db.connect()
+        fill_vault(db, args.entries, args.blob_size)
+        size_mb = (Path(tmp) / "vault.db").stat().st_size / 1024 / 1024
+        print(f"entries={args.entries} db_size={size_mb:.1f} MiB sleep={args.sleep}")
+
+        backup_path = Path(tmp) / "vault.bak"
+        for pages in args.pages_per_step:
+            elapsed, latencies = measure_backup(db, backup_path, pages, args.sleep)
+            latencies.sort()
+            p50 = latencies[len(latencies) // 2] if latencies else 0.0
+            worst = latencies[-1] if latencies else 0.0
+            print(
+                f"backup pages_per_step={pages:<6} total={elapsed * 1000:8.1f} ms "
+                f"MiB/s={size_mb / elapsed:7.1f} writer_commits={len(latencies):<5} "
+                f"writer_p50={p50 * 1000:6.2f} ms writer_max={worst * 1000:7.2f} ms"
+            )
+
+        started = perf_counter()
+        db.restore(backup_path)
+        print(f"restore total={(perf_counter() - started) * 1000:8.1f} ms")
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
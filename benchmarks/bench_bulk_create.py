@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import argparse
+import sys
+import tempfile
+from pathlib import Path
+from time import perf_counter
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from core.audit_logger import AuditLogger  # noqa: E402
+from core.crypto.authentication import AuthenticationService  # noqa: E402
+from core.crypto.placeholder import AES256Placeholder  # noqa: E402
+from core.events import EventBus  # noqa: E402
+from core.key_manager import KeyManager  # noqa: E402
+from core.state_manager import StateManager  # noqa: E402
+from database.db import Database  # noqa: E402
+from database.repositories import AuditRepository, VaultRepository  # noqa: E402
+
+
+def make_items(count: int) -> list[dict]:
+    return [
+        {
+            "title": f"title-{index}",
+            "username": f"user-{index}@example.com",
+            "password": f"StrongPassA1!{index}",
+            "url": f"https://example{index}.com/login",
+            "notes": "note " * 10,
+            "tags": "import,bench",
+        }
+        for index in range(count)
+    ]
+
+
+def open_vault(path: Path) -> tuple[Database, EventBus, VaultRepository]:
+    db = Database(path)
+    db.connect()
+    key_manager = KeyManager(db)
+    auth = AuthenticationService(key_manager=key_manager, state=StateManager())
+    auth.setup_master_password("UltraSafeA1!Key", username="bench")
+    bus = EventBus()
+    AuditLogger(bus, AuditRepository(db)).start()
+    return db, bus, VaultRepository(db=db, crypto=AES256Placeholder(key_manager), bus=bus)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Пакетное создание записей против create_entry по одной.")
+    parser.add_argument("--entries", type=int, default=5000)
+    parser.add_argument("--chunk-size", type=int, default=0, help="0 - одна транзакция на весь вызов")
+    args = parser.parse_args()
+
+    items = make_items(args.entries)
+    with tempfile.TemporaryDirectory() as tmp:
+        db, bus, vault = open_vault(Path(tmp) / "single.db")
+        started = perf_counter()
+        for item in items:
+            vault.entry_manager.create_entry(item)
+        single = perf_counter() - started
+        bus.shutdown()
+        db.close()
+
+        db, bus, vault = open_vault(Path(tmp) / "bulk.db")
+        started = perf_counter()
+        vault.add_many(items, chunk_size=args.chunk_size or None)
+        bulk = perf_counter() - started
+        bus.shutdown()
+        db.close()
+
+    print(f"entries={args.entries} chunk_size={args.chunk_size or 'all'}")
+    print(f"create_entry   total={single * 1000:9.1f} ms rows/s={args.entries / single:10.0f}")
+    print(f"create_entries total={bulk * 1000:9.1f} ms rows/s={args.entries / bulk:10.0f} speedup={single / bulk:5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
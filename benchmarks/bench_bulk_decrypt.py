@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+from pathlib import Path
+from time import perf_counter
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from core.vault.encryption_service import VaultEncryptionService  # noqa: E402
+
+
+def make_values(service: VaultEncryptionService, key: bytes, count: int) -> list[bytes]:
+    payloads = [
+        {
+            "title": f"title-{index}",
+            "username": f"user-{index}@example.com",
+            "url": f"https://example{index}.com/login",
+            "notes": "note " * 20,
+            "category": "Work",
+            "version": 1,
+            "created_at": "2024-01-01T00:00:00+00:00",
+        }
+        for index in range(count)
+    ]
+    return service.encrypt_many(payloads, key, max_workers=1)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Масштабирование VaultEncryptionService.decrypt_many по потокам.")
+    parser.add_argument("--entries", type=int, default=50000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    key = os.urandom(32)
+    values = make_values(VaultEncryptionService(max_workers=1), key, args.entries)
+    print(f"entries={args.entries} cpu_count={os.cpu_count()}")
+
+    baseline = 0.0
+    for workers in args.workers:
+        service = VaultEncryptionService(max_workers=workers)
+        best = float("inf")
+        for _ in range(args.repeat):
+            started = perf_counter()
+            results = service.decrypt_many(values, key)
+            best = min(best, perf_counter() - started)
+        service.shutdown()
+        assert all(result.ok for result in results)
+        baseline = baseline or best
+        print(
+            f"workers={workers:<2} best={best * 1000:8.1f} ms "
+            f"rows/s={args.entries / best:10.0f} speedup={baseline / best:4.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import tempfile
+from pathlib import Path
+from time import perf_counter
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from core.crypto.authentication import AuthenticationService  # noqa: E402
+from core.crypto.placeholder import AES256Placeholder  # noqa: E402
+from core.key_manager import KeyManager  # noqa: E402
+from core.state_manager import StateManager  # noqa: E402
+from core.vault.exporter import VaultArchiveReader, VaultExporter  # noqa: E402
+from database.db import Database  # noqa: E402
+from database.repositories import VaultRepository  # noqa: E402
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Пропускная способность зашифрованного экспорта по числу потоков.")
+    parser.add_argument("--entries", type=int, default=20000)
+    parser.add_argument("--chunk-entries", type=int, default=500)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(Path(tmp) / "vault.db")
+        db.connect()
+        key_manager = KeyManager(db)
+        auth = AuthenticationService(key_manager=key_manager, state=StateManager())
+        auth.setup_master_password("UltraSafeA1!Key", username="bench")
+        vault = VaultRepository(db=db, crypto=AES256Placeholder(key_manager))
+        vault.add_many(
+            [
+                {
+                    "title": f"title-{index}",
+                    "username": f"user-{index}@example.com",
+                    "password": f"StrongPassA1!{index}",
+                    "url": f"https://example{index}.com/login",
+                    "notes": "note " * 40,
+                }
+                for index in range(args.entries)
+            ],
+            chunk_size=5000,
+        )
+        print(f"entries={args.entries} chunk_entries={args.chunk_entries} cpu_count={os.cpu_count()}")
+
+        archive_path = Path(tmp) / "export.csvx"
+        baseline = 0.0
+        for workers in args.workers:
+            exporter = VaultExporter(vault.entry_manager, chunk_entries=args.chunk_entries, max_workers=workers)
+            started = perf_counter()
+            report = exporter.export_to(archive_path, "bench passphrase")
+            elapsed = perf_counter() - started
+            baseline = baseline or elapsed
+            print(
+                f"workers={workers:<2} export={elapsed * 1000:8.1f} ms rows/s={report.entries / elapsed:9.0f} "
+                f"speedup={baseline / elapsed:4.2f}x size={report.bytes_written / 1024:8.0f} KiB"
+            )
+
+        started = perf_counter()
+        verification = VaultArchiveReader().verify(archive_path, "bench passphrase")
+        assert verification.ok
+        print(f"verify={(perf_counter() - started) * 1000:8.1f} ms")
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
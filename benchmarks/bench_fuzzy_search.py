@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import argparse
+import random
+import string
+import sys
+from pathlib import Path
+from time import perf_counter
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from core.vault.search_index import FuzzyTokenIndex  # noqa: E402
+
+
+def random_word(rng: random.Random) -> str:
+    return "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(4, 10)))
+
+
+def make_texts(count: int, seed: int) -> list[str]:
+    rng = random.Random(seed)
+    vocabulary = [random_word(rng) for _ in range(5000)]
+    return [
+        " ".join(
+            [
+                f"{rng.choice(vocabulary)} {rng.choice(vocabulary)}",
+                f"user{index}@example.com",
+                f"https://{rng.choice(vocabulary)}.com/login",
+                " ".join(rng.choice(vocabulary) for _ in range(6)),
+            ]
+        )
+        for index in range(count)
+    ]
+
+
+def typo(word: str, rng: random.Random) -> str:
+    position = rng.randint(1, len(word) - 1)
+    return word[:position] + word[position + 1 :]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Fuzzy-поиск: индекс токенов против полного прохода difflib.")
+    parser.add_argument("--entries", type=int, default=50000)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--scan-queries", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    texts = make_texts(args.entries, seed=1)
+    queries = [typo(rng.choice(texts).split()[0], rng) for _ in range(args.queries)]
+    queries = [query for query in queries if len(query) >= FuzzyTokenIndex.min_query_length]
+
+    index = FuzzyTokenIndex()
+    started = perf_counter()
+    index.build(enumerate(texts))
+    print(f"entries={args.entries} tokens={len(index.token_entries)} build={perf_counter() - started:.2f} s")
+
+    started = perf_counter()
+    results = [index.matching_entry_ids(query) for query in queries]
+    cold = (perf_counter() - started) / len(queries)
+    started = perf_counter()
+    for query in queries:
+        index.matching_entry_ids(query)
+    warm = (perf_counter() - started) / len(queries)
+    print(f"index    cold={cold * 1000:8.2f} ms/query warm={warm * 1000:8.3f} ms/query")
+
+    def scan(query: str) -> set[int]:
+        return {
+            entry_id
+            for entry_id, text in enumerate(texts)
+            if query not in text and any(index.token_matches(token, query) for token in index.split_tokens(text))
+        }
+
+    started = perf_counter()
+    for query, expected in zip(queries[: args.scan_queries], results):
+        assert {entry_id for entry_id in expected if query not in texts[entry_id]} == scan(query)
+    full = (perf_counter() - started) / max(1, min(args.scan_queries, len(queries)))
+    print(f"scan     {full * 1000:8.2f} ms/query")
+
+
+if __name__ == "__main__":
+    main()
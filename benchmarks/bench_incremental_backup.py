@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+from pathlib import Path
+from time import perf_counter
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from database.backup_chain import BackupChain  # noqa: E402
+from database.db import Database, now_iso  # noqa: E402
+
+
+def fill_vault(db: Database, entries: int, blob_size: int) -> None:
+    # Синтетические строки: шифротексты заменены случайными байтами той же длины.
+    batch = 5000
+    for start in range(0, entries, batch):
+        rows = [
+            (os.urandom(blob_size), os.urandom(blob_size // 4), "2024-01-01T00:00:00+00:00", "2024-01-01T00:00:00+00:00", "")
+            for _ in range(min(batch, entries - start))
+        ]
+        with db.session() as conn:
+            conn.executemany(
+                """
+                INSERT INTO vault_entries (encrypted_data, encrypted_secret, created_at, updated_at, tags)
+                VALUES (?, ?, ?, ?, ?)
+                """,
+                rows,
+            )
+
+
+def churn(db: Database, entries: int, changed: int, blob_size: int) -> None:
+    # Изменения как у EntryManager: новый шифротекст и свежий updated_at.
+    stamp = now_iso()
+    ids = random.sample(range(1, entries + 1), changed)
+    with db.session() as conn:
+        conn.executemany(
+            "UPDATE vault_entries SET encrypted_data = ?, updated_at = ? WHERE id = ?",
+            [(os.urandom(blob_size), stamp, entry_id) for entry_id in ids],
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Полная копия против инкремента при малом числе изменений.")
+    parser.add_argument("--entries", type=int, default=200000)
+    parser.add_argument("--blob-size", type=int, default=600)
+    parser.add_argument("--changed", type=int, nargs="+", default=[10, 100, 1000, 10000])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(Path(tmp) / "vault.db")
+        db.connect()
+        fill_vault(db, args.entries, args.blob_size)
+        chain = BackupChain(db, Path(tmp) / "chain")
+        # Синтетические строки датированы прошлым, окно перекрытия им не мешает.
+        started = perf_counter()
+        base = chain.create_base()
+        full_elapsed = perf_counter() - started
+        print(f"entries={args.entries} full={full_elapsed * 1000:8.1f} ms size={base.size / 1024:9.0f} KiB")
+
+        for changed in args.changed:
+            churn(db, args.entries, changed, args.blob_size)
+            started = perf_counter()
+            step = chain.create_increment()
+            elapsed = perf_counter() - started
+            print(
+                f"changed={changed:<6} incremental={elapsed * 1000:8.1f} ms size={step.size / 1024:9.0f} KiB "
+                f"rows={step.changed_entries:<6} vs_full_time={elapsed / full_elapsed:6.3f} "
+                f"vs_full_size={step.size / base.size:6.3f}"
+            )
+
+        started = perf_counter()
+        chain.restore()
+        print(f"restore chain steps={len(chain.steps())} total={(perf_counter() - started) * 1000:8.1f} ms")
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
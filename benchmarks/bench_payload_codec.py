@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+from pathlib import Path
+from time import perf_counter
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM  # noqa: E402
+
+from core.vault.encryption_service import VaultEncryptionService  # noqa: E402
+
+
+def make_payloads(count: int) -> list[dict]:
+    return [
+        {
+            "title": f"title-{index}",
+            "username": f"user-{index}@example.com",
+            "url": f"https://example{index}.com/login",
+            "notes": "note " * 20,
+            "category": "Work",
+            "version": 1,
+            "created_at": "2024-01-01T00:00:00+00:00",
+        }
+        for index in range(count)
+    ]
+
+
+def best_of(repeat: int, action) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = perf_counter()
+        action()
+        best = min(best, perf_counter() - started)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Компактный кодек полезной нагрузки против JSON.")
+    parser.add_argument("--entries", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    service = VaultEncryptionService(max_workers=1)
+    cipher = AESGCM(os.urandom(32))
+    nonce = os.urandom(service.nonce_size)
+    payloads = make_payloads(args.entries)
+    codecs = {
+        "json": (service.serialize_json_payload, service.deserialize_json_payload),
+        "compact": (service.serialize_payload, service.codec.decode),
+    }
+    print(f"entries={args.entries}")
+
+    for name, (encode, decode) in codecs.items():
+        encoded = [encode(payload) for payload in payloads]
+        ciphertexts = [nonce + cipher.encrypt(nonce, plaintext, None) for plaintext in encoded]
+        encode_time = best_of(args.repeat, lambda: [encode(payload) for payload in payloads])
+        decode_time = best_of(args.repeat, lambda: [decode(plaintext) for plaintext in encoded])
+        decrypt_time = best_of(
+            args.repeat,
+            lambda: [service.decrypt_with_cipher(cipher, value) for value in ciphertexts],
+        )
+        assert [service.decrypt_with_cipher(cipher, value) for value in ciphertexts[:10]] == payloads[:10]
+        size = sum(len(value) for value in ciphertexts)
+        print(
+            f"{name:<8} encode={encode_time * 1000:7.1f} ms decode={decode_time * 1000:7.1f} ms "
+            f"decrypt={decrypt_time * 1000:7.1f} ms ciphertext={size / args.entries:6.1f} B/entry"
+        )
+
+
+if __name__ == "__main__":
+    main()
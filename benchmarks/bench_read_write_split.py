@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+from pathlib import Path
+from time import perf_counter, sleep
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from database.db import Database  # noqa: E402
+
+
+def fill_vault(db: Database, entries: int, blob_size: int) -> None:
+    # Синтетические строки: шифротексты заменены случайными байтами той же длины.
+    batch = 5000
+    for start in range(0, entries, batch):
+        rows = [
+            (os.urandom(blob_size), os.urandom(blob_size // 4), "2024-01-01T00:00:00+00:00", "2024-01-01T00:00:00+00:00", "")
+            for _ in range(min(batch, entries - start))
+        ]
+        with db.session() as conn:
+            conn.executemany(
+                """
+                INSERT INTO vault_entries (encrypted_data, encrypted_secret, created_at, updated_at, tags)
+                VALUES (?, ?, ?, ?, ?)
+                """,
+                rows,
+            )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Задержка сохранения записи при параллельных долгих чтениях.")
+    parser.add_argument("--entries", type=int, default=50000)
+    parser.add_argument("--blob-size", type=int, default=600)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writes", type=int, default=300)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(Path(tmp) / "vault.db")
+        db.connect()
+        fill_vault(db, args.entries, args.blob_size)
+        done = threading.Event()
+        scans = [0] * args.readers
+
+        def reader(slot: int) -> None:
+            # Как экспорт или полный поиск: курсор по всей таблице, пачками.
+            while not done.is_set():
+                with db.read_session() as conn:
+                    cursor = conn.execute("SELECT id, encrypted_data FROM vault_entries ORDER BY updated_at DESC, id DESC")
+                    while cursor.fetchmany(500):
+                        if done.is_set():
+                            break
+                scans[slot] += 1
+
+        threads = [threading.Thread(target=reader, args=(slot,)) for slot in range(args.readers)]
+        for thread in threads:
+            thread.start()
+        latencies: list[float] = []
+        started_all = perf_counter()
+        for index in range(args.writes):
+            started = perf_counter()
+            with db.session() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO settings (setting_key, setting_value, encrypted) VALUES ('bench', ?, 0)",
+                    (str(index),),
+                )
+            latencies.append(perf_counter() - started)
+            sleep(0.005)
+        elapsed = perf_counter() - started_all
+        done.set()
+        for thread in threads:
+            thread.join()
+
+        latencies.sort()
+        print(
+            f"entries={args.entries} readers={args.readers} writes={args.writes} "
+            f"write_p50={latencies[len(latencies) // 2] * 1000:7.2f} ms "
+            f"write_p99={latencies[int(len(latencies) * 0.99)] * 1000:7.2f} ms "
+            f"write_max={latencies[-1] * 1000:7.2f} ms "
+            f"full_scans={sum(scans)} in {elapsed:5.1f} s"
+        )
+        stats = db.pool_stats()
+        print(
+            f"read pool: acquire_wait p99={stats.acquire_wait.percentile_ms(99):7.2f} ms "
+            f"hold mean={stats.hold.mean_ms:7.2f} ms; writer: acquire_wait p99="
+            f"{db.writer_stats().acquire_wait.percentile_ms(99):7.2f} ms"
+        )
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
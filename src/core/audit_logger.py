@@ -1,20 +1,29 @@
+from typing import Union
+
 from core.events import (
     EventBus,
     EntryAdded,
     EntryCreated,
     EntryUpdated,
     EntryDeleted,
+    EntriesCreated,
+    EntriesUpdated,
+    EntriesRestored,
+    TrashPurged,
     UserLoggedIn,
     UserLoggedOut,
     ClipboardCopied,
     ClipboardCleared,
 )
+from core.audit_writer import BufferedAuditWriter
 from database.repositories import AuditRepository
 
 
 class AuditLogger:
+    # audit_repo может быть BufferedAuditWriter: тогда выход и блокировка
+    # (оба идут через UserLoggedOut) сбрасывают очередь на диск.
 
-    def __init__(self, bus: EventBus, audit_repo: AuditRepository) -> None:
+    def __init__(self, bus: EventBus, audit_repo: Union[AuditRepository, BufferedAuditWriter]) -> None:
         self.bus = bus
         self.audit = audit_repo
 
@@ -23,6 +32,10 @@ class AuditLogger:
         self.bus.subscribe(EntryCreated, self.on_entry_created)
         self.bus.subscribe(EntryUpdated, self.on_entry_updated)
         self.bus.subscribe(EntryDeleted, self.on_entry_deleted)
+        self.bus.subscribe(EntriesCreated, self.on_entries_created)
+        self.bus.subscribe(EntriesUpdated, self.on_entries_updated)
+        self.bus.subscribe(EntriesRestored, self.on_entries_restored)
+        self.bus.subscribe(TrashPurged, self.on_trash_purged)
         self.bus.subscribe(UserLoggedIn, self.on_user_logged_in)
         self.bus.subscribe(UserLoggedOut, self.on_user_logged_out)
         self.bus.subscribe(ClipboardCopied, self.on_clipboard_copied)
@@ -40,11 +53,24 @@ class AuditLogger:
     def on_entry_updated(self, e: EntryUpdated) -> None:
         self.audit.write("EntryUpdated", {"entry_id": e.entry_id, "title": e.title})
 
+    def on_entries_created(self, e: EntriesCreated) -> None:
+        self.audit.write("EntriesCreated", {"count": len(e.entry_ids), "entry_ids": list(e.entry_ids)})
+
+    def on_entries_updated(self, e: EntriesUpdated) -> None:
+        self.audit.write("EntriesUpdated", {"count": len(e.entry_ids), "entry_ids": list(e.entry_ids)})
+
+    def on_entries_restored(self, e: EntriesRestored) -> None:
+        self.audit.write("EntriesRestored", {"count": len(e.entry_ids), "entry_ids": list(e.entry_ids)})
+
+    def on_trash_purged(self, e: TrashPurged) -> None:
+        self.audit.write("TrashPurged", {"count": e.count})
+
     def on_user_logged_in(self, e: UserLoggedIn) -> None:
         self.audit.write("UserLoggedIn", {"username": e.username})
 
     def on_user_logged_out(self, e: UserLoggedOut) -> None:
         self.audit.write("UserLoggedOut", {"username": e.username})
+        self.audit.flush()
 
     def on_clipboard_copied(self, e: ClipboardCopied) -> None:
         self.audit.write("ClipboardCopied", {"entry_id": e.entry_id})
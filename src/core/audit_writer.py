@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+import logging
+import sqlite3
+import threading
+from collections import deque
+from dataclasses import dataclass
+from time import perf_counter
+from typing import List, Optional
+
+from database.db import now_iso
+from database.pool_stats import HistogramSnapshot, LatencyHistogram
+from database.repositories import AuditRecord, AuditRepository
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class AuditWriterStats:
+    queue_depth: int
+    written: int
+    batches: int
+    failed_batches: int
+    quarantined: int
+    flush_latency: HistogramSnapshot
+
+
+class BufferedAuditWriter:
+    # Отложенная запись аудита: write() только кладет событие в очередь, фоновый
+    # поток сбрасывает ее одним executemany, когда набралось max_batch событий
+    # или прошло flush_interval_sec. Время события фиксируется при постановке в
+    # очередь, поэтому порядок и timestamp совпадают с синхронной записью.
+    # flush() синхронный: после него все события, поставленные до вызова, уже в базе.
+    max_batch = 256
+    flush_interval_sec = 0.5
+    # Ошибки базы временные: порция возвращается в очередь. Остальные (например,
+    # details не сериализуются в JSON) не пройдут и при повторе: такие записи
+    # откладываются в quarantine, чтобы не блокировать очередь навсегда.
+    retry_errors = (sqlite3.Error, RuntimeError, TimeoutError)
+    quarantine_limit = 1000
+
+    def __init__(
+        self,
+        audit_repo: AuditRepository,
+        max_batch: Optional[int] = None,
+        flush_interval_sec: Optional[float] = None,
+    ):
+        self.audit_repo = audit_repo
+        self.db = audit_repo.db
+        self.max_batch = max(1, int(max_batch or self.max_batch))
+        self.flush_interval_sec = max(
+            0.01, float(flush_interval_sec if flush_interval_sec is not None else self.flush_interval_sec)
+        )
+        self.queue: deque[tuple[str, str, Optional[int], dict]] = deque()
+        self.condition = threading.Condition()
+        # Сбросы идут по одному, иначе две порции могли бы записаться не по порядку.
+        self.flush_lock = threading.Lock()
+        self.flush_latency = LatencyHistogram()
+        self.written = 0
+        self.batches = 0
+        self.failed_batches = 0
+        self.quarantined = 0
+        self.quarantine: deque[tuple[str, str, Optional[int], dict]] = deque(maxlen=self.quarantine_limit)
+        self.stop_event = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+
+    def write(self, action: str, details: dict, entry_id: Optional[int] = None) -> None:
+        with self.condition:
+            self.queue.append((action, now_iso(), entry_id, details))
+            if len(self.queue) >= self.max_batch:
+                self.condition.notify()
+
+    def queue_depth(self) -> int:
+        with self.condition:
+            return len(self.queue)
+
+    def flush(self) -> int:
+        written = 0
+        with self.flush_lock:
+            while True:
+                with self.condition:
+                    if not self.queue:
+                        return written
+                    batch = [self.queue.popleft() for _ in range(min(self.max_batch, len(self.queue)))]
+                started = perf_counter()
+                stored = len(batch)
+                try:
+                    self.audit_repo.write_many(batch)
+                except self.retry_errors:
+                    # Порция возвращается в голову очереди и будет записана следующим сбросом.
+                    self.requeue(batch)
+                    raise
+                except Exception:
+                    logger.exception("Audit batch rejected, writing records one by one")
+                    stored = self.write_separately(batch)
+                elapsed = perf_counter() - started
+                with self.condition:
+                    self.flush_latency.observe(elapsed)
+                    self.written += stored
+                    self.batches += 1
+                written += stored
+
+    def requeue(self, records: list[tuple[str, str, Optional[int], dict]]) -> None:
+        with self.condition:
+            self.queue.extendleft(reversed(records))
+            self.failed_batches += 1
+
+    def write_separately(self, batch: list[tuple[str, str, Optional[int], dict]]) -> int:
+        stored = 0
+        for position, record in enumerate(batch):
+            try:
+                self.audit_repo.write_many([record])
+                stored += 1
+            except self.retry_errors:
+                self.requeue(batch[position:])
+                raise
+            except Exception:
+                logger.exception("Audit record quarantined: %s", record[0])
+                with self.condition:
+                    self.quarantine.append(record)
+                    self.quarantined += 1
+        return stored
+
+    def last(self, limit: int = 50) -> List[AuditRecord]:
+        self.flush()
+        return self.audit_repo.last(limit)
+
+    def stats(self) -> AuditWriterStats:
+        with self.condition:
+            return AuditWriterStats(
+                queue_depth=len(self.queue),
+                written=self.written,
+                batches=self.batches,
+                failed_batches=self.failed_batches,
+                quarantined=self.quarantined,
+                flush_latency=self.flush_latency.snapshot(),
+            )
+
+    def run(self) -> None:
+        while not self.stop_event.is_set():
+            with self.condition:
+                if len(self.queue) < self.max_batch:
+                    self.condition.wait(self.flush_interval_sec)
+            try:
+                self.flush()
+            except Exception:
+                # База занята или закрыта: события остаются в очереди до следующей попытки.
+                # Поток не должен умереть ни от какой ошибки, иначе очередь растет до выхода.
+                logger.exception("Audit flush failed")
+                self.stop_event.wait(self.flush_interval_sec)
+
+    def start(self) -> None:
+        if self.thread is not None and self.thread.is_alive():
+            return
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self.run, name="audit-writer", daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        # Последний сброс в вызывающем потоке: после stop() очередь пуста или ошибка поднята.
+        self.stop_event.set()
+        with self.condition:
+            self.condition.notify()
+        if self.thread is not None:
+            self.thread.join(timeout)
+            self.thread = None
+        self.flush()
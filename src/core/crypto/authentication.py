@@ -9,9 +9,7 @@ from core.events import EventBus, UserLoggedIn, UserLoggedOut
 from core.key_manager import KeyManager
 from core.security import secure_zero_bytearray
 from core.state_manager import StateManager
-from core.vault.entry_manager import EntryManager
 from database.db import Database
-from core.crypto.abstract import EncryptionService
 
 
 def now_utc_iso() -> str:
@@ -57,8 +55,12 @@ class AuthenticationService:
 
     def setup_master_password(self, password: str, username: str = "user") -> None:
         self.key_manager.setup_master_password(password)
-        master_key = self.key_manager.derive_master_encryption_key(password)
-        self.key_manager.cache_encryption_key(master_key)
+        master_key = bytearray(self.key_manager.derive_master_encryption_key(password))
+        try:
+            data_key = self.key_manager.create_data_key(bytes(master_key))
+        finally:
+            secure_zero_bytearray(master_key)
+        self.key_manager.cache_encryption_key(data_key)
         self.state.unlock(username=username)
         now_ts = now_utc_iso()
         self.state.update_login_timestamps(now_ts)
@@ -81,8 +83,8 @@ class AuthenticationService:
             self.metrics.failed_attempt_count = failed_count
             return AuthenticationResult(success=False, message="Неверный пароль.", delay_sec=delay)
 
-        master_key = self.key_manager.derive_master_encryption_key(password)
-        self.key_manager.cache_encryption_key(master_key)
+        data_key = self.key_manager.unlock_data_key(password)
+        self.key_manager.cache_encryption_key(data_key)
         self.state.unlock(username=username)
         self.state.set_failed_attempt_count(0)
 
@@ -134,7 +136,6 @@ class AuthenticationService:
         current_password: str,
         new_password: str,
         db: Database,
-        crypto: EncryptionService,
         progress_callback: Optional[Callable[[int, int], None]] = None,
     ) -> None:
         if not self.key_manager.verify_master_password(current_password):
@@ -144,6 +145,8 @@ class AuthenticationService:
         if not valid:
             raise ValueError(" ".join(issues))
 
+        # Записи зашифрованы ключом данных, поэтому смена пароля только
+        # переоборачивает его новым ключом из пароля: стоимость O(1).
         old_key = bytearray(self.key_manager.derive_master_encryption_key(current_password))
         new_salt = self.key_manager.make_salt(self.key_manager.pbkdf2_params.salt_len)
         new_key = bytearray(
@@ -156,23 +159,18 @@ class AuthenticationService:
         new_auth_hash = self.key_manager.create_auth_hash(new_password)
         params_payload = self.key_manager.serialize_parameter_bundle()
 
+        data_key = bytearray()
         completed = False
         try:
-            entry_manager = EntryManager(
-                db=db,
-                key_manager=self.key_manager,
-                bus=self.bus,
-                legacy_crypto=crypto,
-            )
+            data_key = bytearray(self.key_manager.unwrap_data_key(bytes(old_key)))
+            if progress_callback is not None:
+                progress_callback(0, 1)
             with db.session() as conn:
-                entry_manager.reencrypt_all_entries(
-                    old_key=bytes(old_key),
-                    new_key=bytes(new_key),
-                    progress_callback=progress_callback,
-                    legacy_crypto=crypto,
+                self.key_manager.store_wrapped_data_key_with_connection(
                     conn=conn,
+                    wrapping_key=bytes(new_key),
+                    data_key=bytes(data_key),
                 )
-
                 self.key_manager.store_key_data_with_connection(
                     conn=conn,
                     key_type=self.key_manager.auth_hash_key_type,
@@ -192,10 +190,13 @@ class AuthenticationService:
                     version=self.key_manager.current_key_version,
                 )
                 completed = True
+            if progress_callback is not None:
+                progress_callback(1, 1)
         finally:
             secure_zero_bytearray(old_key)
-            if completed:
-                self.key_manager.cache_encryption_key(bytes(new_key))
             secure_zero_bytearray(new_key)
+            if completed:
+                self.key_manager.cache_encryption_key(bytes(data_key))
+            secure_zero_bytearray(data_key)
         if completed:
             self.record_activity()
@@ -11,7 +11,9 @@ from typing import Any, Dict, Optional, Tuple
 
 from argon2 import PasswordHasher, Type
 from argon2.exceptions import Argon2Error
+from cryptography.exceptions import InvalidTag
 from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 
 from core.security import secure_buffer
@@ -310,3 +312,30 @@ def unpack_parameter_bundle(raw: bytes) -> tuple[Argon2Params, Pbkdf2Params, Pas
         Pbkdf2Params.from_dict(pbkdf2_raw),
         PasswordPolicy.from_dict(policy_raw),
     )
+
+
+DATA_KEY_WRAP_MARKER = b"DEK1"
+DATA_KEY_WRAP_AAD = b"cryptosafe|vault_data_key"
+
+
+def wrap_data_key(wrapping_key: bytes, data_key: bytes) -> bytes:
+    if not isinstance(wrapping_key, (bytes, bytearray)) or len(wrapping_key) != 32:
+        raise ValueError("Ключ-обертка должен быть 32 байта.")
+    if not isinstance(data_key, (bytes, bytearray)) or len(data_key) == 0:
+        raise ValueError("Ключ данных не может быть пустым.")
+    nonce = os.urandom(12)
+    wrapped = AESGCM(bytes(wrapping_key)).encrypt(nonce, bytes(data_key), DATA_KEY_WRAP_AAD)
+    return DATA_KEY_WRAP_MARKER + nonce + wrapped
+
+
+def unwrap_data_key(wrapping_key: bytes, wrapped: bytes) -> bytes:
+    if not isinstance(wrapping_key, (bytes, bytearray)) or len(wrapping_key) != 32:
+        raise ValueError("Ключ-обертка должен быть 32 байта.")
+    raw = bytes(wrapped or b"")
+    if not raw.startswith(DATA_KEY_WRAP_MARKER) or len(raw) < len(DATA_KEY_WRAP_MARKER) + 12 + 16:
+        raise ValueError("Некорректный формат обернутого ключа данных.")
+    payload = raw[len(DATA_KEY_WRAP_MARKER) :]
+    try:
+        return AESGCM(bytes(wrapping_key)).decrypt(payload[:12], payload[12:], DATA_KEY_WRAP_AAD)
+    except InvalidTag as exc:
+        raise ValueError("Не удалось развернуть ключ данных.") from exc
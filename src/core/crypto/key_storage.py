@@ -7,9 +7,10 @@ import os
 import stat
 import threading
 import time
+import weakref
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Optional
+from typing import Callable, Optional
 
 from core.security import secure_zero_bytearray
 
@@ -38,6 +39,29 @@ class SecureKeyCache:
         self.last_activity_ts: float = 0.0
         self.app_active: bool = True
         self.memory_protected: bool = False
+        self.clear_listeners: list[Callable[[], Optional[Callable[[], None]]]] = []
+
+    def add_clear_listener(self, listener: Callable[[], None]) -> None:
+        # Слушатели держатся слабо, чтобы кэш ключа не продлевал жизнь владельцам.
+        if hasattr(listener, "__self__") and hasattr(listener, "__func__"):
+            ref: Callable[[], Optional[Callable[[], None]]] = weakref.WeakMethod(listener)
+        else:
+            ref = lambda: listener
+        with self.mutex:
+            self.clear_listeners.append(ref)
+
+    def notify_clear_listeners_locked(self) -> None:
+        alive: list[Callable[[], Optional[Callable[[], None]]]] = []
+        for ref in self.clear_listeners:
+            listener = ref()
+            if listener is None:
+                continue
+            alive.append(ref)
+            try:
+                listener()
+            except Exception:
+                pass
+        self.clear_listeners = alive
 
     def set_config(self, config: KeyCacheConfig) -> None:
         with self.mutex:
@@ -114,6 +138,7 @@ class SecureKeyCache:
         self.cached_at_ts = 0.0
         self.last_activity_ts = 0.0
         self.memory_protected = False
+        self.notify_clear_listeners_locked()
 
     @staticmethod
     def protect_memory_region(buf: bytearray) -> bool:
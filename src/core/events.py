@@ -36,6 +36,26 @@ class EntryDeleted(Event):
     entry_id: Optional[int] = None
 
 
+@dataclass(frozen=True)
+class EntriesCreated(Event):
+    entry_ids: tuple[int, ...] = ()
+
+
+@dataclass(frozen=True)
+class EntriesUpdated(Event):
+    entry_ids: tuple[int, ...] = ()
+
+
+@dataclass(frozen=True)
+class EntriesRestored(Event):
+    entry_ids: tuple[int, ...] = ()
+
+
+@dataclass(frozen=True)
+class TrashPurged(Event):
+    count: int = 0
+
+
 @dataclass(frozen=True)
 class UserLoggedIn(Event):
     username: str
@@ -3,6 +3,7 @@ from __future__ import annotations
 import base64
 import hashlib
 import json
+import os
 from dataclasses import dataclass
 from datetime import datetime, timezone
 from typing import Optional
@@ -15,8 +16,11 @@ from core.crypto.key_derivation import (
     Pbkdf2Params,
     pack_parameter_bundle,
     unpack_parameter_bundle,
+    unwrap_data_key,
+    wrap_data_key,
 )
 from core.crypto.key_storage import KeyCacheConfig, PlatformSecretStore, SecureKeyCache
+from core.security import secure_zero_bytearray
 from database.db import Database
 
 
@@ -62,6 +66,9 @@ class KeyManager:
     auth_hash_key_type = "auth_hash"
     enc_salt_key_type = "enc_salt"
     params_key_type = "params"
+    data_key_type = "vault_data_key"
+    retired_data_key_type = "vault_data_key_retired"
+    data_key_size = 32
     current_key_version = 1
 
     def __init__(
@@ -81,9 +88,16 @@ class KeyManager:
         self.derivation = KeyDerivationService(self.argon2_params, self.pbkdf2_params)
         self.key_cache = SecureKeyCache(cache_config or KeyCacheConfig())
         self.secret_store = PlatformSecretStore()
+        self.db.add_restore_listener(self.on_database_restored)
 
     def bind_database(self, db: Database) -> None:
         self.db = db
+        self.db.add_restore_listener(self.on_database_restored)
+
+    def on_database_restored(self) -> None:
+        # В восстановленной копии может быть другой ключ данных или мастер-пароль:
+        # ключ сессии сбрасывается, нужен повторный вход.
+        self.clear_cached_key("restore")
 
     def configure_parameters(
         self,
@@ -197,6 +211,99 @@ class KeyManager:
             key_type=key_type,
         )
 
+    def generate_data_key(self) -> bytes:
+        return os.urandom(self.data_key_size)
+
+    def data_key_generation(self, conn=None) -> int:
+        if conn is None:
+            with self.db.read_session() as conn_from_db:
+                return self.data_key_generation(conn_from_db)
+        row = conn.execute(
+            "SELECT MAX(version) AS generation FROM key_store WHERE key_type = ?",
+            (self.data_key_type,),
+        ).fetchone()
+        if row is None or row["generation"] is None:
+            return self.current_key_version
+        return int(row["generation"])
+
+    def store_wrapped_data_key_with_connection(
+        self,
+        conn,
+        wrapping_key: bytes,
+        data_key: bytes,
+        generation: Optional[int] = None,
+    ) -> None:
+        self.store_key_data_with_connection(
+            conn=conn,
+            key_type=self.data_key_type,
+            key_data=wrap_data_key(wrapping_key, data_key),
+            version=self.data_key_generation(conn) if generation is None else int(generation),
+        )
+
+    def rotate_data_key_with_connection(self, conn, wrapping_key: bytes, old_data_key: bytes) -> tuple[bytes, int]:
+        # Старый ключ данных сохраняется обернутым новым: строки прежнего поколения
+        # остаются читаемыми, пока задание перешифрования не дойдет до них.
+        old_generation = self.data_key_generation(conn)
+        new_generation = old_generation + 1
+        new_data_key = self.generate_data_key()
+        self.store_key_data_with_connection(
+            conn=conn,
+            key_type=self.retired_data_key_type,
+            key_data=wrap_data_key(new_data_key, old_data_key),
+            version=old_generation,
+        )
+        self.store_wrapped_data_key_with_connection(conn, wrapping_key, new_data_key, generation=new_generation)
+        conn.execute(
+            "DELETE FROM key_store WHERE key_type = ? AND version < ?",
+            (self.data_key_type, new_generation),
+        )
+        return new_data_key, new_generation
+
+    def prune_retired_data_keys_with_connection(self, conn, generation: int) -> int:
+        # Вызывается в транзакции, где перешифрование закончено: строк поколений
+        # ниже generation больше нет, и прежние ключи данных не нужны.
+        cursor = conn.execute(
+            "DELETE FROM key_store WHERE key_type = ? AND version < ?",
+            (self.retired_data_key_type, int(generation)),
+        )
+        return int(cursor.rowcount)
+
+    def retired_data_key(self, generation: int, active_key: bytes, active_generation: int, conn=None) -> bytes:
+        key = bytes(active_key)
+        for version in range(int(active_generation) - 1, int(generation) - 1, -1):
+            wrapped = self.load_key_data(self.retired_data_key_type, version=version, conn=conn)
+            if wrapped is None:
+                raise ValueError(f"Ключ данных поколения {generation} недоступен.")
+            key = unwrap_data_key(key, wrapped)
+        return key
+
+    def create_data_key(self, wrapping_key: bytes) -> bytes:
+        data_key = self.generate_data_key()
+        with self.db.session() as conn:
+            self.store_wrapped_data_key_with_connection(conn, wrapping_key, data_key)
+        return data_key
+
+    def unwrap_data_key(self, wrapping_key: bytes) -> bytes:
+        wrapped = self.load_key_data(self.data_key_type)
+        if wrapped is None:
+            return self.migrate_to_data_key(wrapping_key)
+        return unwrap_data_key(wrapping_key, wrapped)
+
+    def migrate_to_data_key(self, wrapping_key: bytes) -> bytes:
+        # Хранилища без ключа данных шифровали записи ключом из пароля напрямую:
+        # он и становится ключом данных, поэтому перешифровывать записи не нужно.
+        data_key = bytes(wrapping_key)
+        with self.db.session() as conn:
+            self.store_wrapped_data_key_with_connection(conn, wrapping_key, data_key)
+        return data_key
+
+    def unlock_data_key(self, password: str) -> bytes:
+        wrapping_key = bytearray(self.derive_master_encryption_key(password))
+        try:
+            return self.unwrap_data_key(bytes(wrapping_key))
+        finally:
+            secure_zero_bytearray(wrapping_key)
+
     def cache_encryption_key(self, key: bytes) -> None:
         self.key_cache.cache_key(key)
 
@@ -232,8 +339,8 @@ class KeyManager:
         return hashlib.sha256(key).digest()
 
     @staticmethod
-    def encode_key_data_for_storage(key_data: bytes) -> str:
-        return base64.b64encode(bytes(key_data)).decode("utf-8")
+    def encode_key_data_for_storage(key_data: bytes) -> bytes:
+        return bytes(key_data)
 
     @staticmethod
     def decode_key_data_from_storage(raw_value: object) -> Optional[bytes]:
@@ -273,7 +380,7 @@ class KeyManager:
             ),
         )
 
-    def load_key_data(self, key_type: str, version: Optional[int] = None) -> Optional[bytes]:
+    def load_key_data(self, key_type: str, version: Optional[int] = None, conn=None) -> Optional[bytes]:
         sql = """
         SELECT key_data
         FROM key_store
@@ -285,7 +392,10 @@ class KeyManager:
             params.append(int(version))
         sql += " ORDER BY version DESC LIMIT 1"
 
-        with self.db.session() as conn:
+        if conn is None:
+            with self.db.read_session() as conn_from_db:
+                row = conn_from_db.execute(sql, tuple(params)).fetchone()
+        else:
             row = conn.execute(sql, tuple(params)).fetchone()
         if row is None:
             return None
@@ -1,10 +1,15 @@
-from core.vault.encryption_service import VaultEncryptionService
+from core.vault.encryption_service import BulkDecryptResult, VaultEncryptionService
 from core.vault.entry_manager import EntryManager
+from core.vault.health import EntryHealthFinding, VaultHealthAnalyzer, VaultHealthReport
 from core.vault.password_generator import PasswordGenerationConfig, PasswordGenerator
 
 __all__ = [
+    "BulkDecryptResult",
+    "EntryHealthFinding",
     "EntryManager",
     "PasswordGenerationConfig",
     "PasswordGenerator",
     "VaultEncryptionService",
+    "VaultHealthAnalyzer",
+    "VaultHealthReport",
 ]
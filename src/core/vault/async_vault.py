@@ -0,0 +1,198 @@
+from __future__ import annotations
+
+import asyncio
+import functools
+import os
+import threading
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable, List, Optional, TypeVar
+
+from core.vault.exporter import ArchiveVerification, ExportReport
+from core.vault.health import VaultHealthReport
+from core.vault.importer import ImportReport
+from database.repositories import VaultEntry, VaultRepository
+
+
+T = TypeVar("T")
+
+
+class AsyncVault:
+    # Асинхронный фасад над VaultRepository: вся логика остается в синхронных
+    # классах, здесь только перенос вызовов с event loop в потоки.
+    # Работа с базой идет в пуле Database.get_executor (размер пула соединений + 1),
+    # пакетная расшифровка внутри нее - в собственном пуле VaultEncryptionService,
+    # а чисто вычислительные операции (анализ стойкости, проверка архива) - в crypto_executor.
+    #
+    # Отмена: задача, которая еще не началась, снимается из очереди. Начатую
+    # SQLite-операцию прервать нельзя, поэтому await после отмены ждет, пока поток
+    # отпустит соединение; долгие операции (импорт, экспорт, перешифрование)
+    # останавливаются на границе ближайшей порции.
+    def __init__(self, vault: VaultRepository, crypto_workers: Optional[int] = None):
+        self.vault = vault
+        self.db = vault.db
+        self.crypto_executor = ThreadPoolExecutor(
+            max_workers=max(1, int(crypto_workers or min(4, os.cpu_count() or 1))),
+            thread_name_prefix="cryptosafe-async-crypto",
+        )
+
+    async def __aenter__(self) -> "AsyncVault":
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.crypto_executor.shutdown(wait=True)
+
+    async def run(
+        self,
+        executor: ThreadPoolExecutor,
+        fn: Callable[..., T],
+        *args: Any,
+        stop: Optional[threading.Event] = None,
+        **kwargs: Any,
+    ) -> T:
+        job: Future = executor.submit(functools.partial(fn, *args, **kwargs))
+        waiter = asyncio.wrap_future(job)
+        try:
+            return await asyncio.shield(waiter)
+        except asyncio.CancelledError:
+            if stop is not None:
+                stop.set()
+            if not job.cancel():
+                await asyncio.wait({waiter})
+                if not waiter.cancelled():
+                    waiter.exception()
+            raise
+
+    async def run_db(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        return await self.run(self.db.get_executor(), fn, *args, **kwargs)
+
+    async def run_crypto(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        return await self.run(self.crypto_executor, fn, *args, **kwargs)
+
+    @staticmethod
+    def progress_relay(
+        stop: threading.Event,
+        callback: Optional[Callable[..., None]],
+        raise_on_stop: bool = True,
+    ) -> Callable[..., None]:
+        # Прогресс приходит из рабочего потока: колбэк вызывается на event loop,
+        # а после отмены исключение останавливает операцию между порциями.
+        loop = asyncio.get_running_loop()
+
+        def relay(*values: Any) -> None:
+            if raise_on_stop and stop.is_set():
+                raise CancelledError("Операция отменена.")
+            if callback is not None:
+                loop.call_soon_threadsafe(callback, *values)
+
+        return relay
+
+    async def add(self, title: str, username: str, password: str, **fields: Any) -> int:
+        return await self.run_db(self.vault.add, title, username, password, **fields)
+
+    async def add_many(self, items: List[dict], chunk_size: Optional[int] = None) -> List[int]:
+        return await self.run_db(self.vault.add_many, items, chunk_size=chunk_size)
+
+    async def get_by_id(self, entry_id: int) -> Optional[dict]:
+        return await self.run_db(self.vault.get_by_id, entry_id)
+
+    async def get_password(self, entry_id: int) -> Optional[str]:
+        return await self.run_db(self.vault.get_password, entry_id)
+
+    async def list_page(
+        self,
+        limit: int,
+        after: Optional[tuple[str, int]] = None,
+        **filters: Any,
+    ) -> tuple[List[VaultEntry], Optional[tuple[str, int]]]:
+        return await self.run_db(self.vault.list_page, limit, after=after, **filters)
+
+    async def count(self, date_from: Optional[str] = None, date_to: Optional[str] = None) -> int:
+        return await self.run_db(self.vault.count, date_from=date_from, date_to=date_to)
+
+    async def search(self, query: str = "", **filters: Any) -> List[VaultEntry]:
+        return await self.run_db(self.vault.search, query, **filters)
+
+    async def update(self, entry_id: int, title: str, username: str, password: str, **fields: Any) -> None:
+        await self.run_db(self.vault.update, entry_id, title, username, password, **fields)
+
+    async def update_many(self, changes: dict[int, dict], chunk_size: Optional[int] = None) -> None:
+        await self.run_db(self.vault.update_many, changes, chunk_size=chunk_size)
+
+    async def delete(self, entry_id: int) -> None:
+        await self.run_db(self.vault.delete, entry_id)
+
+    async def restore_many(self, entry_ids: List[int]) -> List[int]:
+        return await self.run_db(self.vault.restore_many, entry_ids)
+
+    async def list_deleted(self, limit: int, after: Optional[tuple[str, int]] = None) -> List[dict]:
+        return await self.run_db(self.vault.list_deleted, limit, after=after)
+
+    async def iter_entries(self, batch_size: int = 200, include_passwords: bool = False) -> AsyncIterator[VaultEntry]:
+        # Страницы по keyset-курсору: между страницами соединение не удерживается.
+        after: Optional[tuple[str, int]] = None
+        while True:
+            page, after = await self.list_page(batch_size, after=after, include_passwords=include_passwords)
+            for entry in page:
+                yield entry
+            if after is None:
+                return
+
+    async def import_file(
+        self,
+        path: Path,
+        file_format: Optional[str] = None,
+        chunk_size: int = 1000,
+        progress_callback: Optional[Callable[[int, int], None]] = None,
+    ) -> ImportReport:
+        # После отмены уже записанные порции остаются в хранилище, как при остановке main().
+        stop = threading.Event()
+        return await self.run_db(
+            self.vault.import_file,
+            path,
+            file_format=file_format,
+            chunk_size=chunk_size,
+            progress_callback=self.progress_relay(stop, progress_callback),
+            stop=stop,
+        )
+
+    async def export_archive(
+        self,
+        path: Path,
+        passphrase: str,
+        chunk_entries: int = 500,
+        progress_callback: Optional[Callable[[int], None]] = None,
+    ) -> ExportReport:
+        stop = threading.Event()
+        return await self.run_db(
+            self.vault.export_archive,
+            path,
+            passphrase,
+            chunk_entries=chunk_entries,
+            progress_callback=self.progress_relay(stop, progress_callback),
+            stop=stop,
+        )
+
+    async def reencrypt_all_entries(
+        self,
+        progress_callback: Optional[Callable[[int, int], None]] = None,
+        chunk_size: Optional[int] = None,
+    ) -> bool:
+        # Отмена здесь - пауза: контрольная точка сохраняется, продолжить можно позже.
+        stop = threading.Event()
+        return await self.run_db(
+            self.vault.reencrypt_all_entries,
+            progress_callback=self.progress_relay(stop, progress_callback, raise_on_stop=False),
+            chunk_size=chunk_size,
+            should_stop=stop.is_set,
+            stop=stop,
+        )
+
+    async def health_report(self, max_password_age_days: int = 365) -> VaultHealthReport:
+        return await self.run_crypto(self.vault.health_report, max_password_age_days=max_password_age_days)
+
+    async def verify_archive(self, path: Path, passphrase: str) -> ArchiveVerification:
+        return await self.run_crypto(self.vault.verify_archive, path, passphrase)
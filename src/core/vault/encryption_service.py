@@ -3,17 +3,56 @@ from __future__ import annotations
 import base64
 import json
 import os
-from typing import Any
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Optional, Sequence
 
 from cryptography.exceptions import InvalidTag
 from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 
+from core.vault.payload_codec import CompactPayloadCodec
+
+
+@dataclass(frozen=True)
+class BulkDecryptResult:
+    index: int
+    payload: Optional[dict[str, Any]] = None
+    error: str = ""
+
+    @property
+    def ok(self) -> bool:
+        return self.payload is not None
+
 
 class VaultEncryptionService:
     nonce_size = 12
     key_size = 32
     auth_tag_size = 16
 
+    def __init__(self, max_workers: Optional[int] = None, bulk_chunk_size: int = 256):
+        self.max_workers = max(1, int(max_workers or min(8, os.cpu_count() or 1)))
+        self.bulk_chunk_size = max(1, int(bulk_chunk_size))
+        self.executor: Optional[ThreadPoolExecutor] = None
+        self.executor_lock = threading.Lock()
+        self.codec = CompactPayloadCodec()
+
+    def get_executor(self) -> ThreadPoolExecutor:
+        with self.executor_lock:
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix="vault-crypto",
+                )
+            return self.executor
+
+    def shutdown(self) -> None:
+        with self.executor_lock:
+            executor = self.executor
+            self.executor = None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
     def ensure_valid_key(self, key: bytes) -> bytes:
         if not isinstance(key, (bytes, bytearray)):
             raise TypeError("Ключ должен быть bytes.")
@@ -23,11 +62,22 @@ class VaultEncryptionService:
         return key_bytes
 
     def serialize_payload(self, payload: dict[str, Any]) -> bytes:
+        if not isinstance(payload, dict):
+            raise TypeError("payload должен быть словарем.")
+        return self.codec.encode(payload)
+
+    def serialize_json_payload(self, payload: dict[str, Any]) -> bytes:
         if not isinstance(payload, dict):
             raise TypeError("payload должен быть словарем.")
         return json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
 
     def deserialize_payload(self, payload_bytes: bytes) -> dict[str, Any]:
+        # Записи до компактного формата хранят JSON, он начинается с "{", а не с байта версии.
+        if self.codec.is_compact(payload_bytes):
+            return self.codec.decode(payload_bytes)
+        return self.deserialize_json_payload(payload_bytes)
+
+    def deserialize_json_payload(self, payload_bytes: bytes) -> dict[str, Any]:
         try:
             decoded = json.loads(payload_bytes.decode("utf-8"))
         except Exception as exc:
@@ -36,16 +86,21 @@ class VaultEncryptionService:
             raise ValueError("Полезная нагрузка записи должна быть объектом JSON.")
         return decoded
 
-    def pack_encrypted_payload(self, nonce: bytes, ciphertext_and_tag: bytes) -> str:
-        return base64.b64encode(bytes(nonce) + bytes(ciphertext_and_tag)).decode("utf-8")
+    def pack_encrypted_payload(self, nonce: bytes, ciphertext_and_tag: bytes) -> bytes:
+        return bytes(nonce) + bytes(ciphertext_and_tag)
 
-    def unpack_encrypted_payload(self, encrypted_data: str) -> tuple[bytes, bytes]:
-        if not isinstance(encrypted_data, str) or not encrypted_data:
+    def unpack_encrypted_payload(self, encrypted_data: object) -> tuple[memoryview, memoryview]:
+        # BLOB из sqlite3.Row режется через memoryview без копирования;
+        # base64-текст поддерживается для строк, записанных до схемы v8.
+        if isinstance(encrypted_data, (bytes, bytearray, memoryview)):
+            raw = memoryview(encrypted_data)
+        elif isinstance(encrypted_data, str) and encrypted_data:
+            try:
+                raw = memoryview(base64.b64decode(encrypted_data.encode("utf-8"), validate=True))
+            except Exception as exc:
+                raise ValueError("encrypted_data не является корректным base64.") from exc
+        else:
             raise ValueError("encrypted_data пустой или имеет неверный тип.")
-        try:
-            raw = base64.b64decode(encrypted_data.encode("utf-8"), validate=True)
-        except Exception as exc:
-            raise ValueError("encrypted_data не является корректным base64.") from exc
         min_len = self.nonce_size + self.auth_tag_size
         if len(raw) < min_len:
             raise ValueError("encrypted_data имеет некорректную длину.")
@@ -53,24 +108,106 @@ class VaultEncryptionService:
         ciphertext_and_tag = raw[self.nonce_size :]
         return nonce, ciphertext_and_tag
 
-    def encrypt_payload(self, payload: dict[str, Any], key: bytes) -> str:
+    def encrypt_payload(
+        self,
+        payload: dict[str, Any],
+        key: bytes,
+        associated_data: Optional[bytes] = None,
+    ) -> bytes:
         key_bytes = self.ensure_valid_key(key)
         plaintext = self.serialize_payload(payload)
         nonce = os.urandom(self.nonce_size)
-        ciphertext_and_tag = AESGCM(key_bytes).encrypt(nonce, plaintext, None)
+        ciphertext_and_tag = AESGCM(key_bytes).encrypt(nonce, plaintext, associated_data)
         return self.pack_encrypted_payload(nonce, ciphertext_and_tag)
 
-    def decrypt_payload(self, encrypted_data: str, key: bytes) -> dict[str, Any]:
+    def decrypt_payload(
+        self,
+        encrypted_data: bytes,
+        key: bytes,
+        associated_data: Optional[bytes] = None,
+    ) -> dict[str, Any]:
         key_bytes = self.ensure_valid_key(key)
+        return self.decrypt_with_cipher(AESGCM(key_bytes), encrypted_data, associated_data)
+
+    def decrypt_with_cipher(
+        self,
+        cipher: AESGCM,
+        encrypted_data: bytes,
+        associated_data: Optional[bytes] = None,
+    ) -> dict[str, Any]:
         nonce, ciphertext_and_tag = self.unpack_encrypted_payload(encrypted_data)
         try:
-            plaintext = AESGCM(key_bytes).decrypt(nonce, ciphertext_and_tag, None)
+            plaintext = cipher.decrypt(nonce, ciphertext_and_tag, associated_data)
         except InvalidTag as exc:
             raise ValueError("Обнаружена подмена данных записи.") from exc
         except Exception as exc:
             raise ValueError("Не удалось расшифровать запись.") from exc
         return self.deserialize_payload(plaintext)
 
-    def reencrypt_payload(self, encrypted_data: str, old_key: bytes, new_key: bytes) -> str:
+    def encrypt_with_cipher(
+        self,
+        cipher: AESGCM,
+        payload: dict[str, Any],
+        associated_data: Optional[bytes] = None,
+    ) -> bytes:
+        plaintext = self.serialize_payload(payload)
+        nonce = os.urandom(self.nonce_size)
+        return self.pack_encrypted_payload(nonce, cipher.encrypt(nonce, plaintext, associated_data))
+
+    def run_chunked(self, items: Sequence[Any], worker, max_workers: Optional[int] = None) -> list[Any]:
+        # Порядок результатов совпадает с порядком входа: map сохраняет порядок чанков.
+        workers = max(1, int(max_workers or self.max_workers))
+        chunk_size = self.bulk_chunk_size
+        if workers == 1 or len(items) <= chunk_size:
+            return worker(0, items)
+        chunks = [(start, items[start : start + chunk_size]) for start in range(0, len(items), chunk_size)]
+        if workers == self.max_workers:
+            executor = self.get_executor()
+            parts = list(executor.map(lambda chunk: worker(*chunk), chunks))
+        else:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="vault-crypto") as executor:
+                parts = list(executor.map(lambda chunk: worker(*chunk), chunks))
+        output: list[Any] = []
+        for part in parts:
+            output.extend(part)
+        return output
+
+    def decrypt_many(
+        self,
+        encrypted_values: Sequence[bytes],
+        key: bytes,
+        associated_data: Optional[bytes] = None,
+        max_workers: Optional[int] = None,
+    ) -> list[BulkDecryptResult]:
+        cipher = AESGCM(self.ensure_valid_key(key))
+
+        def decrypt_chunk(offset: int, chunk: Sequence[bytes]) -> list[BulkDecryptResult]:
+            results: list[BulkDecryptResult] = []
+            for position, encrypted_data in enumerate(chunk, start=offset):
+                try:
+                    payload = self.decrypt_with_cipher(cipher, encrypted_data, associated_data)
+                except ValueError as exc:
+                    results.append(BulkDecryptResult(index=position, error=str(exc)))
+                    continue
+                results.append(BulkDecryptResult(index=position, payload=payload))
+            return results
+
+        return self.run_chunked(list(encrypted_values), decrypt_chunk, max_workers)
+
+    def encrypt_many(
+        self,
+        payloads: Sequence[dict[str, Any]],
+        key: bytes,
+        associated_data: Optional[bytes] = None,
+        max_workers: Optional[int] = None,
+    ) -> list[bytes]:
+        cipher = AESGCM(self.ensure_valid_key(key))
+
+        def encrypt_chunk(_offset: int, chunk: Sequence[dict[str, Any]]) -> list[bytes]:
+            return [self.encrypt_with_cipher(cipher, payload, associated_data) for payload in chunk]
+
+        return self.run_chunked(list(payloads), encrypt_chunk, max_workers)
+
+    def reencrypt_payload(self, encrypted_data: bytes, old_key: bytes, new_key: bytes) -> bytes:
         payload = self.decrypt_payload(encrypted_data, old_key)
         return self.encrypt_payload(payload, new_key)
@@ -1,16 +1,29 @@
 from __future__ import annotations
 
 import base64
-import difflib
+import heapq
 import re
+import threading
 from datetime import datetime, timedelta, timezone
-from typing import Any, Callable, Optional
+from itertools import islice
+from typing import Any, Callable, Iterable, Iterator, Optional
 from urllib.parse import urlparse
 
 from core.crypto.abstract import EncryptionService
-from core.events import EntryCreated, EntryDeleted, EntryUpdated, EventBus
+from core.events import (
+    EntriesCreated,
+    EntriesRestored,
+    EntriesUpdated,
+    EntryCreated,
+    EntryDeleted,
+    EntryUpdated,
+    EventBus,
+)
 from core.key_manager import KeyManager
+from core.security import secure_zero_bytearray
 from core.vault.encryption_service import VaultEncryptionService
+from core.vault.password_generator import PasswordGenerator
+from core.vault.search_index import BlindSearchIndex, FuzzyTokenIndex
 from database.db import Database
 
 
@@ -32,6 +45,24 @@ def domain_from_url(url: str) -> str:
 
 class EntryManager:
     field_filter_pattern = re.compile(r'([a-zA-Z]+):"([^"]+)"')
+    secret_payload_fields = ("password", "totp_secret", "sharing_metadata")
+    metadata_associated_data = b"cryptosafe|entry|metadata"
+    secret_associated_data = b"cryptosafe|entry|secret"
+    entry_columns = (
+        "id, encrypted_data, encrypted_secret, title, username, encrypted_password, url, notes, "
+        "created_at, updated_at, tags, key_generation"
+    )
+    reencrypt_chunk_size = 500
+    bulk_chunk_size = 1000
+    iter_batch_size = 500
+    purge_batch_size = 200
+    # Строка корзины под именами столбцов vault_entries, чтобы ее читали те же decode_rows.
+    deleted_entry_columns = (
+        "source_entry_id AS id, encrypted_data, encrypted_secret, NULL AS title, NULL AS username, "
+        "NULL AS encrypted_password, NULL AS url, NULL AS notes, created_at, updated_at, tags, key_generation, "
+        "id AS trash_id, deleted_at, expires_at"
+    )
+    search_field_weights = {"title": 8, "username": 5, "domain": 4, "url": 2, "notes": 1}
 
     def __init__(
         self,
@@ -41,13 +72,54 @@ class EntryManager:
         encryption_service: Optional[VaultEncryptionService] = None,
         legacy_crypto: Optional[EncryptionService] = None,
         soft_delete_retention_days: int = 30,
+        password_generator: Optional[PasswordGenerator] = None,
     ):
         self.db = db
         self.key_manager = key_manager
         self.bus = bus
         self.encryption_service = encryption_service or VaultEncryptionService()
         self.legacy_crypto = legacy_crypto
+        self.password_generator = password_generator or PasswordGenerator()
         self.soft_delete_retention_days = max(1, int(soft_delete_retention_days))
+        # Кэш расшифрованных несекретных полей: id -> (updated_at, metadata).
+        self.metadata_cache: dict[int, tuple[str, dict[str, Any]]] = {}
+        # Оценки стойкости для строк, записанных до хранения оценки в метаданных.
+        self.strength_cache: dict[int, tuple[str, int]] = {}
+        self.metadata_cache_lock = threading.Lock()
+        self.search_index = BlindSearchIndex(key_manager)
+        self.search_index_ready = False
+        self.fuzzy_index = FuzzyTokenIndex()
+        self.key_manager.key_cache.add_clear_listener(self.on_session_key_cleared)
+        self.db.add_restore_listener(self.on_session_key_cleared)
+
+    def on_session_key_cleared(self) -> None:
+        self.search_index_ready = False
+        self.fuzzy_index.clear()
+        self.clear_metadata_cache()
+
+    def clear_metadata_cache(self) -> None:
+        with self.metadata_cache_lock:
+            self.metadata_cache.clear()
+            self.strength_cache.clear()
+
+    def invalidate_metadata(self, entry_id: int) -> None:
+        with self.metadata_cache_lock:
+            self.metadata_cache.pop(int(entry_id), None)
+            self.strength_cache.pop(int(entry_id), None)
+
+    def cached_metadata(self, row) -> Optional[dict[str, Any]]:
+        with self.metadata_cache_lock:
+            cached = self.metadata_cache.get(int(row["id"]))
+        if cached is None or cached[0] != self.normalize_text(row["updated_at"]):
+            return None
+        return cached[1]
+
+    def remember_metadata(self, row, metadata: dict[str, Any]) -> None:
+        with self.metadata_cache_lock:
+            self.metadata_cache[int(row["id"])] = (self.normalize_text(row["updated_at"]), metadata)
+
+    def metadata_from_payload(self, payload: dict[str, Any]) -> dict[str, Any]:
+        return {name: value for name, value in payload.items() if name not in self.secret_payload_fields}
 
     def normalize_text(self, value: object) -> str:
         if value is None:
@@ -112,16 +184,51 @@ class EntryManager:
         if not isinstance(payload["sharing_metadata"], dict):
             payload["sharing_metadata"] = {}
         self.validate_required_fields(payload)
+        payload["password_strength"] = self.password_generator.estimate_strength_score(payload["password"])
+        previous_changed_at = self.normalize_text(source.get("password_changed_at")) or self.normalize_text(
+            source.get("created_at")
+        )
+        if existing_payload is not None and payload["password"] == self.normalize_text(source.get("password")):
+            payload["password_changed_at"] = previous_changed_at or payload["created_at"]
+        else:
+            payload["password_changed_at"] = utc_now_iso() if existing_payload is not None else payload["created_at"]
         return payload
 
-    def encode_with_active_key(self, payload: dict[str, Any]) -> str:
+    def split_payload(self, payload: dict[str, Any]) -> tuple[dict[str, Any], dict[str, Any]]:
+        metadata = self.metadata_from_payload(payload)
+        secret = {name: payload[name] for name in self.secret_payload_fields if name in payload}
+        return metadata, secret
+
+    def encode_payload_with_key(self, payload: dict[str, Any], key: bytes) -> tuple[bytes, bytes]:
+        metadata, secret = self.split_payload(payload)
+        encrypted_data = self.encryption_service.encrypt_payload(
+            metadata,
+            key,
+            associated_data=self.metadata_associated_data,
+        )
+        encrypted_secret = self.encryption_service.encrypt_payload(
+            secret,
+            key,
+            associated_data=self.secret_associated_data,
+        )
+        return encrypted_data, encrypted_secret
+
+    def encode_with_active_key(self, payload: dict[str, Any]) -> tuple[bytes, bytes]:
         key = self.key_manager.get_active_key(key_type="vault_encryption")
-        return self.encryption_service.encrypt_payload(payload, key)
+        return self.encode_payload_with_key(payload, key)
 
-    def decode_with_active_key(self, encrypted_data: str) -> dict[str, Any]:
+    def decode_with_active_key(self, encrypted_data: bytes) -> dict[str, Any]:
         key = self.key_manager.get_active_key(key_type="vault_encryption")
         return self.encryption_service.decrypt_payload(encrypted_data, key)
 
+    @staticmethod
+    def has_ciphertext(value: object) -> bool:
+        if isinstance(value, (bytes, bytearray, memoryview)):
+            return len(value) > 0
+        if isinstance(value, str):
+            return bool(value.strip())
+        return False
+
     def decode_base64_text(self, value: object) -> bytes:
         if isinstance(value, (bytes, bytearray, memoryview)):
             return bytes(value)
@@ -165,17 +272,174 @@ class EntryManager:
         key: bytes,
         legacy_crypto: Optional[EncryptionService] = None,
     ) -> dict[str, Any]:
-        encrypted_data = self.normalize_text(row["encrypted_data"])
-        if encrypted_data:
+        encrypted_data = row["encrypted_data"]
+        encrypted_secret = row["encrypted_secret"]
+        if self.has_ciphertext(encrypted_data) and self.has_ciphertext(encrypted_secret):
+            metadata = self.encryption_service.decrypt_payload(
+                encrypted_data,
+                key,
+                associated_data=self.metadata_associated_data,
+            )
+            secret = self.encryption_service.decrypt_payload(
+                encrypted_secret,
+                key,
+                associated_data=self.secret_associated_data,
+            )
+            return {**metadata, **secret}
+        if self.has_ciphertext(encrypted_data):
             return self.encryption_service.decrypt_payload(encrypted_data, key)
         chosen_legacy_crypto = legacy_crypto or self.legacy_crypto
         if chosen_legacy_crypto is None:
             raise ValueError("Legacy-формат записи не поддерживается без legacy_crypto.")
         return self.decode_legacy_row_payload_with_key(row, key, chosen_legacy_crypto)
 
-    def decode_row_payload(self, row) -> dict[str, Any]:
+    def decode_row_metadata_with_key(
+        self,
+        row,
+        key: bytes,
+        legacy_crypto: Optional[EncryptionService] = None,
+    ) -> dict[str, Any]:
+        # Для строк нового формата секретный шифротекст не расшифровывается вовсе.
+        if self.has_ciphertext(row["encrypted_data"]) and self.has_ciphertext(row["encrypted_secret"]):
+            return self.encryption_service.decrypt_payload(
+                row["encrypted_data"],
+                key,
+                associated_data=self.metadata_associated_data,
+            )
+        return self.metadata_from_payload(self.decode_row_payload_with_key(row, key, legacy_crypto))
+
+    def decode_rows_with_key(
+        self,
+        rows: list,
+        key: bytes,
+        include_secret: bool = True,
+        legacy_crypto: Optional[EncryptionService] = None,
+    ) -> list[Optional[dict[str, Any]]]:
+        # Пакетная версия decode_row_*: строки каждого формата расшифровываются одним
+        # вызовом decrypt_many, неудачные строки дают None на своей позиции.
+        output: list[Optional[dict[str, Any]]] = [None] * len(rows)
+        split_positions: list[int] = []
+        single_positions: list[int] = []
+        for position, row in enumerate(rows):
+            if not self.has_ciphertext(row["encrypted_data"]):
+                try:
+                    payload = self.decode_row_payload_with_key(row, key, legacy_crypto)
+                except Exception:
+                    continue
+                output[position] = payload if include_secret else self.metadata_from_payload(payload)
+            elif self.has_ciphertext(row["encrypted_secret"]):
+                split_positions.append(position)
+            else:
+                single_positions.append(position)
+
+        service = self.encryption_service
+        if split_positions:
+            metadata_results = service.decrypt_many(
+                [rows[position]["encrypted_data"] for position in split_positions],
+                key,
+                associated_data=self.metadata_associated_data,
+            )
+            secret_results = None
+            if include_secret:
+                secret_results = service.decrypt_many(
+                    [rows[position]["encrypted_secret"] for position in split_positions],
+                    key,
+                    associated_data=self.secret_associated_data,
+                )
+            for index, position in enumerate(split_positions):
+                metadata = metadata_results[index].payload
+                if metadata is None:
+                    continue
+                if secret_results is None:
+                    output[position] = metadata
+                    continue
+                secret = secret_results[index].payload
+                if secret is not None:
+                    output[position] = {**metadata, **secret}
+
+        if single_positions:
+            single_results = service.decrypt_many(
+                [rows[position]["encrypted_data"] for position in single_positions],
+                key,
+            )
+            for index, position in enumerate(single_positions):
+                payload = single_results[index].payload
+                if payload is None:
+                    continue
+                output[position] = payload if include_secret else self.metadata_from_payload(payload)
+        return output
+
+    def encode_payloads_with_key(self, payloads: list[dict[str, Any]], key: bytes) -> list[tuple[bytes, bytes]]:
+        split = [self.split_payload(payload) for payload in payloads]
+        encrypted_data = self.encryption_service.encrypt_many(
+            [metadata for metadata, _ in split],
+            key,
+            associated_data=self.metadata_associated_data,
+        )
+        encrypted_secret = self.encryption_service.encrypt_many(
+            [secret for _, secret in split],
+            key,
+            associated_data=self.secret_associated_data,
+        )
+        return list(zip(encrypted_data, encrypted_secret))
+
+    def row_generation(self, row) -> int:
+        return int(row["key_generation"] or self.key_manager.current_key_version)
+
+    def key_for_generation(self, generation: int, active_key: bytes, active_generation: int, conn=None) -> bytes:
+        if int(generation) == int(active_generation):
+            return active_key
+        return self.key_manager.retired_data_key(generation, active_key, active_generation, conn=conn)
+
+    def key_for_row(self, row, conn=None) -> bytes:
+        # conn - транзакция, из которой прочитана строка: поколение ключа читается
+        # тем же снимком и без второго соединения из пула.
+        key = self.key_manager.get_active_key(key_type="vault_encryption")
+        return self.key_for_generation(
+            self.row_generation(row),
+            key,
+            self.key_manager.data_key_generation(conn),
+            conn=conn,
+        )
+
+    def decode_row_payload(self, row, conn=None) -> dict[str, Any]:
+        return self.decode_row_payload_with_key(row, self.key_for_row(row, conn))
+
+    def decode_row_metadata(self, row, conn=None) -> dict[str, Any]:
+        return self.decode_row_metadata_with_key(row, self.key_for_row(row, conn))
+
+    def decode_rows(
+        self,
+        rows: list,
+        include_secret: bool = True,
+        legacy_crypto: Optional[EncryptionService] = None,
+        conn=None,
+    ) -> list[Optional[dict[str, Any]]]:
+        # Во время перешифрования в таблице есть строки двух поколений ключа:
+        # каждое поколение расшифровывается своим ключом. conn - как в key_for_row().
         key = self.key_manager.get_active_key(key_type="vault_encryption")
-        return self.decode_row_payload_with_key(row, key)
+        active_generation = self.key_manager.data_key_generation(conn)
+        groups: dict[int, list[int]] = {}
+        for position, row in enumerate(rows):
+            groups.setdefault(self.row_generation(row), []).append(position)
+        if not groups or list(groups) == [active_generation]:
+            return self.decode_rows_with_key(rows, key, include_secret=include_secret, legacy_crypto=legacy_crypto)
+
+        output: list[Optional[dict[str, Any]]] = [None] * len(rows)
+        for generation, positions in groups.items():
+            try:
+                generation_key = self.key_for_generation(generation, key, active_generation, conn=conn)
+            except ValueError:
+                continue
+            decoded = self.decode_rows_with_key(
+                [rows[position] for position in positions],
+                generation_key,
+                include_secret=include_secret,
+                legacy_crypto=legacy_crypto,
+            )
+            for position, payload in zip(positions, decoded):
+                output[position] = payload
+        return output
 
     def build_entry_dict(
         self,
@@ -200,10 +464,38 @@ class EntryManager:
             "created_at": self.normalize_text(row["created_at"]) or self.normalize_text(payload.get("created_at")),
             "updated_at": self.normalize_text(row["updated_at"]),
             "version": int(payload.get("version", 1) or 1),
-            "totp_secret": self.normalize_text(payload.get("totp_secret")),
-            "sharing_metadata": payload.get("sharing_metadata", {}),
+            "totp_secret": self.normalize_text(payload.get("totp_secret")) if include_sensitive else "",
+            "sharing_metadata": payload.get("sharing_metadata", {}) if include_sensitive else {},
+            "password_strength": self.stored_password_strength(payload),
+            "password_changed_at": self.normalize_text(payload.get("password_changed_at")),
         }
 
+    @staticmethod
+    def stored_password_strength(payload: dict[str, Any]) -> Optional[int]:
+        value = payload.get("password_strength")
+        if type(value) is not int:
+            return None
+        return value
+
+    def password_strength(self, entry: dict[str, Any]) -> int:
+        stored = self.stored_password_strength(entry)
+        if stored is not None:
+            return stored
+        entry_id = int(entry["id"])
+        updated_at = self.normalize_text(entry.get("updated_at"))
+        with self.metadata_cache_lock:
+            cached = self.strength_cache.get(entry_id)
+        if cached is not None and cached[0] == updated_at:
+            return cached[1]
+        try:
+            password = self.get_entry(entry_id)["password"]
+        except ValueError:
+            return 0
+        score = self.password_generator.estimate_strength_score(password)
+        with self.metadata_cache_lock:
+            self.strength_cache[entry_id] = (updated_at, score)
+        return score
+
     def create_entry(self, data_dict: dict[str, Any]) -> dict[str, Any]:
         if not isinstance(data_dict, dict):
             raise TypeError("data_dict должен быть словарем.")
@@ -212,13 +504,14 @@ class EntryManager:
         updated_at = created_at
         payload = self.normalize_entry_payload(data_dict, existing_payload=None, created_at=created_at)
         tags = self.normalize_tags(data_dict.get("tags", ""))
-        encrypted_data = self.encode_with_active_key(payload)
+        encrypted_data, encrypted_secret = self.encode_with_active_key(payload)
 
         with self.db.session() as conn:
             cur = conn.execute(
                 """
                 INSERT INTO vault_entries (
                     encrypted_data,
+                    encrypted_secret,
                     title,
                     username,
                     encrypted_password,
@@ -226,12 +519,14 @@ class EntryManager:
                     notes,
                     created_at,
                     updated_at,
-                    tags
+                    tags,
+                    key_generation
                 )
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                 """,
                 (
                     encrypted_data,
+                    encrypted_secret,
                     None,
                     None,
                     None,
@@ -240,10 +535,14 @@ class EntryManager:
                     created_at,
                     updated_at,
                     tags,
+                    self.key_manager.data_key_generation(conn),
                 ),
             )
             entry_id = int(cur.lastrowid)
+            self.search_index.replace_entry_tokens(conn, entry_id, self.metadata_from_payload(payload))
 
+        self.invalidate_metadata(entry_id)
+        self.fuzzy_index.put(entry_id, self.searchable_text(payload))
         result = {
             **payload,
             "id": entry_id,
@@ -256,10 +555,10 @@ class EntryManager:
         return result
 
     def get_entry(self, entry_id: int) -> dict[str, Any]:
-        with self.db.session() as conn:
+        with self.db.read_session() as conn:
             row = conn.execute(
-                """
-                SELECT id, encrypted_data, title, username, encrypted_password, url, notes, created_at, updated_at, tags
+                f"""
+                SELECT {self.entry_columns}
                 FROM vault_entries
                 WHERE id = ?
                 """,
@@ -273,23 +572,176 @@ class EntryManager:
             raise ValueError("Запись недоступна.") from exc
         return self.build_entry_dict(row, payload, include_sensitive=True, include_notes=True)
 
+    def iter_row_batches(self, batch_size: Optional[int] = None) -> Iterator[list]:
+        # Каждая пачка - отдельный keyset-запрос в своей сессии чтения: пока
+        # вызывающий обрабатывает пачку, соединение пула не удерживается.
+        size = max(1, int(batch_size or self.iter_batch_size))
+        after: Optional[tuple[str, int]] = None
+        while True:
+            rows = self.page_rows(size, after=after)
+            if rows:
+                yield rows
+            if len(rows) < size:
+                return
+            after = (self.normalize_text(rows[-1]["updated_at"]), int(rows[-1]["id"]))
+
+    def iter_entries(
+        self,
+        batch_size: Optional[int] = None,
+        include_sensitive: bool = False,
+        include_notes: bool = False,
+    ) -> Iterator[dict[str, Any]]:
+        # В памяти одновременно только одна пачка строк: она расшифровывается
+        # одним decode_rows и отдается по записи.
+        for rows in self.iter_row_batches(batch_size):
+            yield from self.build_entries_from_rows(rows, include_sensitive, include_notes)
+
     def get_all_entries(
         self,
         include_sensitive: bool = False,
         include_notes: bool = False,
     ) -> list[dict[str, Any]]:
-        with self.db.session() as conn:
-            rows = conn.execute(
-                """
-                SELECT id, encrypted_data, title, username, encrypted_password, url, notes, created_at, updated_at, tags
+        return list(self.iter_entries(include_sensitive=include_sensitive, include_notes=include_notes))
+
+    def get_page(
+        self,
+        limit: int,
+        after: Optional[tuple[str, int]] = None,
+        include_sensitive: bool = False,
+        include_notes: bool = False,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+    ) -> tuple[list[dict[str, Any]], Optional[tuple[str, int]]]:
+        # Курсор следующей страницы берется по последней прочитанной строке, а не по
+        # последней расшифрованной: страница нерасшифровываемых строк не обрывает
+        # листание. None - строк дальше нет.
+        rows = self.page_rows(limit, after=after, date_from=date_from, date_to=date_to)
+        next_cursor = None
+        if len(rows) >= max(1, int(limit)):
+            next_cursor = (self.normalize_text(rows[-1]["updated_at"]), int(rows[-1]["id"]))
+        return self.build_entries_from_rows(rows, include_sensitive, include_notes), next_cursor
+
+    def page_rows(
+        self,
+        limit: int,
+        after: Optional[tuple[str, int]] = None,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+    ) -> list:
+        # Keyset-пагинация: курсор - (updated_at, id) последней записи прошлой страницы.
+        # id - это rowid, поэтому idx_vault_updated_at уже упорядочен по этой паре
+        # и страница читается из индекса без сортировки и без OFFSET.
+        conditions: list[str] = []
+        params: list[Any] = []
+        if after is not None:
+            updated_at, entry_id = after
+            conditions.append("(updated_at, id) < (?, ?)")
+            params.extend((self.normalize_text(updated_at), int(entry_id)))
+        if date_from:
+            conditions.append("updated_at >= ?")
+            params.append(date_from)
+        if date_to:
+            conditions.append("updated_at <= ?")
+            params.append(date_to)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        with self.db.read_session() as conn:
+            return conn.execute(
+                f"""
+                SELECT {self.entry_columns}
                 FROM vault_entries
+                {where}
                 ORDER BY updated_at DESC, id DESC
-                """
+                LIMIT ?
+                """,
+                (*params, max(1, int(limit))),
             ).fetchall()
+
+    def count_entries(self, date_from: Optional[str] = None, date_to: Optional[str] = None) -> int:
+        conditions: list[str] = []
+        params: list[str] = []
+        if date_from:
+            conditions.append("updated_at >= ?")
+            params.append(date_from)
+        if date_to:
+            conditions.append("updated_at <= ?")
+            params.append(date_to)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        with self.db.read_session() as conn:
+            return int(conn.execute(f"SELECT COUNT(*) FROM vault_entries {where}", tuple(params)).fetchone()[0])
+
+    def get_entries_by_ids(
+        self,
+        entry_ids: list[int],
+        include_sensitive: bool = False,
+        include_notes: bool = False,
+    ) -> list[dict[str, Any]]:
+        rows: list = []
+        ids = [int(entry_id) for entry_id in entry_ids]
+        with self.db.read_session() as conn:
+            for start in range(0, len(ids), 500):
+                chunk = ids[start : start + 500]
+                placeholders = ", ".join("?" for _ in chunk)
+                rows.extend(
+                    conn.execute(
+                        f"""
+                        SELECT {self.entry_columns}
+                        FROM vault_entries
+                        WHERE id IN ({placeholders})
+                        """,
+                        tuple(chunk),
+                    ).fetchall()
+                )
+        rows.sort(key=lambda row: (self.normalize_text(row["updated_at"]), int(row["id"])), reverse=True)
+        return self.build_entries_from_rows(rows, include_sensitive, include_notes)
+
+    def build_entries_from_rows(
+        self,
+        rows: list,
+        include_sensitive: bool,
+        include_notes: bool,
+        strict: bool = False,
+        conn=None,
+    ) -> list[dict[str, Any]]:
+        # Для списков и поиска нерасшифрованные строки пропускаются. strict=True
+        # (экспорт) вместо пропуска поднимает ошибку: архив не должен молча терять записи.
+        if not self.key_manager.has_cached_key():
+            self.clear_metadata_cache()
+            if strict:
+                raise RuntimeError("Хранилище заблокировано.")
+            return []
+        payloads: list[Optional[dict[str, Any]]] = [None] * len(rows)
+        missing_positions: list[int] = []
+        for position, row in enumerate(rows):
+            if not include_sensitive:
+                payloads[position] = self.cached_metadata(row)
+            if payloads[position] is None:
+                missing_positions.append(position)
+
+        if missing_positions:
+            try:
+                decoded = self.decode_rows(
+                    [rows[position] for position in missing_positions],
+                    include_secret=include_sensitive,
+                    conn=conn,
+                )
+            except RuntimeError:
+                self.clear_metadata_cache()
+                if strict:
+                    raise
+                return []
+            for position, payload in zip(missing_positions, decoded):
+                if payload is None:
+                    continue
+                payloads[position] = payload
+                self.remember_metadata(rows[position], self.metadata_from_payload(payload))
+
         output: list[dict[str, Any]] = []
-        for row in rows:
+        for row, payload in zip(rows, payloads):
+            if payload is None:
+                if strict:
+                    raise ValueError(f"Запись {int(row['id'])} не расшифровывается.")
+                continue
             try:
-                payload = self.decode_row_payload(row)
                 output.append(
                     self.build_entry_dict(
                         row=row,
@@ -298,18 +750,62 @@ class EntryManager:
                         include_notes=include_notes,
                     )
                 )
-            except Exception:
+            except Exception as exc:
+                if strict:
+                    raise ValueError(f"Запись {int(row['id'])} не расшифровывается.") from exc
                 continue
         return output
 
+    def ensure_search_index(self) -> None:
+        if self.search_index_ready:
+            return
+        # Дозаполнение идет порциями в отдельных транзакциях, чтобы первый поиск
+        # по большому хранилищу не держал писателя на все время перестройки.
+        index_key = self.search_index.index_key()
+        with self.db.read_session() as conn:
+            missing_ids = self.search_index.missing_entry_ids(conn)
+        for start in range(0, len(missing_ids), self.reencrypt_chunk_size):
+            chunk = missing_ids[start : start + self.reencrypt_chunk_size]
+            placeholders = ", ".join("?" for _ in chunk)
+            with self.db.session() as conn:
+                rows = conn.execute(
+                    f"""
+                    SELECT {self.entry_columns}
+                    FROM vault_entries
+                    WHERE id IN ({placeholders})
+                    """,
+                    tuple(chunk),
+                ).fetchall()
+                decoded = self.decode_rows(rows, include_secret=False, conn=conn)
+                self.search_index.replace_entries_tokens(
+                    conn,
+                    [(int(row["id"]), metadata) for row, metadata in zip(rows, decoded) if metadata is not None],
+                    key=index_key,
+                )
+        self.search_index_ready = True
+
+    def indexed_candidate_ids(self, free_text: str) -> Optional[list[int]]:
+        if not free_text:
+            return None
+        # Пока идет перешифрование, токены еще не обработанных записей построены
+        # прежним ключом: поиск идет полным проходом, задание само обновит токены.
+        if self.pending_reencryption() is not None:
+            return None
+        try:
+            self.ensure_search_index()
+            with self.db.read_session() as conn:
+                return self.search_index.candidate_ids(conn, free_text)
+        except RuntimeError:
+            return None
+
     def update_entry(self, entry_id: int, data_dict: dict[str, Any]) -> dict[str, Any]:
         if not isinstance(data_dict, dict):
             raise TypeError("data_dict должен быть словарем.")
 
         with self.db.session() as conn:
             row = conn.execute(
-                """
-                SELECT id, encrypted_data, title, username, encrypted_password, url, notes, created_at, updated_at, tags
+                f"""
+                SELECT {self.entry_columns}
                 FROM vault_entries
                 WHERE id = ?
                 """,
@@ -319,7 +815,7 @@ class EntryManager:
                 raise ValueError("Запись недоступна.")
 
             try:
-                existing_payload = self.decode_row_payload(row)
+                existing_payload = self.decode_row_payload(row, conn)
             except Exception as exc:
                 raise ValueError("Запись недоступна.") from exc
 
@@ -330,16 +826,18 @@ class EntryManager:
             )
             tags = self.normalize_tags(data_dict.get("tags", row["tags"]))
             updated_at = utc_now_iso()
-            encrypted_data = self.encode_with_active_key(payload)
+            encrypted_data, encrypted_secret = self.encode_with_active_key(payload)
 
             conn.execute(
                 """
                 UPDATE vault_entries
-                SET encrypted_data = ?, title = ?, username = ?, encrypted_password = ?, url = ?, notes = ?, tags = ?, updated_at = ?
+                SET encrypted_data = ?, encrypted_secret = ?, title = ?, username = ?, encrypted_password = ?,
+                    url = ?, notes = ?, tags = ?, updated_at = ?, key_generation = ?
                 WHERE id = ?
                 """,
                 (
                     encrypted_data,
+                    encrypted_secret,
                     None,
                     None,
                     None,
@@ -347,10 +845,14 @@ class EntryManager:
                     None,
                     tags,
                     updated_at,
+                    self.key_manager.data_key_generation(conn),
                     int(entry_id),
                 ),
             )
+            self.search_index.replace_entry_tokens(conn, int(entry_id), self.metadata_from_payload(payload))
 
+        self.invalidate_metadata(int(entry_id))
+        self.fuzzy_index.put(int(entry_id), self.searchable_text(payload))
         result = {
             **payload,
             "id": int(entry_id),
@@ -362,11 +864,179 @@ class EntryManager:
             self.bus.publish(EntryUpdated(title=result["title"], entry_id=int(entry_id)))
         return result
 
+    def bulk_chunks(self, count: int, chunk_size: Optional[int]) -> Iterator[range]:
+        # Без chunk_size весь вызов - одна транзакция; иначе коммит после каждой порции.
+        size = max(1, int(chunk_size)) if chunk_size else max(1, count)
+        for start in range(0, count, size):
+            yield range(start, min(count, start + size))
+
+    def create_entries(self, items: Iterable[dict[str, Any]], chunk_size: Optional[int] = None) -> list[dict[str, Any]]:
+        # Все записи проверяются до первой вставки; порция шифруется пачкой через
+        # encrypt_many и пишется одним executemany, событие публикуется одно на вызов.
+        data_dicts = list(items)
+        for data_dict in data_dicts:
+            if not isinstance(data_dict, dict):
+                raise TypeError("data_dict должен быть словарем.")
+        created_at = utc_now_iso()
+        payloads = [
+            self.normalize_entry_payload(data_dict, existing_payload=None, created_at=created_at)
+            for data_dict in data_dicts
+        ]
+        tags = [self.normalize_tags(data_dict.get("tags", "")) for data_dict in data_dicts]
+
+        results: list[dict[str, Any]] = []
+        try:
+            for chunk in self.bulk_chunks(len(payloads), chunk_size):
+                results.extend(
+                    self.insert_normalized_entries(
+                        [payloads[position] for position in chunk],
+                        [tags[position] for position in chunk],
+                        created_at,
+                    )
+                )
+        finally:
+            if self.bus is not None and results:
+                self.bus.publish(EntriesCreated(entry_ids=tuple(int(result["id"]) for result in results)))
+        return results
+
+    def insert_normalized_entries(
+        self,
+        payloads: list[dict[str, Any]],
+        tags: list[str],
+        created_at: str,
+    ) -> list[dict[str, Any]]:
+        # Одна транзакция на вызов; payloads уже прошли normalize_entry_payload. Событий не публикует.
+        if not payloads:
+            return []
+        key = self.key_manager.get_active_key(key_type="vault_encryption")
+        encoded = self.encode_payloads_with_key(payloads, key)
+        with self.db.session() as conn:
+            generation = self.key_manager.data_key_generation(conn)
+            # id берется у каждой вставки: порядок RETURNING для многострочной вставки
+            # не гарантирован, а подряд идущие id ничем не обещаны.
+            entry_ids: list[int] = []
+            for entry_tags, (encrypted_data, encrypted_secret) in zip(tags, encoded):
+                cursor = conn.execute(
+                    """
+                    INSERT INTO vault_entries (
+                        encrypted_data,
+                        encrypted_secret,
+                        created_at,
+                        updated_at,
+                        tags,
+                        key_generation
+                    )
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    """,
+                    (encrypted_data, encrypted_secret, created_at, created_at, entry_tags, generation),
+                )
+                entry_ids.append(int(cursor.lastrowid))
+            self.search_index.replace_entries_tokens(
+                conn,
+                [(entry_id, self.metadata_from_payload(payload)) for entry_id, payload in zip(entry_ids, payloads)],
+            )
+        results: list[dict[str, Any]] = []
+        for entry_id, entry_tags, payload in zip(entry_ids, tags, payloads):
+            self.invalidate_metadata(entry_id)
+            self.fuzzy_index.put(entry_id, self.searchable_text(payload))
+            results.append(
+                {
+                    **payload,
+                    "id": entry_id,
+                    "domain": domain_from_url(payload.get("url", "")),
+                    "tags": entry_tags,
+                    "updated_at": created_at,
+                }
+            )
+        return results
+
+    def update_entries(self, changes: dict[int, dict[str, Any]], chunk_size: Optional[int] = None) -> list[dict[str, Any]]:
+        items = [(int(entry_id), data_dict) for entry_id, data_dict in changes.items()]
+        for _, data_dict in items:
+            if not isinstance(data_dict, dict):
+                raise TypeError("data_dict должен быть словарем.")
+
+        results: list[dict[str, Any]] = []
+        try:
+            for chunk in self.bulk_chunks(len(items), chunk_size):
+                chunk_items = [items[position] for position in chunk]
+                ids = [entry_id for entry_id, _ in chunk_items]
+                key = self.key_manager.get_active_key(key_type="vault_encryption")
+                updated_at = utc_now_iso()
+                with self.db.session() as conn:
+                    rows_by_id: dict[int, Any] = {}
+                    for start in range(0, len(ids), 500):
+                        part = ids[start : start + 500]
+                        placeholders = ", ".join("?" for _ in part)
+                        for row in conn.execute(
+                            f"""
+                            SELECT {self.entry_columns}
+                            FROM vault_entries
+                            WHERE id IN ({placeholders})
+                            """,
+                            tuple(part),
+                        ):
+                            rows_by_id[int(row["id"])] = row
+                    if len(rows_by_id) != len(set(ids)):
+                        raise ValueError("Запись недоступна.")
+                    rows = [rows_by_id[entry_id] for entry_id in ids]
+                    existing_payloads = self.decode_rows(rows, include_secret=True, conn=conn)
+                    if any(existing is None for existing in existing_payloads):
+                        raise ValueError("Запись недоступна.")
+
+                    payloads: list[dict[str, Any]] = []
+                    tags: list[str] = []
+                    for (_, data_dict), row, existing_payload in zip(chunk_items, rows, existing_payloads):
+                        payloads.append(
+                            self.normalize_entry_payload(
+                                data_dict,
+                                existing_payload=existing_payload,
+                                created_at=self.normalize_text(existing_payload.get("created_at"))
+                                or self.normalize_text(row["created_at"]),
+                            )
+                        )
+                        tags.append(self.normalize_tags(data_dict.get("tags", row["tags"])))
+                    encoded = self.encode_payloads_with_key(payloads, key)
+                    generation = self.key_manager.data_key_generation(conn)
+                    conn.executemany(
+                        """
+                        UPDATE vault_entries
+                        SET encrypted_data = ?, encrypted_secret = ?, title = NULL, username = NULL,
+                            encrypted_password = NULL, url = NULL, notes = NULL, tags = ?, updated_at = ?,
+                            key_generation = ?
+                        WHERE id = ?
+                        """,
+                        [
+                            (encrypted_data, encrypted_secret, entry_tags, updated_at, generation, entry_id)
+                            for entry_id, entry_tags, (encrypted_data, encrypted_secret) in zip(ids, tags, encoded)
+                        ],
+                    )
+                    self.search_index.replace_entries_tokens(
+                        conn,
+                        [(entry_id, self.metadata_from_payload(payload)) for entry_id, payload in zip(ids, payloads)],
+                    )
+                for entry_id, entry_tags, payload in zip(ids, tags, payloads):
+                    self.invalidate_metadata(entry_id)
+                    self.fuzzy_index.put(entry_id, self.searchable_text(payload))
+                    results.append(
+                        {
+                            **payload,
+                            "id": entry_id,
+                            "domain": domain_from_url(payload.get("url", "")),
+                            "tags": entry_tags,
+                            "updated_at": updated_at,
+                        }
+                    )
+        finally:
+            if self.bus is not None and results:
+                self.bus.publish(EntriesUpdated(entry_ids=tuple(int(result["id"]) for result in results)))
+        return results
+
     def delete_entry(self, entry_id: int, soft_delete: bool = True) -> None:
         with self.db.session() as conn:
             row = conn.execute(
-                """
-                SELECT id, encrypted_data, title, username, encrypted_password, url, notes, created_at, updated_at, tags
+                f"""
+                SELECT {self.entry_columns}
                 FROM vault_entries
                 WHERE id = ?
                 """,
@@ -375,11 +1045,16 @@ class EntryManager:
             if row is None:
                 raise ValueError("Запись недоступна.")
 
-            payload = self.decode_row_payload(row)
-            title = self.normalize_text(payload.get("title"))
-            encrypted_data = self.normalize_text(row["encrypted_data"])
-            if not encrypted_data:
-                encrypted_data = self.encode_with_active_key(payload)
+            encrypted_data = row["encrypted_data"]
+            encrypted_secret = row["encrypted_secret"] if self.has_ciphertext(row["encrypted_secret"]) else None
+            key_generation = self.row_generation(row)
+            if self.has_ciphertext(encrypted_data):
+                title = self.normalize_text(self.decode_row_metadata(row, conn).get("title"))
+            else:
+                payload = self.decode_row_payload(row, conn)
+                title = self.normalize_text(payload.get("title"))
+                encrypted_data, encrypted_secret = self.encode_with_active_key(payload)
+                key_generation = self.key_manager.data_key_generation(conn)
 
             if soft_delete:
                 deleted_at = utc_now_iso()
@@ -389,30 +1064,161 @@ class EntryManager:
                     INSERT INTO deleted_entries (
                         source_entry_id,
                         encrypted_data,
+                        encrypted_secret,
                         tags,
                         created_at,
                         updated_at,
                         deleted_at,
-                        expires_at
+                        expires_at,
+                        key_generation
                     )
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
                     """,
                     (
                         int(entry_id),
                         encrypted_data,
+                        encrypted_secret,
                         self.normalize_tags(row["tags"]),
                         self.normalize_text(row["created_at"]) or utc_now_iso(),
                         self.normalize_text(row["updated_at"]) or utc_now_iso(),
                         deleted_at,
                         expires_at,
+                        key_generation,
                     ),
                 )
 
             conn.execute("DELETE FROM vault_entries WHERE id = ?", (int(entry_id),))
 
+        self.invalidate_metadata(int(entry_id))
+        self.fuzzy_index.discard(int(entry_id))
         if self.bus is not None:
             self.bus.publish(EntryDeleted(title=title, entry_id=int(entry_id)))
 
+    def list_deleted(self, limit: int, after: Optional[tuple[str, int]] = None) -> list[dict[str, Any]]:
+        # Корзина по убыванию deleted_at; курсор - (deleted_at, trash_id) последней строки,
+        # как у get_page. Нерасшифровываемые строки отдаются без метаданных, чтобы их
+        # можно было хотя бы увидеть и дождаться очистки.
+        condition = ""
+        params: list[Any] = []
+        if after is not None:
+            deleted_at, trash_id = after
+            condition = "WHERE (deleted_at, id) < (?, ?)"
+            params.extend((self.normalize_text(deleted_at), int(trash_id)))
+        with self.db.read_session() as conn:
+            rows = conn.execute(
+                f"""
+                SELECT {self.deleted_entry_columns}
+                FROM deleted_entries
+                {condition}
+                ORDER BY deleted_at DESC, id DESC
+                LIMIT ?
+                """,
+                (*params, max(1, int(limit))),
+            ).fetchall()
+        if not rows:
+            return []
+        metadata = self.decode_rows(rows, include_secret=False)
+        output: list[dict[str, Any]] = []
+        for row, payload in zip(rows, metadata):
+            payload = payload or {}
+            output.append(
+                {
+                    **payload,
+                    "id": int(row["id"]),
+                    "trash_id": int(row["trash_id"]),
+                    "domain": domain_from_url(self.normalize_text(payload.get("url"))),
+                    "tags": self.normalize_tags(row["tags"]),
+                    "created_at": self.normalize_text(row["created_at"]),
+                    "updated_at": self.normalize_text(row["updated_at"]),
+                    "deleted_at": self.normalize_text(row["deleted_at"]),
+                    "expires_at": self.normalize_text(row["expires_at"]),
+                }
+            )
+        return output
+
+    def count_deleted(self) -> int:
+        with self.db.read_session() as conn:
+            return int(conn.execute("SELECT COUNT(*) FROM deleted_entries").fetchone()[0])
+
+    def restore_entry(self, entry_id: int) -> None:
+        self.restore_entries([entry_id])
+
+    def restore_entries(self, entry_ids: Iterable[int]) -> list[int]:
+        # Записи возвращаются под прежним id (AUTOINCREMENT его не переиспользует)
+        # с тем же шифротекстом и поколением ключа; перешифровывать нечего.
+        # updated_at ставится текущим, чтобы запись попала в инкрементную копию.
+        ids = list(dict.fromkeys(int(entry_id) for entry_id in entry_ids))
+        if not ids:
+            return []
+        restored_at = utc_now_iso()
+        with self.db.session() as conn:
+            latest: dict[int, Any] = {}
+            for start in range(0, len(ids), self.iter_batch_size):
+                part = ids[start : start + self.iter_batch_size]
+                placeholders = ", ".join("?" for _ in part)
+                for row in conn.execute(
+                    f"""
+                    SELECT {self.deleted_entry_columns}
+                    FROM deleted_entries
+                    WHERE source_entry_id IN ({placeholders})
+                    ORDER BY id
+                    """,
+                    part,
+                ):
+                    latest[int(row["id"])] = row
+            if len(latest) != len(ids):
+                raise ValueError("Запись недоступна.")
+            rows = [latest[entry_id] for entry_id in ids]
+            metadata = self.decode_rows(rows, include_secret=False, conn=conn)
+            if any(payload is None for payload in metadata):
+                raise ValueError("Запись недоступна.")
+            conn.executemany(
+                """
+                INSERT INTO vault_entries (
+                    id, encrypted_data, encrypted_secret, created_at, updated_at, tags, key_generation
+                )
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                [
+                    (
+                        int(row["id"]),
+                        row["encrypted_data"],
+                        row["encrypted_secret"],
+                        self.normalize_text(row["created_at"]) or restored_at,
+                        restored_at,
+                        self.normalize_tags(row["tags"]),
+                        self.row_generation(row),
+                    )
+                    for row in rows
+                ],
+            )
+            conn.executemany("DELETE FROM deleted_entries WHERE source_entry_id = ?", [(entry_id,) for entry_id in ids])
+            self.search_index.replace_entries_tokens(conn, list(zip(ids, metadata)))
+
+        for entry_id, payload in zip(ids, metadata):
+            self.invalidate_metadata(entry_id)
+            self.fuzzy_index.put(entry_id, self.searchable_text(payload))
+        if self.bus is not None:
+            self.bus.publish(EntriesRestored(entry_ids=tuple(ids)))
+        return ids
+
+    def purge_expired_batch(self, limit: Optional[int] = None, now: Optional[str] = None) -> int:
+        # Одна короткая транзакция на порцию: писатель интерфейса ждет не дольше порции.
+        with self.db.session() as conn:
+            cursor = conn.execute(
+                """
+                DELETE FROM deleted_entries
+                WHERE id IN (
+                    SELECT id FROM deleted_entries
+                    WHERE expires_at <= ?
+                    ORDER BY expires_at
+                    LIMIT ?
+                )
+                """,
+                (now or utc_now_iso(), max(1, int(limit or self.purge_batch_size))),
+            )
+            return int(cursor.rowcount)
+
     def parse_query_filters(self, query: str) -> tuple[dict[str, str], str]:
         if not query:
             return {}, ""
@@ -432,29 +1238,33 @@ class EntryManager:
         ned = needle.lower()
         if ned in hay:
             return True
-        tokens = [token for token in re.split(r"\s+", hay) if token]
-        if not tokens:
+        if len(ned) < self.fuzzy_index.min_query_length:
             return False
-        query_len = len(ned)
-        if query_len < 4:
+        return any(self.fuzzy_index.token_matches(token, ned) for token in self.fuzzy_index.split_tokens(hay))
+
+    def searchable_text(self, entry: dict[str, Any]) -> str:
+        return " ".join(
+            [
+                self.normalize_text(entry.get("title")),
+                self.normalize_text(entry.get("username")),
+                self.normalize_text(entry.get("url")),
+                self.normalize_text(entry.get("notes")),
+            ]
+        ).lower()
+
+    def ensure_fuzzy_index(self) -> bool:
+        if self.fuzzy_index.ready:
+            return True
+        if not self.key_manager.has_cached_key():
             return False
-        query_first = ned[0]
+        entries = self.get_all_entries(include_sensitive=False, include_notes=True)
+        self.fuzzy_index.build((int(entry["id"]), self.searchable_text(entry)) for entry in entries)
+        return True
 
-        for token in tokens:
-            if not token:
-                continue
-            if token[0] != query_first:
-                continue
-            token_len = len(token)
-            if abs(token_len - query_len) > 2 and ned not in token and token not in ned:
-                continue
-            quick = difflib.SequenceMatcher(a=token, b=ned).quick_ratio()
-            if quick < 0.72:
-                continue
-            ratio = difflib.SequenceMatcher(a=token, b=ned).ratio()
-            if ratio >= 0.84:
-                return True
-        return False
+    def fuzzy_candidate_ids(self, free_text: str) -> Optional[list[int]]:
+        if not self.ensure_fuzzy_index():
+            return None
+        return sorted(self.fuzzy_index.matching_entry_ids(free_text))
 
     def entry_matches_filters(
         self,
@@ -469,116 +1279,340 @@ class EntryManager:
                 return False
         if not free_text:
             return True
-        searchable = " ".join(
-            [
-                self.normalize_text(entry.get("title")),
-                self.normalize_text(entry.get("username")),
-                self.normalize_text(entry.get("url")),
-                self.normalize_text(entry.get("notes")),
-            ]
-        ).lower()
+        searchable = self.searchable_text(entry)
         if free_text.lower() in searchable:
             return True
         if not use_fuzzy:
             return False
         return self.fuzzy_contains(searchable, free_text)
 
+    def entry_passes_filters(
+        self,
+        entry: dict[str, Any],
+        tags_filter: set[str],
+        date_from: Optional[str],
+        date_to: Optional[str],
+    ) -> bool:
+        if tags_filter:
+            entry_tags = {item.strip().lower() for item in self.normalize_tags(entry.get("tags")).split(",") if item.strip()}
+            if not entry_tags.intersection(tags_filter):
+                return False
+
+        updated_at = self.normalize_text(entry.get("updated_at"))
+        if date_from and updated_at and updated_at < date_from:
+            return False
+        if date_to and updated_at and updated_at > date_to:
+            return False
+        return True
+
+    def score_entry(self, entry: dict[str, Any], free_text: str) -> int:
+        # Каждое слово запроса засчитывается по лучшему полю: точное совпадение
+        # поля дороже префикса поля, префикс дороже начала слова и подстроки.
+        score = 0
+        phrase = free_text.lower()
+        values = {name: self.normalize_text(entry.get(name)).lower() for name in self.search_field_weights}
+        for term in phrase.split():
+            best = 0
+            for field_name, weight in self.search_field_weights.items():
+                value = values[field_name]
+                if term not in value:
+                    continue
+                if value == term:
+                    strength = 4
+                elif value.startswith(term):
+                    strength = 3
+                elif any(word.startswith(term) for word in self.search_index.words(value)):
+                    strength = 2
+                else:
+                    strength = 1
+                best = max(best, weight * strength)
+            score += best
+        if phrase and values["title"] == phrase:
+            score += self.search_field_weights["title"] * 4
+        return score
+
+    def select_page(
+        self,
+        entries: Iterable[dict[str, Any]],
+        free_text: str,
+        ranked: bool,
+        limit: Optional[int],
+        offset: int,
+    ) -> list[dict[str, Any]]:
+        start = max(0, int(offset))
+        stop = None if limit is None else start + max(0, int(limit))
+        if not ranked:
+            return list(islice(entries, start, stop))
+        if stop is None:
+            ranked_entries = list(entries)
+            stop = len(ranked_entries)
+            entries = ranked_entries
+        if stop == 0:
+            return []
+        # Ограниченная куча: сортируется только нужный префикс выдачи.
+        top = heapq.nlargest(
+            stop,
+            entries,
+            key=lambda entry: (
+                self.score_entry(entry, free_text),
+                self.normalize_text(entry.get("updated_at")),
+                int(entry["id"]),
+            ),
+        )
+        return top[start:stop]
+
     def search_entries(
         self,
         query: str,
         tags: Optional[list[str]] = None,
         date_from: Optional[str] = None,
         date_to: Optional[str] = None,
+        entry_filter: Optional[Callable[[dict[str, Any]], bool]] = None,
+        ranked: bool = False,
+        limit: Optional[int] = None,
+        offset: int = 0,
     ) -> list[dict[str, Any]]:
         filters, free_text = self.parse_query_filters(query or "")
-        entries = self.get_all_entries(include_sensitive=False, include_notes=True)
+        # Слепой индекс сужает точный поиск, индекс токенов в памяти сужает fuzzy-проход.
+        candidate_ids = self.indexed_candidate_ids(free_text)
+        if candidate_ids is None:
+            entries = self.get_all_entries(include_sensitive=False, include_notes=True)
+        else:
+            entries = self.get_entries_by_ids(candidate_ids, include_sensitive=False, include_notes=True)
 
-        exact_matches: list[dict[str, Any]] = []
         tags_filter = {self.normalize_text(item).lower() for item in (tags or []) if self.normalize_text(item)}
+        output = [
+            entry
+            for entry in entries
+            if self.entry_passes_filters(entry, tags_filter, date_from, date_to)
+            and self.entry_matches_filters(entry, filters, free_text, use_fuzzy=False)
+        ]
 
-        for entry in entries:
-            if tags_filter:
-                entry_tags = {item.strip().lower() for item in self.normalize_tags(entry.get("tags")).split(",") if item.strip()}
-                if not entry_tags.intersection(tags_filter):
-                    continue
-
-            updated_at = self.normalize_text(entry.get("updated_at"))
-            if date_from and updated_at and updated_at < date_from:
-                continue
-            if date_to and updated_at and updated_at > date_to:
-                continue
-
-            if not self.entry_matches_filters(entry, filters, free_text, use_fuzzy=False):
-                continue
-            exact_matches.append(entry)
-
-        output = exact_matches
-        if free_text and not exact_matches:
-            fuzzy_matches: list[dict[str, Any]] = []
-            for entry in entries:
-                if tags_filter:
-                    entry_tags = {item.strip().lower() for item in self.normalize_tags(entry.get("tags")).split(",") if item.strip()}
-                    if not entry_tags.intersection(tags_filter):
-                        continue
-
-                updated_at = self.normalize_text(entry.get("updated_at"))
-                if date_from and updated_at and updated_at < date_from:
-                    continue
-                if date_to and updated_at and updated_at > date_to:
-                    continue
-
-                if not self.entry_matches_filters(entry, filters, free_text, use_fuzzy=True):
-                    continue
-                fuzzy_matches.append(entry)
-            output = fuzzy_matches
+        if free_text and not output:
+            fuzzy_ids = self.fuzzy_candidate_ids(free_text)
+            if fuzzy_ids is not None:
+                entries = self.get_entries_by_ids(fuzzy_ids, include_sensitive=False, include_notes=True)
+            elif candidate_ids is not None:
+                entries = self.get_all_entries(include_sensitive=False, include_notes=True)
+            output = [
+                entry
+                for entry in entries
+                if self.entry_passes_filters(entry, tags_filter, date_from, date_to)
+                and self.entry_matches_filters(entry, filters, free_text, use_fuzzy=True)
+            ]
+        page_source: Iterable[dict[str, Any]] = output
+        if entry_filter is not None:
+            # Фильтр может быть дорогим, поэтому без ранжирования он вычисляется лениво до конца страницы.
+            page_source = (entry for entry in output if entry_filter(entry))
 
         sanitized: list[dict[str, Any]] = []
-        for entry in output:
+        for entry in self.select_page(page_source, free_text, ranked, limit, offset):
             row = dict(entry)
             row["password"] = ""
             row["notes"] = ""
             sanitized.append(row)
         return sanitized
 
+    def pending_reencryption(self, conn=None) -> Optional[dict[str, int]]:
+        if conn is None:
+            with self.db.read_session() as conn_from_db:
+                return self.pending_reencryption(conn_from_db)
+        row = conn.execute(
+            """
+            SELECT from_generation, to_generation, last_entry_id, processed, total
+            FROM reencryption_checkpoint
+            WHERE id = 1
+            """
+        ).fetchone()
+        if row is None:
+            return None
+        return {name: int(row[name]) for name in row.keys()}
+
+    def begin_key_rotation(self, password: str) -> int:
+        if self.pending_reencryption() is not None:
+            raise RuntimeError("Предыдущее перешифрование хранилища не завершено.")
+        wrapping_key = bytearray(self.key_manager.derive_master_encryption_key(password))
+        try:
+            try:
+                old_key = self.key_manager.unwrap_data_key(bytes(wrapping_key))
+            except ValueError as exc:
+                raise ValueError("Текущий пароль неверный.") from exc
+            with self.db.session() as conn:
+                old_generation = self.key_manager.data_key_generation(conn)
+                new_key, new_generation = self.key_manager.rotate_data_key_with_connection(
+                    conn,
+                    bytes(wrapping_key),
+                    old_key,
+                )
+                total = int(
+                    conn.execute(
+                        """
+                        SELECT
+                            (SELECT COUNT(*) FROM vault_entries WHERE key_generation < ?)
+                            + (SELECT COUNT(*) FROM deleted_entries WHERE key_generation < ?)
+                        """,
+                        (new_generation, new_generation),
+                    ).fetchone()[0]
+                )
+                now = utc_now_iso()
+                conn.execute(
+                    """
+                    INSERT OR REPLACE INTO reencryption_checkpoint (
+                        id, from_generation, to_generation, last_entry_id, processed, total, started_at, updated_at
+                    )
+                    VALUES (1, ?, ?, 0, 0, ?, ?, ?)
+                    """,
+                    (old_generation, new_generation, total, now, now),
+                )
+        finally:
+            secure_zero_bytearray(wrapping_key)
+        self.key_manager.cache_encryption_key(new_key)
+        return new_generation
+
     def reencrypt_all_entries(
         self,
-        old_key: bytes,
-        new_key: bytes,
         progress_callback: Optional[Callable[[int, int], None]] = None,
         legacy_crypto: Optional[EncryptionService] = None,
-        conn=None,
-    ) -> None:
-        if conn is not None:
-            self.reencrypt_all_entries_with_connection(
-                conn=conn,
-                old_key=old_key,
-                new_key=new_key,
-                progress_callback=progress_callback,
-                legacy_crypto=legacy_crypto,
-            )
-            return
+        chunk_size: Optional[int] = None,
+        should_stop: Optional[Callable[[], bool]] = None,
+    ) -> bool:
+        # Задание идет порциями: каждая порция коммитится вместе с контрольной точкой,
+        # поэтому после сбоя или отмены повторный вызов продолжает с места остановки.
+        # Порция выбирается по key_generation, а не по курсору id: запись, возвращенная
+        # из корзины посреди задания, тоже попадет в выборку. После записей перешифровывается
+        # корзина, и только затем в одной транзакции снимается контрольная точка и
+        # удаляются прежние ключи данных.
+        checkpoint = self.pending_reencryption()
+        if checkpoint is None:
+            return True
+        key = self.key_manager.get_active_key(key_type="vault_encryption")
+        target_generation = checkpoint["to_generation"]
+        if self.key_manager.data_key_generation() != target_generation:
+            raise RuntimeError("Контрольная точка перешифрования не соответствует активному ключу.")
 
-        with self.db.session() as conn_from_db:
-            self.reencrypt_all_entries_with_connection(
-                conn=conn_from_db,
-                old_key=old_key,
-                new_key=new_key,
-                progress_callback=progress_callback,
-                legacy_crypto=legacy_crypto,
-            )
+        chosen_legacy_crypto = legacy_crypto or self.legacy_crypto
+        size = max(1, int(chunk_size or self.reencrypt_chunk_size))
+        last_entry_id = checkpoint["last_entry_id"]
+        processed = checkpoint["processed"]
+        total = checkpoint["total"]
+        if progress_callback is not None:
+            progress_callback(processed, total)
+
+        while True:
+            if should_stop is not None and should_stop():
+                return False
+            rows: list = []
+            with self.db.session() as conn:
+                rows = conn.execute(
+                    f"""
+                    SELECT {self.entry_columns}
+                    FROM vault_entries
+                    WHERE key_generation < ?
+                    ORDER BY id
+                    LIMIT ?
+                    """,
+                    (target_generation, size),
+                ).fetchall()
+                if rows:
+                    payloads, encoded = self.reencrypt_rows(rows, key, chosen_legacy_crypto, conn)
+                    conn.executemany(
+                        """
+                        UPDATE vault_entries
+                        SET encrypted_data = ?, encrypted_secret = ?, title = NULL, username = NULL,
+                            encrypted_password = NULL, url = NULL, notes = NULL, key_generation = ?
+                        WHERE id = ?
+                        """,
+                        [
+                            (encrypted_data, encrypted_secret, target_generation, int(row["id"]))
+                            for row, (encrypted_data, encrypted_secret) in zip(rows, encoded)
+                        ],
+                    )
+                    # Токены индекса строятся ключом нового поколения в той же порции.
+                    self.search_index.replace_entries_tokens(
+                        conn,
+                        [(int(row["id"]), self.metadata_from_payload(payload)) for row, payload in zip(rows, payloads)],
+                    )
+                    last_entry_id = int(rows[-1]["id"])
+                    chunk = len(rows)
+                else:
+                    trash_rows = conn.execute(
+                        f"""
+                        SELECT {self.deleted_entry_columns}
+                        FROM deleted_entries
+                        WHERE key_generation < ?
+                        ORDER BY id
+                        LIMIT ?
+                        """,
+                        (target_generation, size),
+                    ).fetchall()
+                    if not trash_rows:
+                        conn.execute("DELETE FROM reencryption_checkpoint WHERE id = 1")
+                        self.key_manager.prune_retired_data_keys_with_connection(conn, target_generation)
+                        break
+                    _, encoded = self.reencrypt_rows(trash_rows, key, chosen_legacy_crypto, conn)
+                    conn.executemany(
+                        "UPDATE deleted_entries SET encrypted_data = ?, encrypted_secret = ?, key_generation = ? WHERE id = ?",
+                        [
+                            (encrypted_data, encrypted_secret, target_generation, int(row["trash_id"]))
+                            for row, (encrypted_data, encrypted_secret) in zip(trash_rows, encoded)
+                        ],
+                    )
+                    chunk = len(trash_rows)
+                processed += chunk
+                total = max(total, processed)
+                conn.execute(
+                    """
+                    UPDATE reencryption_checkpoint
+                    SET last_entry_id = ?, processed = ?, total = ?, updated_at = ?
+                    WHERE id = 1
+                    """,
+                    (last_entry_id, processed, total, utc_now_iso()),
+                )
+            for row in rows:
+                self.invalidate_metadata(int(row["id"]))
+            if progress_callback is not None:
+                progress_callback(processed, total)
 
-    def reencrypt_all_entries_with_connection(
+        if progress_callback is not None and processed != total:
+            progress_callback(total, total)
+        return True
+
+    def reencrypt_rows(
+        self,
+        rows: list,
+        key: bytes,
+        legacy_crypto: Optional[EncryptionService] = None,
+        conn=None,
+    ) -> tuple[list[dict[str, Any]], list[tuple[bytes, bytes]]]:
+        payloads = self.decode_rows(rows, include_secret=True, legacy_crypto=legacy_crypto, conn=conn)
+        if any(payload is None for payload in payloads):
+            raise ValueError("Не удалось расшифровать запись при перешифровании.")
+        for payload in payloads:
+            if self.stored_password_strength(payload) is None:
+                payload["password_strength"] = self.password_generator.estimate_strength_score(
+                    self.normalize_text(payload.get("password"))
+                )
+        return payloads, self.encode_payloads_with_key(payloads, key)
+
+    def reencrypt_entries_with_keys(
         self,
-        conn,
         old_key: bytes,
         new_key: bytes,
         progress_callback: Optional[Callable[[int, int], None]] = None,
         legacy_crypto: Optional[EncryptionService] = None,
+        conn=None,
     ) -> None:
+        # Путь из версий без ключа данных: все записи перешифровываются с old_key
+        # на new_key одной транзакцией, поколение ключа не меняется. Смена ключа
+        # данных идет через begin_key_rotation и reencrypt_all_entries().
+        if conn is None:
+            with self.db.session() as conn_from_db:
+                self.reencrypt_entries_with_keys(old_key, new_key, progress_callback, legacy_crypto, conn_from_db)
+            return
         chosen_legacy_crypto = legacy_crypto or self.legacy_crypto
         rows = conn.execute(
-            """
-            SELECT id, encrypted_data, title, username, encrypted_password, url, notes, created_at, updated_at, tags
+            f"""
+            SELECT {self.entry_columns}
             FROM vault_entries
             ORDER BY id
             """
@@ -586,30 +1620,26 @@ class EntryManager:
         total = len(rows)
         if progress_callback is not None:
             progress_callback(0, total)
-
-        for index, row in enumerate(rows, start=1):
-            payload = self.decode_row_payload_with_key(
-                row=row,
-                key=old_key,
-                legacy_crypto=chosen_legacy_crypto,
-            )
-            encrypted_data = self.encryption_service.encrypt_payload(payload, new_key)
-            conn.execute(
+        size = self.reencrypt_chunk_size
+        for start in range(0, total, size):
+            chunk = rows[start : start + size]
+            payloads = self.decode_rows_with_key(chunk, old_key, include_secret=True, legacy_crypto=chosen_legacy_crypto)
+            if any(payload is None for payload in payloads):
+                raise ValueError("Не удалось расшифровать запись при перешифровании.")
+            encoded = self.encode_payloads_with_key(payloads, new_key)
+            conn.executemany(
                 """
                 UPDATE vault_entries
-                SET encrypted_data = ?, title = ?, username = ?, encrypted_password = ?, url = ?, notes = ?, updated_at = ?
+                SET encrypted_data = ?, encrypted_secret = ?, title = NULL, username = NULL,
+                    encrypted_password = NULL, url = NULL, notes = NULL
                 WHERE id = ?
                 """,
-                (
-                    encrypted_data,
-                    None,
-                    None,
-                    None,
-                    None,
-                    None,
-                    utc_now_iso(),
-                    int(row["id"]),
-                ),
+                [
+                    (encrypted_data, encrypted_secret, int(row["id"]))
+                    for row, (encrypted_data, encrypted_secret) in zip(chunk, encoded)
+                ],
             )
             if progress_callback is not None:
-                progress_callback(index, total)
+                progress_callback(min(start + size, total), total)
+        # Индекс и кэши построены прежним ключом: перестраиваются при следующем поиске.
+        self.on_session_key_cleared()
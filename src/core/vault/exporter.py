@@ -0,0 +1,316 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sqlite3
+import struct
+import sys
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, BinaryIO, Callable, Iterator, Optional
+
+from cryptography.exceptions import InvalidTag
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+from core.crypto.key_derivation import KeyDerivationService, Pbkdf2Params
+from core.vault.entry_manager import EntryManager
+
+
+@dataclass(frozen=True)
+class ExportReport:
+    entries: int
+    chunks: int
+    bytes_written: int
+
+
+@dataclass(frozen=True)
+class ArchiveVerification:
+    ok: bool
+    entries: int = 0
+    chunks: int = 0
+    error: str = ""
+
+
+class VaultArchiveFormat:
+    # Заголовок: magic, версия, итерации PBKDF2, длина соли, соль, префикс nonce.
+    # Дальше кадры [uint32 длина][AES-GCM шифртекст+тег]. Nonce кадра - префикс,
+    # номер кадра и флаг последнего кадра, поэтому кадры нельзя переставить,
+    # а обрезку архива выдает отсутствие финального кадра со счетчиками.
+    magic = b"CSVX"
+    format_version = 1
+    key_type = "vault_export"
+    nonce_prefix_size = 7
+    header_struct = struct.Struct(">4sBIB")
+    frame_struct = struct.Struct(">I")
+    nonce_struct = struct.Struct(">IB")
+    max_frame_size = 64 * 1024 * 1024
+    max_chunks = 0xFFFFFFFF
+
+    def __init__(self, kdf_params: Optional[Pbkdf2Params] = None):
+        self.kdf = KeyDerivationService(pbkdf2_params=kdf_params)
+
+    def make_header(self, iterations: int, salt: bytes, nonce_prefix: bytes) -> bytes:
+        return self.header_struct.pack(self.magic, self.format_version, iterations, len(salt)) + salt + nonce_prefix
+
+    def read_header(self, stream: BinaryIO) -> tuple[bytes, int, bytes, bytes]:
+        fixed = stream.read(self.header_struct.size)
+        if len(fixed) != self.header_struct.size:
+            raise ValueError("Архив экспорта поврежден: нет заголовка.")
+        magic, version, iterations, salt_len = self.header_struct.unpack(fixed)
+        if magic != self.magic or version != self.format_version:
+            raise ValueError("Файл не является архивом экспорта CryptoSafe.")
+        rest = stream.read(salt_len + self.nonce_prefix_size)
+        if len(rest) != salt_len + self.nonce_prefix_size:
+            raise ValueError("Архив экспорта поврежден: нет заголовка.")
+        return fixed + rest, iterations, rest[:salt_len], rest[salt_len:]
+
+    def derive_key(self, passphrase: str, salt: bytes, iterations: int) -> bytes:
+        params = Pbkdf2Params(iterations=iterations, salt_len=len(salt))
+        return self.kdf.derive_encryption_key(passphrase, salt, params=params, key_type=self.key_type)
+
+    def nonce(self, nonce_prefix: bytes, index: int, last: bool) -> bytes:
+        return nonce_prefix + self.nonce_struct.pack(index, 1 if last else 0)
+
+    def read_frames(self, stream: BinaryIO) -> Iterator[bytes]:
+        while True:
+            prefix = stream.read(self.frame_struct.size)
+            if not prefix:
+                return
+            if len(prefix) != self.frame_struct.size:
+                raise ValueError("Архив экспорта обрезан.")
+            (size,) = self.frame_struct.unpack(prefix)
+            if size > self.max_frame_size:
+                raise ValueError("Архив экспорта поврежден: слишком большой кадр.")
+            frame = stream.read(size)
+            if len(frame) != size:
+                raise ValueError("Архив экспорта обрезан.")
+            yield frame
+
+
+class VaultExporter:
+    def __init__(
+        self,
+        entry_manager: EntryManager,
+        chunk_entries: int = 500,
+        max_workers: Optional[int] = None,
+        kdf_params: Optional[Pbkdf2Params] = None,
+    ):
+        self.entry_manager = entry_manager
+        self.chunk_entries = max(1, int(chunk_entries))
+        self.max_workers = max(1, int(max_workers or min(8, os.cpu_count() or 1)))
+        self.archive = VaultArchiveFormat(kdf_params)
+
+    @staticmethod
+    def export_record(entry: dict[str, Any]) -> dict[str, Any]:
+        record = dict(entry)
+        record.pop("domain", None)
+        return record
+
+    def encrypt_chunk(
+        self,
+        cipher: AESGCM,
+        nonce: bytes,
+        header: bytes,
+        entries: list[dict[str, Any]],
+    ) -> bytes:
+        plaintext = "".join(
+            json.dumps(self.export_record(entry), ensure_ascii=False, separators=(",", ":")) + "\n"
+            for entry in entries
+        ).encode("utf-8")
+        return cipher.encrypt(nonce, plaintext, header)
+
+    def iter_entry_chunks(self, conn: sqlite3.Connection) -> Iterator[list[dict[str, Any]]]:
+        # Строки и поколения ключей читаются курсором в транзакции conn: экспорт
+        # держит одно соединение пула. Порция, где хоть одна запись не
+        # расшифровалась, поднимает ошибку вместо пропуска записи.
+        manager = self.entry_manager
+        cursor = conn.execute(
+            f"""
+            SELECT {manager.entry_columns}
+            FROM vault_entries
+            ORDER BY updated_at DESC, id DESC
+            """
+        )
+        while True:
+            rows = cursor.fetchmany(self.chunk_entries)
+            if not rows:
+                return
+            yield manager.build_entries_from_rows(
+                rows,
+                include_sensitive=True,
+                include_notes=True,
+                strict=True,
+                conn=conn,
+            )
+
+    def export_to(
+        self,
+        path: Path,
+        passphrase: str,
+        progress_callback: Optional[Callable[[int], None]] = None,
+    ) -> ExportReport:
+        # Строки идут потоковым курсором, порции шифруются пулом потоков, а запись
+        # на диск идет по порядку; в работе не больше 2 * max_workers порций.
+        # Счетчик и строки читаются одним снимком: если записано меньше, чем
+        # COUNT(*) в этом снимке, архив не переименовывается из .part и удаляется.
+        if not self.entry_manager.key_manager.has_cached_key():
+            raise RuntimeError("Хранилище заблокировано.")
+        archive = self.archive
+        salt = archive.kdf.make_salt()
+        iterations = archive.kdf.pbkdf2_params.iterations
+        nonce_prefix = os.urandom(archive.nonce_prefix_size)
+        header = archive.make_header(iterations, salt, nonce_prefix)
+        cipher = AESGCM(archive.derive_key(passphrase, salt, iterations))
+
+        target = Path(path)
+        partial = target.with_name(target.name + ".part")
+        entries = 0
+        chunks = 0
+        written = 0
+        pending: deque[tuple[int, Future]] = deque()
+        try:
+            with self.entry_manager.db.read_session() as conn, open(partial, "wb") as stream, ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix="vault-export",
+            ) as executor:
+                conn.execute("BEGIN;")
+                expected = int(conn.execute("SELECT COUNT(*) FROM vault_entries").fetchone()[0])
+
+                def write_frame(frame: bytes) -> None:
+                    nonlocal written
+                    stream.write(archive.frame_struct.pack(len(frame)))
+                    stream.write(frame)
+                    written += archive.frame_struct.size + len(frame)
+
+                def drain(limit: int) -> None:
+                    nonlocal entries
+                    while len(pending) > limit:
+                        count, future = pending.popleft()
+                        write_frame(future.result())
+                        entries += count
+                        if progress_callback is not None:
+                            progress_callback(entries)
+
+                stream.write(header)
+                written += len(header)
+                for chunk in self.iter_entry_chunks(conn):
+                    if chunks >= archive.max_chunks:
+                        raise ValueError("Слишком много порций для одного архива экспорта.")
+                    nonce = archive.nonce(nonce_prefix, chunks, last=False)
+                    pending.append((len(chunk), executor.submit(self.encrypt_chunk, cipher, nonce, header, chunk)))
+                    chunks += 1
+                    drain(2 * self.max_workers)
+                drain(0)
+                if entries != expected:
+                    raise ValueError(f"Экспортировано {entries} записей из {expected}: архив не сохранен.")
+
+                summary = json.dumps({"entries": entries, "chunks": chunks}).encode("utf-8")
+                write_frame(cipher.encrypt(archive.nonce(nonce_prefix, chunks, last=True), summary, header))
+                stream.flush()
+                os.fsync(stream.fileno())
+            os.replace(partial, target)
+        except BaseException:
+            partial.unlink(missing_ok=True)
+            raise
+        return ExportReport(entries=entries, chunks=chunks, bytes_written=written)
+
+
+class VaultArchiveReader:
+    def __init__(self, archive: Optional[VaultArchiveFormat] = None):
+        self.archive = archive or VaultArchiveFormat()
+
+    def iter_chunks(self, stream: BinaryIO, passphrase: str) -> Iterator[tuple[bytes, Optional[dict[str, int]]]]:
+        # Отдает расшифрованные порции по одной; последним идет итог из финального кадра.
+        archive = self.archive
+        header, iterations, salt, nonce_prefix = archive.read_header(stream)
+        cipher = AESGCM(archive.derive_key(passphrase, salt, iterations))
+        index = 0
+        finished = False
+        for frame in archive.read_frames(stream):
+            if finished:
+                raise ValueError("Данные после финального кадра архива экспорта.")
+            try:
+                plaintext = cipher.decrypt(archive.nonce(nonce_prefix, index, last=False), frame, header)
+                yield plaintext, None
+                index += 1
+                continue
+            except InvalidTag:
+                pass
+            try:
+                summary_bytes = cipher.decrypt(archive.nonce(nonce_prefix, index, last=True), frame, header)
+            except InvalidTag as exc:
+                raise ValueError("Обнаружена подмена архива экспорта или неверная парольная фраза.") from exc
+            summary = json.loads(summary_bytes.decode("utf-8"))
+            if int(summary.get("chunks", -1)) != index:
+                raise ValueError("Число порций архива экспорта не совпадает с итогом.")
+            finished = True
+            yield b"", {"entries": int(summary.get("entries", 0)), "chunks": index}
+        if not finished:
+            raise ValueError("Архив экспорта обрезан: нет финального кадра.")
+
+    def iter_entries(self, path: Path, passphrase: str) -> Iterator[dict[str, Any]]:
+        with open(path, "rb") as stream:
+            for plaintext, summary in self.iter_chunks(stream, passphrase):
+                if summary is not None:
+                    continue
+                for line in plaintext.decode("utf-8").splitlines():
+                    yield json.loads(line)
+
+    def verify(self, path: Path, passphrase: str) -> ArchiveVerification:
+        # Проверяет теги всех кадров и итоговые счетчики; открытый текст живет
+        # только в памяти по одной порции и на диск не пишется.
+        entries = 0
+        chunks = 0
+        try:
+            with open(path, "rb") as stream:
+                for plaintext, summary in self.iter_chunks(stream, passphrase):
+                    if summary is None:
+                        entries += plaintext.count(b"\n")
+                        chunks += 1
+                        continue
+                    if summary["entries"] != entries:
+                        raise ValueError("Число записей архива экспорта не совпадает с итогом.")
+        except (OSError, ValueError) as exc:
+            return ArchiveVerification(ok=False, entries=entries, chunks=chunks, error=str(exc))
+        return ArchiveVerification(ok=True, entries=entries, chunks=chunks)
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    # Экспорт без Qt: python -m core.vault.exporter <архив> [--verify] (из каталога src).
+    import getpass
+
+    parser = argparse.ArgumentParser(description="Зашифрованный экспорт хранилища CryptoSafe и его проверка.")
+    parser.add_argument("path", type=Path)
+    parser.add_argument("--db", type=Path, default=None, help="путь к базе; по умолчанию из конфига")
+    parser.add_argument("--verify", action="store_true", help="только проверить существующий архив")
+    parser.add_argument("--chunk-entries", type=int, default=500)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    passphrase = os.getenv("CRYPTOSAFE_EXPORT_PASSPHRASE") or getpass.getpass("Парольная фраза архива: ")
+    if args.verify:
+        result = VaultArchiveReader().verify(args.path, passphrase)
+        if not result.ok:
+            print(result.error, file=sys.stderr)
+            return 1
+        print(f"Архив цел: записей {result.entries}, порций {result.chunks}.")
+        return 0
+
+    from core.vault.headless import open_vault
+
+    try:
+        with open_vault(args.db, username="exporter") as vault:
+            exporter = VaultExporter(vault.entry_manager, chunk_entries=args.chunk_entries, max_workers=args.workers)
+            report = exporter.export_to(args.path, passphrase)
+    except RuntimeError as exc:
+        print(exc, file=sys.stderr)
+        return 1
+    print(f"Экспортировано записей {report.entries}, порций {report.chunks}, байт {report.bytes_written}.")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
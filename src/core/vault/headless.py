@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import getpass
+import os
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional
+
+from core.audit_logger import AuditLogger
+from core.audit_writer import BufferedAuditWriter
+from core.config import ConfigManager
+from core.crypto.authentication import AuthenticationService
+from core.crypto.placeholder import AES256Placeholder
+from core.events import EventBus
+from core.key_manager import KeyManager
+from core.state_manager import StateManager
+from core.vault.reencryption import ReencryptionResumer
+from database.db import Database
+from database.repositories import AuditRepository, VaultRepository
+
+
+def resolve_db_path(explicit: Optional[Path] = None) -> Path:
+    if explicit is not None:
+        return Path(explicit)
+    env_db_path = os.getenv("CRYPTOSAFE_DB_PATH")
+    return Path(env_db_path) if env_db_path else ConfigManager().load().db_path
+
+
+@contextmanager
+def open_vault(db_path: Optional[Path] = None, username: str = "cli") -> Iterator[VaultRepository]:
+    # Та же связка, что собирает gui.app, но без Qt: события пишутся в аудит,
+    # мастер-пароль берется из CRYPTOSAFE_MASTER_PASSWORD или из терминала.
+    db = Database(resolve_db_path(db_path))
+    db.connect()
+    bus = EventBus()
+    audit_writer = BufferedAuditWriter(AuditRepository(db))
+    try:
+        key_manager = KeyManager(db)
+        auth = AuthenticationService(key_manager=key_manager, state=StateManager(), bus=bus)
+        if not auth.has_master_password():
+            raise RuntimeError("Хранилище не настроено: сначала пройди первичную настройку.")
+        audit_writer.start()
+        AuditLogger(bus, audit_writer).start()
+        password = os.getenv("CRYPTOSAFE_MASTER_PASSWORD") or getpass.getpass("Мастер-пароль: ")
+        result = auth.authenticate(password=password, username=username)
+        if not result.success:
+            raise RuntimeError(result.message)
+        try:
+            vault = VaultRepository(db=db, crypto=AES256Placeholder(key_manager), bus=bus)
+            # Прерванное перешифрование продолжается сразу после входа и до команды:
+            # фоновый поток оборвался бы вместе с коротким процессом CLI.
+            ReencryptionResumer(vault).run()
+            yield vault
+        finally:
+            auth.logout()
+    finally:
+        bus.shutdown()
+        try:
+            audit_writer.stop()
+        finally:
+            db.close()
@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+import hashlib
+import hmac
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Optional
+
+from core.vault.entry_manager import EntryManager, utc_now_iso
+from core.vault.password_generator import PasswordGenerator
+
+
+@dataclass(frozen=True)
+class EntryHealthFinding:
+    entry_id: int
+    title: str
+    strength: int
+    weak: bool = False
+    reuse_group: Optional[int] = None
+    duplicate_group: Optional[int] = None
+    password_age_days: Optional[int] = None
+    old: bool = False
+
+    @property
+    def issues(self) -> tuple[str, ...]:
+        out: list[str] = []
+        if self.weak:
+            out.append("weak")
+        if self.reuse_group is not None:
+            out.append("reused")
+        if self.old:
+            out.append("old")
+        if self.duplicate_group is not None:
+            out.append("duplicate")
+        return tuple(out)
+
+
+@dataclass(frozen=True)
+class VaultHealthReport:
+    generated_at: str
+    total_entries: int
+    unreadable_entries: int = 0
+    weak_count: int = 0
+    reused_count: int = 0
+    old_count: int = 0
+    duplicate_count: int = 0
+    findings: tuple[EntryHealthFinding, ...] = field(default_factory=tuple)
+    # Группы перечислены один раз; находки ссылаются на них индексом, чтобы отчет оставался линейным.
+    reused_groups: tuple[tuple[int, ...], ...] = field(default_factory=tuple)
+    duplicate_groups: tuple[tuple[int, ...], ...] = field(default_factory=tuple)
+
+    @property
+    def healthy_entries(self) -> int:
+        return self.total_entries - self.unreadable_entries - len(self.findings)
+
+
+class VaultHealthAnalyzer:
+    fingerprint_key_type = "password_fingerprint"
+
+    def __init__(
+        self,
+        entry_manager: EntryManager,
+        password_generator: Optional[PasswordGenerator] = None,
+        min_strength_score: int = 3,
+        max_password_age_days: int = 365,
+        chunk_size: int = 1000,
+    ):
+        self.entry_manager = entry_manager
+        self.password_generator = password_generator or entry_manager.password_generator
+        self.min_strength_score = max(0, min(4, int(min_strength_score)))
+        self.max_password_age_days = max(1, int(max_password_age_days))
+        self.chunk_size = max(1, int(chunk_size))
+
+    def fingerprint_key(self) -> bytes:
+        return self.entry_manager.key_manager.get_active_key(key_type=self.fingerprint_key_type)
+
+    @staticmethod
+    def fingerprint(key: bytes, password: str) -> bytes:
+        return hmac.new(key, password.encode("utf-8"), hashlib.sha256).digest()
+
+    @staticmethod
+    def parse_timestamp(value: str) -> Optional[datetime]:
+        try:
+            parsed = datetime.fromisoformat(value)
+        except (TypeError, ValueError):
+            return None
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=timezone.utc)
+        return parsed
+
+    def password_age_days(self, entry: dict[str, Any], now: datetime) -> Optional[int]:
+        normalize = self.entry_manager.normalize_text
+        changed_at = normalize(entry.get("password_changed_at")) or normalize(entry.get("created_at"))
+        parsed = self.parse_timestamp(changed_at)
+        if parsed is None:
+            return None
+        return max(0, (now - parsed).days)
+
+    def analyze(self, now: Optional[datetime] = None) -> VaultHealthReport:
+        # Один проход: пароли сразу сворачиваются в оценку и HMAC-отпечаток,
+        # повторы ищутся группировкой по отпечатку, открытые тексты не сравниваются.
+        current_time = now or datetime.now(timezone.utc)
+        fingerprint_key = self.fingerprint_key()
+        normalize = self.entry_manager.normalize_text
+        stored_total = self.entry_manager.count_entries()
+
+        summaries: list[tuple[int, str, int, Optional[int]]] = []
+        by_fingerprint: dict[bytes, list[int]] = {}
+        by_account: dict[tuple[str, str], list[int]] = {}
+
+        entries = self.entry_manager.iter_entries(batch_size=self.chunk_size, include_sensitive=True)
+        for entry in entries:
+            entry_id = int(entry["id"])
+            password = normalize(entry.get("password"))
+            strength = self.password_generator.estimate_strength_score(password)
+            if password:
+                by_fingerprint.setdefault(self.fingerprint(fingerprint_key, password), []).append(entry_id)
+            username = normalize(entry.get("username")).lower()
+            if entry.get("domain") and username:
+                by_account.setdefault((entry["domain"], username), []).append(entry_id)
+            summaries.append(
+                (
+                    entry_id,
+                    normalize(entry.get("title")),
+                    strength,
+                    self.password_age_days(entry, current_time),
+                )
+            )
+        total = max(stored_total, len(summaries))
+        unreadable = total - len(summaries)
+
+        reused_groups = tuple(tuple(sorted(group)) for group in by_fingerprint.values() if len(group) > 1)
+        duplicate_groups = tuple(tuple(sorted(group)) for group in by_account.values() if len(group) > 1)
+        reused = {entry_id: index for index, group in enumerate(reused_groups) for entry_id in group}
+        duplicates = {entry_id: index for index, group in enumerate(duplicate_groups) for entry_id in group}
+
+        findings: list[EntryHealthFinding] = []
+        for entry_id, title, strength, age_days in summaries:
+            finding = EntryHealthFinding(
+                entry_id=entry_id,
+                title=title,
+                strength=strength,
+                weak=strength < self.min_strength_score,
+                reuse_group=reused.get(entry_id),
+                duplicate_group=duplicates.get(entry_id),
+                password_age_days=age_days,
+                old=age_days is not None and age_days >= self.max_password_age_days,
+            )
+            if finding.issues:
+                findings.append(finding)
+
+        return VaultHealthReport(
+            generated_at=utc_now_iso(),
+            total_entries=total,
+            unreadable_entries=unreadable,
+            weak_count=sum(1 for finding in findings if finding.weak),
+            reused_count=len(reused),
+            old_count=sum(1 for finding in findings if finding.old),
+            duplicate_count=len(duplicates),
+            findings=tuple(findings),
+            reused_groups=reused_groups,
+            duplicate_groups=duplicate_groups,
+        )
@@ -0,0 +1,216 @@
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import sys
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Iterator, Optional, TextIO
+
+from core.events import EntriesCreated
+from core.vault.entry_manager import EntryManager, utc_now_iso
+
+
+@dataclass(frozen=True)
+class RejectedRow:
+    line: int
+    reason: str
+
+
+@dataclass(frozen=True)
+class ImportReport:
+    imported: int = 0
+    rejected_count: int = 0
+    # Список причин ограничен max_rejected, счетчик - нет.
+    rejected: tuple[RejectedRow, ...] = field(default_factory=tuple)
+
+    @property
+    def processed(self) -> int:
+        return self.imported + self.rejected_count
+
+
+class VaultImporter:
+    formats = ("csv", "jsonl")
+    format_suffixes = {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl", ".json": "jsonl"}
+    # Заголовки экспорта распространенных менеджеров паролей.
+    field_aliases = {
+        "name": "title",
+        "login": "username",
+        "login_username": "username",
+        "user": "username",
+        "email": "username",
+        "login_password": "password",
+        "website": "url",
+        "login_uri": "url",
+        "uri": "url",
+        "note": "notes",
+        "extra": "notes",
+        "folder": "category",
+        "grouping": "category",
+        "group": "category",
+        "totp": "totp_secret",
+        "login_totp": "totp_secret",
+        "otp": "totp_secret",
+        "labels": "tags",
+    }
+    imported_fields = ("title", "username", "password", "url", "notes", "category", "tags", "totp_secret")
+
+    def __init__(
+        self,
+        entry_manager: EntryManager,
+        chunk_size: int = 1000,
+        max_rejected: int = 1000,
+    ):
+        self.entry_manager = entry_manager
+        self.chunk_size = max(1, int(chunk_size))
+        self.max_rejected = max(0, int(max_rejected))
+
+    def detect_format(self, path: Path) -> str:
+        detected = self.format_suffixes.get(Path(path).suffix.lower())
+        if detected is None:
+            raise ValueError("Не удалось определить формат файла импорта. Укажи csv или jsonl.")
+        return detected
+
+    def canonical_record(self, raw: dict[str, Any]) -> dict[str, Any]:
+        record: dict[str, Any] = {}
+        for raw_key, value in raw.items():
+            if raw_key is None:
+                continue
+            key = str(raw_key).strip().lower().replace(" ", "_")
+            key = self.field_aliases.get(key, key)
+            if key in self.imported_fields and key not in record:
+                record[key] = "" if value is None else value
+        return record
+
+    def iter_csv_records(self, stream: TextIO) -> Iterator[tuple[int, Optional[dict[str, Any]], str]]:
+        reader = csv.DictReader(stream)
+        while True:
+            try:
+                row = next(reader)
+            except StopIteration:
+                return
+            except csv.Error as exc:
+                yield reader.line_num, None, f"Некорректная строка CSV: {exc}"
+                continue
+            if None in row:
+                yield reader.line_num, None, "Лишние столбцы в строке CSV."
+                continue
+            yield reader.line_num, row, ""
+
+    def iter_jsonl_records(self, stream: TextIO) -> Iterator[tuple[int, Optional[dict[str, Any]], str]]:
+        for line_number, line in enumerate(stream, start=1):
+            text = line.strip()
+            if not text:
+                continue
+            try:
+                raw = json.loads(text)
+            except json.JSONDecodeError:
+                yield line_number, None, "Некорректный JSON."
+                continue
+            if not isinstance(raw, dict):
+                yield line_number, None, "Запись должна быть JSON-объектом."
+                continue
+            yield line_number, raw, ""
+
+    def import_stream(
+        self,
+        stream: TextIO,
+        file_format: str,
+        progress_callback: Optional[Callable[[int, int], None]] = None,
+    ) -> ImportReport:
+        # В памяти только текущая порция нормализованных записей и ограниченный
+        # список отказов, поэтому объем входа на потребление памяти не влияет.
+        if file_format not in self.formats:
+            raise ValueError("Неподдерживаемый формат импорта.")
+        records = self.iter_csv_records(stream) if file_format == "csv" else self.iter_jsonl_records(stream)
+        manager = self.entry_manager
+        imported = 0
+        rejected_count = 0
+        rejected: list[RejectedRow] = []
+        payloads: list[dict[str, Any]] = []
+        tags: list[str] = []
+
+        def reject(line: int, reason: str) -> None:
+            nonlocal rejected_count
+            rejected_count += 1
+            if len(rejected) < self.max_rejected:
+                rejected.append(RejectedRow(line=line, reason=reason))
+
+        def flush() -> None:
+            nonlocal imported
+            results = manager.insert_normalized_entries(payloads, tags, utc_now_iso())
+            imported += len(results)
+            if manager.bus is not None and results:
+                manager.bus.publish(EntriesCreated(entry_ids=tuple(int(result["id"]) for result in results)))
+            payloads.clear()
+            tags.clear()
+            if progress_callback is not None:
+                progress_callback(imported, rejected_count)
+
+        for line, raw, error in records:
+            if raw is None:
+                reject(line, error)
+                continue
+            record = self.canonical_record(raw)
+            try:
+                payload = manager.normalize_entry_payload(record, existing_payload=None)
+                entry_tags = manager.normalize_tags(record.get("tags", ""))
+            except (TypeError, ValueError) as exc:
+                reject(line, str(exc) or "Некорректная запись.")
+                continue
+            payloads.append(payload)
+            tags.append(entry_tags)
+            if len(payloads) >= self.chunk_size:
+                flush()
+        if payloads:
+            flush()
+        elif progress_callback is not None:
+            progress_callback(imported, rejected_count)
+        return ImportReport(imported=imported, rejected_count=rejected_count, rejected=tuple(rejected))
+
+    def import_file(
+        self,
+        path: Path,
+        file_format: Optional[str] = None,
+        progress_callback: Optional[Callable[[int, int], None]] = None,
+    ) -> ImportReport:
+        chosen_format = file_format or self.detect_format(Path(path))
+        # utf-8-sig снимает BOM, который добавляют выгрузки из табличных редакторов.
+        with open(path, "r", encoding="utf-8-sig", newline="") as stream:
+            return self.import_stream(stream, chosen_format, progress_callback=progress_callback)
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    # Импорт без Qt: python -m core.vault.importer <файл> (из каталога src).
+    from core.vault.headless import open_vault
+
+    parser = argparse.ArgumentParser(description="Потоковый импорт записей CryptoSafe из CSV или JSON Lines.")
+    parser.add_argument("path", type=Path)
+    parser.add_argument("--db", type=Path, default=None, help="путь к базе; по умолчанию из конфига")
+    parser.add_argument("--format", choices=VaultImporter.formats, default=None)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--max-rejected", type=int, default=1000)
+    args = parser.parse_args(argv)
+
+    def report_progress(imported: int, rejected: int) -> None:
+        print(f"\rИмпортировано: {imported}, отклонено: {rejected}", end="", file=sys.stderr, flush=True)
+
+    try:
+        with open_vault(args.db, username="importer") as vault:
+            importer = VaultImporter(vault.entry_manager, chunk_size=args.chunk_size, max_rejected=args.max_rejected)
+            report = importer.import_file(args.path, file_format=args.format, progress_callback=report_progress)
+    except RuntimeError as exc:
+        print(exc, file=sys.stderr)
+        return 1
+    print(file=sys.stderr)
+    for row in report.rejected:
+        print(f"строка {row.line}: {row.reason}")
+    if report.rejected_count > len(report.rejected):
+        print(f"... и еще {report.rejected_count - len(report.rejected)} отклоненных строк")
+    print(f"Импортировано {report.imported}, отклонено {report.rejected_count}.")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
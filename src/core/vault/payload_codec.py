@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+import json
+import struct
+from itertools import accumulate
+from typing import Any
+
+
+class CompactPayloadCodec:
+    # Формат v2: [версия][n][n id полей][n типов][значения в UTF-8 через байт 0xFF].
+    # 0xFF не встречается в UTF-8, поэтому значения делятся одним bytes.split без
+    # длин в заголовке. Формат v1 ([n длин uint32] и общий текст) только читается.
+    # Таблица полей только дополняется: id уже записанных полей менять нельзя.
+    format_version = 2
+    legacy_format_version = 1
+    separator = b"\xff"
+    field_names = (
+        "title",
+        "username",
+        "url",
+        "notes",
+        "category",
+        "version",
+        "created_at",
+        "updated_at",
+        "tags",
+        "password",
+        "totp_secret",
+        "sharing_metadata",
+        "password_strength",
+        "password_changed_at",
+    )
+    extras_field_id = 0xFF
+    kind_text = 0
+    kind_int = 1
+    kind_json = 2
+    # Разбор заголовка кэшируется: у записей одного хранилища набор полей почти всегда один.
+    layout_cache_size = 256
+
+    def __init__(self):
+        self.field_ids = {name: index for index, name in enumerate(self.field_names)}
+        self.length_structs: dict[int, struct.Struct] = {}
+        self.layouts: dict[bytes, tuple[tuple[Any, ...], tuple[str, ...], tuple[str, ...], bool]] = {}
+
+    def is_compact(self, payload_bytes: bytes) -> bool:
+        return len(payload_bytes) > 0 and payload_bytes[0] in (self.format_version, self.legacy_format_version)
+
+    def length_struct(self, count: int) -> struct.Struct:
+        lengths = self.length_structs.get(count)
+        if lengths is None:
+            lengths = struct.Struct(f"<{count}I")
+            self.length_structs[count] = lengths
+        return lengths
+
+    def encode(self, payload: dict[str, Any]) -> bytes:
+        ids = bytearray()
+        kinds = bytearray()
+        values: list[bytes] = []
+        extras: dict[str, Any] = {}
+        for name, value in payload.items():
+            field_id = self.field_ids.get(name)
+            if field_id is None:
+                extras[name] = value
+                continue
+            ids.append(field_id)
+            if isinstance(value, str):
+                kinds.append(self.kind_text)
+                values.append(value.encode("utf-8"))
+            elif type(value) is int:
+                kinds.append(self.kind_int)
+                values.append(str(value).encode("utf-8"))
+            else:
+                kinds.append(self.kind_json)
+                values.append(json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+        if extras:
+            ids.append(self.extras_field_id)
+            kinds.append(self.kind_json)
+            values.append(json.dumps(extras, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+        return b"".join((bytes((self.format_version, len(values))), ids, kinds, self.separator.join(values)))
+
+    def layout(self, header: bytes) -> tuple[tuple[Any, ...], tuple[str, ...], tuple[str, ...], bool]:
+        # header - [n][id полей][типы]; ключ доп. полей - сам extras_field_id (int),
+        # он не совпадет ни с одним строковым именем поля.
+        count = header[0]
+        if len(header) != 1 + 2 * count:
+            raise ValueError("Компактная полезная нагрузка записи имеет некорректную длину.")
+        names: list[Any] = []
+        int_names: list[str] = []
+        json_names: list[str] = []
+        for field_id, kind in zip(header[1 : 1 + count], header[1 + count :]):
+            if field_id == self.extras_field_id:
+                names.append(self.extras_field_id)
+                continue
+            name = self.field_names[field_id]
+            names.append(name)
+            if kind == self.kind_int:
+                int_names.append(name)
+            elif kind != self.kind_text:
+                json_names.append(name)
+        layout = (tuple(names), tuple(int_names), tuple(json_names), self.extras_field_id in names)
+        if len(self.layouts) >= self.layout_cache_size:
+            self.layouts.clear()
+        self.layouts[bytes(header)] = layout
+        return layout
+
+    def decode(self, payload_bytes: bytes) -> dict[str, Any]:
+        if payload_bytes and payload_bytes[0] == self.legacy_format_version:
+            return self.decode_legacy(payload_bytes)
+        try:
+            header = payload_bytes[1 : 2 + 2 * payload_bytes[1]]
+            layout = self.layouts.get(header)
+            if layout is None:
+                layout = self.layout(header)
+            names, int_names, json_names, has_extras = layout
+            count = len(names)
+            header_end = 1 + len(header)
+            body = payload_bytes[header_end:]
+            # Пустое тело - это и одно пустое значение, и ни одного: split() вернет
+            # [b""], поэтому полезная нагрузка без полей разбирается отдельно.
+            if not count:
+                if body:
+                    raise ValueError("Компактная полезная нагрузка записи имеет некорректную длину.")
+                return {}
+            values = body.split(self.separator)
+            if len(values) != count:
+                raise ValueError("Компактная полезная нагрузка записи имеет некорректную длину.")
+            payload: dict[Any, Any] = dict(zip(names, map(bytes.decode, values)))
+            for name in int_names:
+                payload[name] = int(payload[name])
+            for name in json_names:
+                payload[name] = json.loads(payload[name])
+            if has_extras:
+                payload.update(json.loads(payload.pop(self.extras_field_id)))
+        except Exception as exc:
+            raise ValueError("Не удалось декодировать компактную полезную нагрузку записи.") from exc
+        return payload
+
+    def decode_legacy(self, payload_bytes: bytes) -> dict[str, Any]:
+        try:
+            count = payload_bytes[1]
+            header_end = 2 + 2 * count
+            ids = payload_bytes[2 : 2 + count]
+            kinds = payload_bytes[2 + count : header_end]
+            lengths = self.length_struct(count)
+            text = bytes(payload_bytes[header_end + lengths.size :]).decode("utf-8")
+            bounds = accumulate(lengths.unpack_from(payload_bytes, header_end))
+        except Exception as exc:
+            raise ValueError("Не удалось декодировать компактную полезную нагрузку записи.") from exc
+        payload: dict[str, Any] = {}
+        start = 0
+        for field_id, kind, end in zip(ids, kinds, bounds):
+            value = text[start:end]
+            start = end
+            try:
+                if field_id == self.extras_field_id:
+                    payload.update(json.loads(value))
+                    continue
+                name = self.field_names[field_id]
+                if kind == self.kind_text:
+                    payload[name] = value
+                elif kind == self.kind_int:
+                    payload[name] = int(value)
+                else:
+                    payload[name] = json.loads(value)
+            except Exception as exc:
+                raise ValueError("Не удалось декодировать компактную полезную нагрузку записи.") from exc
+        if start != len(text):
+            raise ValueError("Компактная полезная нагрузка записи имеет некорректную длину.")
+        return payload
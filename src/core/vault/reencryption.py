@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+import logging
+import threading
+from typing import Optional
+
+from database.repositories import VaultRepository
+
+
+logger = logging.getLogger(__name__)
+
+
+class ReencryptionResumer:
+    # Продолжает перешифрование после смены ключа данных, прерванное выходом или
+    # сбоем. Запускается после входа: нужен ключ сессии. Задание коммитится
+    # порциями с контрольной точкой, поэтому stop() между порциями ничего не теряет.
+    def __init__(self, vault_repo: VaultRepository, chunk_size: Optional[int] = None):
+        self.vault_repo = vault_repo
+        self.chunk_size = chunk_size
+        self.stop_event = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+
+    def run_once(self) -> bool:
+        if self.vault_repo.pending_reencryption() is None:
+            return True
+        return self.vault_repo.reencrypt_all_entries(
+            chunk_size=self.chunk_size,
+            should_stop=self.stop_event.is_set,
+        )
+
+    def run(self) -> None:
+        try:
+            self.run_once()
+        except Exception:
+            # Ключ сессии истек, запись не расшифровалась или база закрыта:
+            # контрольная точка остается, задание продолжится при следующем входе.
+            logger.exception("Vault re-encryption failed")
+
+    def start(self) -> None:
+        if self.thread is not None and self.thread.is_alive():
+            return
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self.run, name="vault-reencryption", daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join(timeout)
+            self.thread = None
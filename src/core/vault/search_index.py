@@ -0,0 +1,245 @@
+from __future__ import annotations
+
+import difflib
+import hashlib
+import hmac
+import re
+import threading
+from typing import Any, Iterable, Optional
+
+from core.key_manager import KeyManager
+
+
+class BlindSearchIndex:
+    key_type = "search_index"
+    gram_size = 3
+    token_size = 16
+    indexed_fields = ("title", "username", "url", "notes")
+    word_pattern = re.compile(r"[^\W_]+")
+    # Служебная n-грамма есть у каждой записи: по ней видно, что запись проиндексирована.
+    entry_marker = "\x00entry"
+
+    def __init__(self, key_manager: KeyManager):
+        self.key_manager = key_manager
+
+    def index_key(self) -> bytes:
+        return self.key_manager.get_active_key(key_type=self.key_type)
+
+    def words(self, text: str) -> list[str]:
+        return self.word_pattern.findall(str(text or "").lower())
+
+    def word_grams(self, word: str) -> set[str]:
+        size = self.gram_size
+        return {word[index : index + size] for index in range(len(word) - size + 1)}
+
+    def entry_grams(self, metadata: dict[str, Any]) -> set[str]:
+        grams = {self.entry_marker}
+        for field_name in self.indexed_fields:
+            for word in self.words(metadata.get(field_name, "")):
+                grams.update(self.word_grams(word))
+        return grams
+
+    def query_grams(self, free_text: str) -> set[str]:
+        # Слова короче n-граммы в индекс не попадают, поэтому по ним не фильтруем.
+        grams: set[str] = set()
+        for word in self.words(free_text):
+            grams.update(self.word_grams(word))
+        return grams
+
+    def tokens(self, key: bytes, grams: Iterable[str]) -> list[bytes]:
+        return [hmac.digest(key, gram.encode("utf-8"), hashlib.sha256)[: self.token_size] for gram in grams]
+
+    def cached_tokens(self, key: bytes, grams: Iterable[str], cache: dict[str, bytes]) -> list[bytes]:
+        # В пачке записей n-граммы сильно повторяются, поэтому HMAC считается один раз на n-грамму.
+        output: list[bytes] = []
+        for gram in grams:
+            token = cache.get(gram)
+            if token is None:
+                token = hmac.digest(key, gram.encode("utf-8"), hashlib.sha256)[: self.token_size]
+                cache[gram] = token
+            output.append(token)
+        return output
+
+    def replace_entry_tokens(self, conn, entry_id: int, metadata: dict[str, Any], key: Optional[bytes] = None) -> None:
+        index_key = key or self.index_key()
+        conn.execute("DELETE FROM search_tokens WHERE entry_id = ?", (int(entry_id),))
+        conn.executemany(
+            "INSERT OR IGNORE INTO search_tokens (token, entry_id) VALUES (?, ?)",
+            [(token, int(entry_id)) for token in self.tokens(index_key, self.entry_grams(metadata))],
+        )
+
+    def replace_entries_tokens(
+        self,
+        conn,
+        items: Iterable[tuple[int, dict[str, Any]]],
+        key: Optional[bytes] = None,
+    ) -> None:
+        index_key = key or self.index_key()
+        entries = [(int(entry_id), metadata) for entry_id, metadata in items]
+        token_cache: dict[str, bytes] = {}
+        conn.executemany("DELETE FROM search_tokens WHERE entry_id = ?", [(entry_id,) for entry_id, _ in entries])
+        conn.executemany(
+            "INSERT OR IGNORE INTO search_tokens (token, entry_id) VALUES (?, ?)",
+            [
+                (token, entry_id)
+                for entry_id, metadata in entries
+                for token in self.cached_tokens(index_key, self.entry_grams(metadata), token_cache)
+            ],
+        )
+
+    def missing_entry_ids(self, conn) -> list[int]:
+        marker_token = self.tokens(self.index_key(), [self.entry_marker])[0]
+        rows = conn.execute(
+            """
+            SELECT id
+            FROM vault_entries
+            WHERE NOT EXISTS (
+                SELECT 1 FROM search_tokens WHERE search_tokens.token = ? AND search_tokens.entry_id = vault_entries.id
+            )
+            """,
+            (marker_token,),
+        ).fetchall()
+        return [int(row["id"]) for row in rows]
+
+    def candidate_ids(self, conn, free_text: str) -> Optional[list[int]]:
+        grams = self.query_grams(free_text)
+        if not grams:
+            return None
+        tokens = self.tokens(self.index_key(), grams)
+        placeholders = ", ".join("?" for _ in tokens)
+        rows = conn.execute(
+            f"""
+            SELECT entry_id
+            FROM search_tokens
+            WHERE token IN ({placeholders})
+            GROUP BY entry_id
+            HAVING COUNT(*) = ?
+            """,
+            (*tokens, len(tokens)),
+        ).fetchall()
+        return [int(row["entry_id"]) for row in rows]
+
+
+class FuzzyTokenIndex:
+    # Словарь токенов расшифрованных записей живет только в памяти сессии.
+    # Кандидаты выбираются по первой букве и допустимой длине токена, а проверка
+    # та же, что в прежнем fuzzy_contains, поэтому совпадения не меняются.
+    min_query_length = 4
+    max_length_delta = 2
+    quick_ratio_threshold = 0.72
+    ratio_threshold = 0.84
+    match_cache_size = 256
+    token_split_pattern = re.compile(r"\s+")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.ready = False
+        self.entry_tokens: dict[int, frozenset[str]] = {}
+        self.token_entries: dict[str, set[int]] = {}
+        self.buckets: dict[tuple[str, int], set[str]] = {}
+        self.match_cache: dict[str, frozenset[str]] = {}
+
+    def split_tokens(self, text: str) -> frozenset[str]:
+        return frozenset(token for token in self.token_split_pattern.split(str(text or "").lower()) if token)
+
+    def clear(self) -> None:
+        with self.lock:
+            self.ready = False
+            self.entry_tokens.clear()
+            self.token_entries.clear()
+            self.buckets.clear()
+            self.match_cache.clear()
+
+    def build(self, items: Iterable[tuple[int, str]]) -> None:
+        with self.lock:
+            self.entry_tokens.clear()
+            self.token_entries.clear()
+            self.buckets.clear()
+            self.match_cache.clear()
+            for entry_id, text in items:
+                self.put_locked(int(entry_id), text)
+            self.ready = True
+
+    def put(self, entry_id: int, text: str) -> None:
+        with self.lock:
+            if self.ready:
+                self.put_locked(int(entry_id), text)
+
+    def discard(self, entry_id: int) -> None:
+        with self.lock:
+            if self.ready:
+                self.discard_locked(int(entry_id))
+
+    def put_locked(self, entry_id: int, text: str) -> None:
+        self.discard_locked(entry_id)
+        tokens = self.split_tokens(text)
+        self.entry_tokens[entry_id] = tokens
+        for token in tokens:
+            owners = self.token_entries.get(token)
+            if owners is None:
+                owners = set()
+                self.token_entries[token] = owners
+                self.buckets.setdefault((token[0], len(token)), set()).add(token)
+                self.match_cache.clear()
+            owners.add(entry_id)
+
+    def discard_locked(self, entry_id: int) -> None:
+        for token in self.entry_tokens.pop(entry_id, frozenset()):
+            owners = self.token_entries.get(token)
+            if owners is None:
+                continue
+            owners.discard(entry_id)
+            if owners:
+                continue
+            del self.token_entries[token]
+            bucket = self.buckets.get((token[0], len(token)))
+            if bucket is not None:
+                bucket.discard(token)
+                if not bucket:
+                    del self.buckets[(token[0], len(token))]
+            self.match_cache.clear()
+
+    def token_matches(self, token: str, needle: str) -> bool:
+        if token[0] != needle[0]:
+            return False
+        if abs(len(token) - len(needle)) > self.max_length_delta and needle not in token and token not in needle:
+            return False
+        if difflib.SequenceMatcher(a=token, b=needle).quick_ratio() < self.quick_ratio_threshold:
+            return False
+        return difflib.SequenceMatcher(a=token, b=needle).ratio() >= self.ratio_threshold
+
+    def candidate_lengths(self, needle_length: int) -> range:
+        # ratio = 2*M/(|a|+|b|) и M <= min(|a|, |b|): длины вне диапазона порог не пройдут.
+        threshold = self.ratio_threshold
+        shortest = 1
+        while 2 * min(shortest, needle_length) < threshold * (shortest + needle_length):
+            shortest += 1
+        longest = needle_length
+        while 2 * min(longest + 1, needle_length) >= threshold * (longest + 1 + needle_length):
+            longest += 1
+        return range(shortest, longest + 1)
+
+    def matching_tokens_locked(self, needle: str) -> frozenset[str]:
+        cached = self.match_cache.get(needle)
+        if cached is not None:
+            return cached
+        matches = frozenset(
+            token
+            for length in self.candidate_lengths(len(needle))
+            for token in self.buckets.get((needle[0], length), ())
+            if self.token_matches(token, needle)
+        )
+        if len(self.match_cache) >= self.match_cache_size:
+            self.match_cache.clear()
+        self.match_cache[needle] = matches
+        return matches
+
+    def matching_entry_ids(self, needle: str) -> set[int]:
+        ned = str(needle or "").lower()
+        if len(ned) < self.min_query_length:
+            return set()
+        with self.lock:
+            output: set[int] = set()
+            for token in self.matching_tokens_locked(ned):
+                output.update(self.token_entries[token])
+            return output
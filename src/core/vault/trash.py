@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import logging
+import threading
+from typing import Optional
+
+from core.events import TrashPurged
+from core.vault.entry_manager import EntryManager
+
+
+logger = logging.getLogger(__name__)
+
+
+class TrashPurgeScheduler:
+    # Фоновая очистка корзины от строк с истекшим expires_at. Удаляет порциями
+    # по purge_batch_size в отдельных транзакциях с паузой между ними, поэтому
+    # запись из интерфейса вклинивается между порциями, а не ждет всю очистку.
+    # Ключ хранилища не нужен: шифротексты удаляются без расшифровки.
+    interval_sec = 3600.0
+    pause_sec = 0.05
+
+    def __init__(
+        self,
+        entry_manager: EntryManager,
+        interval_sec: Optional[float] = None,
+        batch_size: Optional[int] = None,
+        pause_sec: Optional[float] = None,
+    ):
+        self.entry_manager = entry_manager
+        self.interval_sec = max(1.0, float(interval_sec if interval_sec is not None else self.interval_sec))
+        self.batch_size = max(1, int(batch_size or entry_manager.purge_batch_size))
+        self.pause_sec = max(0.0, float(pause_sec if pause_sec is not None else self.pause_sec))
+        self.stop_event = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+
+    def run_once(self, now: Optional[str] = None) -> int:
+        purged = 0
+        while not self.stop_event.is_set():
+            deleted = self.entry_manager.purge_expired_batch(limit=self.batch_size, now=now)
+            purged += deleted
+            if deleted < self.batch_size:
+                break
+            self.stop_event.wait(self.pause_sec)
+        bus = self.entry_manager.bus
+        if bus is not None and purged:
+            bus.publish(TrashPurged(count=purged))
+        return purged
+
+    def run(self) -> None:
+        while not self.stop_event.is_set():
+            try:
+                self.run_once()
+            except Exception:
+                # База закрыта, писатель занят дольше acquire_timeout_sec (TimeoutError)
+                # или другая ошибка: поток не должен умереть, следующая попытка по расписанию.
+                logger.exception("Trash purge failed")
+            self.stop_event.wait(self.interval_sec)
+
+    def start(self) -> None:
+        if self.thread is not None and self.thread.is_alive():
+            return
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self.run, name="vault-trash-purge", daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join(timeout)
+            self.thread = None
@@ -0,0 +1,363 @@
+from __future__ import annotations
+
+import argparse
+import gzip
+import json
+import os
+import sys
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Iterator, Optional
+
+from database.db import Database, now_iso
+from database.repositories import AuditRecord
+
+
+# Значение по умолчанию для правил rotate(): берется политика класса. Явный None отключает правило.
+USE_DEFAULT: Any = object()
+
+
+@dataclass(frozen=True)
+class AuditSegment:
+    # Диапазон времени берется по минимуму и максимуму строк, а не по первой и
+    # последней: после миграций порядок id и timestamp может не совпадать.
+    file: str
+    first_id: int
+    last_id: int
+    min_timestamp: str
+    max_timestamp: str
+    rows: int
+    size: int
+    created_at: str
+
+    def to_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+    @staticmethod
+    def from_dict(data: dict[str, Any]) -> "AuditSegment":
+        return AuditSegment(
+            file=str(data["file"]),
+            first_id=int(data["first_id"]),
+            last_id=int(data["last_id"]),
+            min_timestamp=str(data["min_timestamp"]),
+            max_timestamp=str(data["max_timestamp"]),
+            rows=int(data["rows"]),
+            size=int(data.get("size", 0)),
+            created_at=str(data.get("created_at", "")),
+        )
+
+    def overlaps(self, date_from: Optional[str], date_to: Optional[str]) -> bool:
+        if date_from is not None and self.max_timestamp < date_from:
+            return False
+        if date_to is not None and self.min_timestamp > date_to:
+            return False
+        return True
+
+
+class AuditArchive:
+    # Старые строки audit_log переносятся в сжатые gzip-сегменты рядом с базой
+    # (<база>.audit/), индекс сегментов с диапазонами id и времени - segments.json.
+    # Строка сегмента: "<timestamp>\t<JSON-массив columns>"; фильтр по времени
+    # сравнивает префикс и разбирает JSON только у подходящих строк.
+    # Сегмент пишется один раз и больше не меняется; строки удаляются из базы только
+    # после того, как сегмент и индекс уже на диске, и только те, что совпадают с
+    # содержимым сегмента по id и времени. Граница архива хранится и в самой базе
+    # (settings, mark_key) и меняется в той же транзакции, что и удаление: после
+    # restore из старой копии граница в базе отстает от индекса, AUTOINCREMENT
+    # снова выдает уже архивные id, и такие новые строки сохраняются под новыми id.
+    manifest_name = "segments.json"
+    format_version = 1
+    # Политика по умолчанию: в базе остаются не больше keep_rows последних строк
+    # и только строки моложе max_age_days; None отключает правило.
+    keep_rows: Optional[int] = 50000
+    max_age_days: Optional[int] = 180
+    segment_rows = 10000
+    compress_level = 6
+    columns = ("id", "action", "timestamp", "entry_id", "details", "signature")
+    mark_key = "audit_archive_last_id"
+
+    def __init__(self, db: Database, directory: Optional[Path] = None):
+        self.db = db
+        self.directory = Path(directory) if directory is not None else db.db_path.with_name(db.db_path.name + ".audit")
+
+    @property
+    def manifest_path(self) -> Path:
+        return self.directory / self.manifest_name
+
+    def load_manifest(self) -> dict[str, Any]:
+        if not self.manifest_path.exists():
+            return {"format": self.format_version, "segments": []}
+        try:
+            manifest = json.loads(self.manifest_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError) as exc:
+            raise ValueError("Индекс архива аудита поврежден.") from exc
+        if int(manifest.get("format", 0)) != self.format_version:
+            raise ValueError("Неподдерживаемый формат архива аудита.")
+        return manifest
+
+    def save_manifest(self, manifest: dict[str, Any]) -> None:
+        partial = self.manifest_path.with_name(self.manifest_name + ".part")
+        partial.write_text(json.dumps(manifest, ensure_ascii=False, indent=2), encoding="utf-8")
+        os.replace(partial, self.manifest_path)
+
+    def segments(self) -> list[AuditSegment]:
+        return [AuditSegment.from_dict(item) for item in self.load_manifest()["segments"]]
+
+    def read_mark(self, conn: Any) -> int:
+        row = conn.execute("SELECT setting_value FROM settings WHERE setting_key = ?", (self.mark_key,)).fetchone()
+        return int(row[0]) if row is not None and row[0] else 0
+
+    def write_mark(self, conn: Any, last_id: int) -> None:
+        conn.execute(
+            """
+            INSERT INTO settings (setting_key, setting_value, encrypted)
+            VALUES (?, ?, 0)
+            ON CONFLICT(setting_key) DO UPDATE SET setting_value=excluded.setting_value, encrypted=excluded.encrypted
+            """,
+            (self.mark_key, str(int(last_id))),
+        )
+
+    @staticmethod
+    def same_row(row: Any, held: dict[int, tuple[Any, Any, Any]]) -> bool:
+        return held.get(int(row["id"])) == (row["timestamp"], row["action"], row["details"])
+
+    def reconcile(self, segments: list[AuditSegment]) -> int:
+        # Сверка базы с индексом сегментов. Строки с id <= границы индекса,
+        # совпадающие с архивом, - дубли (сбой до удаления, restore старой копии,
+        # цепочка копий с базой старше ротации): удаляются. Несовпадающие появились
+        # после restore под уже архивными id: получают id выше архива, порядок по
+        # времени у них сохраняется.
+        archived = segments[-1].last_id if segments else 0
+        with self.db.session() as conn:
+            mark = self.read_mark(conn)
+            if mark > archived:
+                raise ValueError("Архив аудита не согласован с базой: в индексе нет уже перенесенных сегментов.")
+            lowest = conn.execute("SELECT MIN(id) FROM audit_log").fetchone()[0]
+            if mark == archived and (lowest is None or int(lowest) > archived):
+                return archived
+            live = conn.execute(
+                "SELECT id, action, timestamp, details FROM audit_log WHERE id <= ? ORDER BY id",
+                (archived,),
+            ).fetchall()
+            if live:
+                held: dict[int, tuple[Any, Any, Any]] = {}
+                for segment in segments:
+                    if segment.last_id >= int(live[0]["id"]) and segment.first_id <= int(live[-1]["id"]):
+                        for row in self.read_segment(segment):
+                            held[int(row["id"])] = (row["timestamp"], row["action"], row["details"])
+                conn.executemany(
+                    "DELETE FROM audit_log WHERE id = ?",
+                    [(int(row["id"]),) for row in live if self.same_row(row, held)],
+                )
+                next_id = max(archived, int(conn.execute("SELECT COALESCE(MAX(id), 0) FROM audit_log").fetchone()[0])) + 1
+                for row in live:
+                    if not self.same_row(row, held):
+                        conn.execute("UPDATE audit_log SET id = ? WHERE id = ?", (next_id, int(row["id"])))
+                        next_id += 1
+            # Новые строки не должны снова получить архивные id.
+            top = max(archived, int(conn.execute("SELECT COALESCE(MAX(id), 0) FROM audit_log").fetchone()[0]))
+            if conn.execute("UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = 'audit_log'", (top,)).rowcount == 0:
+                conn.execute("INSERT INTO sqlite_sequence (name, seq) VALUES ('audit_log', ?)", (top,))
+            self.write_mark(conn, archived)
+        return archived
+
+    def rotation_cutoff(self, keep_rows: Optional[int], max_age_days: Optional[int]) -> int:
+        # Наибольший id, который нужно убрать из базы по любому из правил.
+        cutoff = 0
+        with self.db.read_session() as conn:
+            if keep_rows is not None:
+                row = conn.execute(
+                    "SELECT id FROM audit_log ORDER BY id DESC LIMIT 1 OFFSET ?",
+                    (max(0, int(keep_rows)),),
+                ).fetchone()
+                if row is not None:
+                    cutoff = max(cutoff, int(row[0]))
+            if max_age_days is not None:
+                border = datetime.now(timezone.utc) - timedelta(days=max(0, int(max_age_days)))
+                row = conn.execute(
+                    "SELECT MAX(id) FROM audit_log WHERE timestamp < ?",
+                    (border.isoformat(timespec="seconds"),),
+                ).fetchone()
+                if row is not None and row[0] is not None:
+                    cutoff = max(cutoff, int(row[0]))
+        return cutoff
+
+    def write_segment(self, index: int, rows: list[Any]) -> AuditSegment:
+        first_id, last_id = int(rows[0]["id"]), int(rows[-1]["id"])
+        name = f"{index:06d}-{first_id}-{last_id}.jsonl.gz"
+        target = self.directory / name
+        partial = target.with_name(name + ".part")
+        # Сегмент собирается целиком и сжимается одним вызовом: запись по строке в
+        # GzipFile стоит отдельного compress на каждую строку.
+        encode = json.JSONEncoder(ensure_ascii=False).encode
+        body = "".join(f"{row['timestamp']}\t{encode([row[column] for column in self.columns])}\n" for row in rows)
+        with open(partial, "wb") as raw:
+            raw.write(gzip.compress(body.encode("utf-8"), compresslevel=self.compress_level, mtime=0))
+            raw.flush()
+            os.fsync(raw.fileno())
+        Database.restrict_file_permissions(partial)
+        os.replace(partial, target)
+        timestamps = [str(row["timestamp"] or "") for row in rows]
+        return AuditSegment(
+            file=name,
+            first_id=first_id,
+            last_id=last_id,
+            min_timestamp=min(timestamps),
+            max_timestamp=max(timestamps),
+            rows=len(rows),
+            size=target.stat().st_size,
+            created_at=now_iso(),
+        )
+
+    def rotate(
+        self,
+        keep_rows: Optional[int] = USE_DEFAULT,
+        max_age_days: Optional[int] = USE_DEFAULT,
+        segment_rows: Optional[int] = None,
+        max_segments: Optional[int] = None,
+    ) -> list[AuditSegment]:
+        # max_segments ограничивает работу за один вызов: остаток переносится следующим.
+        keep_rows = self.keep_rows if keep_rows is USE_DEFAULT else keep_rows
+        max_age_days = self.max_age_days if max_age_days is USE_DEFAULT else max_age_days
+        segment_rows = max(1, int(segment_rows or self.segment_rows))
+        self.directory.mkdir(parents=True, exist_ok=True)
+        manifest = self.load_manifest()
+        archived = self.reconcile([AuditSegment.from_dict(item) for item in manifest["segments"]])
+
+        cutoff = self.rotation_cutoff(keep_rows, max_age_days)
+        created: list[AuditSegment] = []
+        column_list = ", ".join(self.columns)
+        # Каждый сегмент - отдельная транзакция удаления: запись аудита не ждет всю ротацию.
+        while archived < cutoff and (max_segments is None or len(created) < max_segments):
+            with self.db.read_session() as conn:
+                rows = conn.execute(
+                    f"SELECT {column_list} FROM audit_log WHERE id > ? AND id <= ? ORDER BY id LIMIT ?",
+                    (archived, cutoff, segment_rows),
+                ).fetchall()
+            if not rows:
+                break
+            segment = self.write_segment(len(manifest["segments"]), rows)
+            manifest["segments"].append(segment.to_dict())
+            self.save_manifest(manifest)
+            with self.db.session() as conn:
+                conn.executemany(
+                    "DELETE FROM audit_log WHERE id = ? AND timestamp = ?",
+                    [(int(row["id"]), row["timestamp"]) for row in rows],
+                )
+                self.write_mark(conn, segment.last_id)
+            archived = segment.last_id
+            created.append(segment)
+        return created
+
+    def read_segment(
+        self,
+        segment: AuditSegment,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+    ) -> Iterator[dict[str, Any]]:
+        path = self.directory / segment.file
+        if not path.is_file():
+            raise ValueError(f"Сегмент архива аудита не найден: {segment.file}.")
+        try:
+            lines = gzip.decompress(path.read_bytes()).decode("utf-8").splitlines()
+        except (OSError, EOFError, ValueError) as exc:
+            raise ValueError(f"Сегмент архива аудита поврежден: {segment.file}.") from exc
+        if len(lines) != segment.rows:
+            raise ValueError(f"Сегмент архива аудита поврежден: {segment.file}.")
+        for line in lines:
+            timestamp, _, payload = line.partition("\t")
+            if (date_from is not None and timestamp < date_from) or (date_to is not None and timestamp > date_to):
+                continue
+            try:
+                yield dict(zip(self.columns, json.loads(payload)))
+            except ValueError as exc:
+                raise ValueError(f"Сегмент архива аудита поврежден: {segment.file}.") from exc
+
+    def segments_between(self, date_from: Optional[str] = None, date_to: Optional[str] = None) -> list[AuditSegment]:
+        return [segment for segment in self.segments() if segment.overlaps(date_from, date_to)]
+
+    def query(
+        self,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+        action: Optional[str] = None,
+    ) -> list[AuditRecord]:
+        # Открываются только сегменты, чей диапазон времени пересекает запрос. Строка
+        # базы пропускается, только если та же строка (id, время, действие, детали)
+        # уже есть в прочитанном сегменте: после restore архивные id могут принадлежать новым строкам.
+        def record(row: Any) -> AuditRecord:
+            return AuditRecord(
+                id=int(row["id"]),
+                action=row["action"] or "",
+                details=row["details"] or "",
+                timestamp=row["timestamp"] or "",
+            )
+
+        archived_rows = [
+            row
+            for segment in self.segments()
+            if segment.overlaps(date_from, date_to)
+            for row in self.read_segment(segment, date_from, date_to)
+            if action is None or row["action"] == action
+        ]
+        held = {int(row["id"]): (row["timestamp"], row["action"], row["details"]) for row in archived_rows}
+        records = [record(row) for row in archived_rows]
+        sql = f"SELECT {', '.join(self.columns)} FROM audit_log WHERE 1 = 1"
+        params: list[Any] = []
+        if date_from is not None:
+            sql += " AND timestamp >= ?"
+            params.append(date_from)
+        if date_to is not None:
+            sql += " AND timestamp <= ?"
+            params.append(date_to)
+        if action is not None:
+            sql += " AND action = ?"
+            params.append(action)
+        with self.db.read_session() as conn:
+            records.extend(
+                record(row) for row in conn.execute(sql + " ORDER BY id", params) if not self.same_row(row, held)
+            )
+        return records
+
+
+def policy_value(text: str) -> Optional[int]:
+    return None if text.strip().lower() == "none" else int(text)
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    # python -m database.audit_archive {rotate,query} (из каталога src). Мастер-пароль не нужен:
+    # записи аудита не зашифрованы.
+    from core.vault.headless import resolve_db_path
+
+    parser = argparse.ArgumentParser(description="Архив журнала аудита CryptoSafe: ротация и выборка по времени.")
+    parser.add_argument("command", choices=("rotate", "query"))
+    parser.add_argument("--db", type=Path, default=None, help="путь к базе; по умолчанию из конфига")
+    parser.add_argument("--directory", type=Path, default=None, help="каталог сегментов; по умолчанию <база>.audit")
+    parser.add_argument("--keep-rows", type=policy_value, default=USE_DEFAULT, help="число или none - без ограничения")
+    parser.add_argument("--max-age-days", type=policy_value, default=USE_DEFAULT, help="дни или none - без ограничения")
+    parser.add_argument("--from", dest="date_from", default=None, help="начало диапазона (ISO 8601)")
+    parser.add_argument("--to", dest="date_to", default=None, help="конец диапазона (ISO 8601)")
+    parser.add_argument("--action", default=None)
+    args = parser.parse_args(argv)
+
+    db = Database(resolve_db_path(args.db))
+    try:
+        db.connect()
+        archive = AuditArchive(db, args.directory)
+        if args.command == "rotate":
+            segments = archive.rotate(keep_rows=args.keep_rows, max_age_days=args.max_age_days)
+            print(f"Сегментов создано: {len(segments)}, строк перенесено: {sum(s.rows for s in segments)}.")
+        else:
+            for item in archive.query(date_from=args.date_from, date_to=args.date_to, action=args.action):
+                print(f"{item.id}\t{item.timestamp}\t{item.action}\t{item.details}")
+    except ValueError as exc:
+        print(exc, file=sys.stderr)
+        return 1
+    finally:
+        db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,376 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import shutil
+import sqlite3
+import sys
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Optional
+
+from database.db import Database, now_iso
+from database.models import SCHEMA
+
+
+@dataclass(frozen=True)
+class BackupWatermark:
+    # Строки с updated_at >= entries_since, id > entries_max_id или поколением ключа
+    # выше key_generation считаются измененными после снимка.
+    entries_since: str
+    entries_max_id: int
+    key_generation: int
+    deleted_max_id: int
+    audit_max_id: int
+    entry_count: int
+
+
+@dataclass(frozen=True)
+class BackupStep:
+    file: str
+    kind: str
+    created_at: str
+    watermark: BackupWatermark
+    size: int
+    changed_entries: int = 0
+    removed_entries: int = 0
+
+    def to_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+    @staticmethod
+    def from_dict(data: dict[str, Any]) -> "BackupStep":
+        return BackupStep(
+            file=str(data["file"]),
+            kind=str(data["kind"]),
+            created_at=str(data["created_at"]),
+            watermark=BackupWatermark(**data["watermark"]),
+            size=int(data.get("size", 0)),
+            changed_entries=int(data.get("changed_entries", 0)),
+            removed_entries=int(data.get("removed_entries", 0)),
+        )
+
+
+class BackupChain:
+    # Каталог цепочки: chain.json, базовая полная копия и инкременты по порядку.
+    # Инкремент - файл SQLite той же схемы, где лежат только изменившиеся строки,
+    # новые записи аудита и корзины, id удаленных записей и целиком малые таблицы.
+    # Удаленные id - разность множества id предыдущего шага и текущего: так
+    # учитываются и перенос в корзину, и удаление мимо нее.
+    manifest_name = "chain.json"
+    format_version = 1
+    # Время updated_at ставится до коммита, поэтому окно берется с запасом:
+    # строки из этого окна копируются повторно, но повторное применение безвредно.
+    watermark_overlap_sec = 300
+    replaced_tables = ("key_store", "settings", "reencryption_checkpoint")
+    increment_schema = """
+CREATE TABLE IF NOT EXISTS removed_entries (entry_id INTEGER PRIMARY KEY);
+CREATE TABLE IF NOT EXISTS trash_ids (id INTEGER PRIMARY KEY);
+CREATE TABLE IF NOT EXISTS entry_ids (id INTEGER PRIMARY KEY);
+"""
+
+    def __init__(self, db: Database, directory: Path):
+        self.db = db
+        self.directory = Path(directory)
+
+    @property
+    def manifest_path(self) -> Path:
+        return self.directory / self.manifest_name
+
+    def load_manifest(self) -> dict[str, Any]:
+        if not self.manifest_path.exists():
+            return {"format": self.format_version, "schema_version": self.db.SCHEMA_VERSION, "steps": []}
+        try:
+            manifest = json.loads(self.manifest_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError) as exc:
+            raise ValueError("Манифест цепочки резервных копий поврежден.") from exc
+        if int(manifest.get("format", 0)) != self.format_version:
+            raise ValueError("Неподдерживаемый формат цепочки резервных копий.")
+        return manifest
+
+    def save_manifest(self, manifest: dict[str, Any]) -> None:
+        partial = self.manifest_path.with_name(self.manifest_name + ".part")
+        partial.write_text(json.dumps(manifest, ensure_ascii=False, indent=2), encoding="utf-8")
+        os.replace(partial, self.manifest_path)
+
+    def steps(self) -> list[BackupStep]:
+        return [BackupStep.from_dict(item) for item in self.load_manifest()["steps"]]
+
+    def read_watermark(self, conn: sqlite3.Connection, schema: str = "main") -> BackupWatermark:
+        since = datetime.now(timezone.utc) - timedelta(seconds=self.watermark_overlap_sec)
+        row = conn.execute(
+            f"""
+            SELECT
+                (SELECT COALESCE(MAX(id), 0) FROM {schema}.vault_entries),
+                (SELECT COALESCE(MIN(key_generation), 0) FROM {schema}.vault_entries),
+                (SELECT COUNT(*) FROM {schema}.vault_entries),
+                (SELECT COALESCE(MAX(id), 0) FROM {schema}.deleted_entries),
+                (SELECT COALESCE(MAX(id), 0) FROM {schema}.audit_log)
+            """
+        ).fetchone()
+        return BackupWatermark(
+            entries_since=since.isoformat(timespec="seconds"),
+            entries_max_id=int(row[0]),
+            key_generation=int(row[1]),
+            entry_count=int(row[2]),
+            deleted_max_id=int(row[3]),
+            audit_max_id=int(row[4]),
+        )
+
+    @staticmethod
+    def shared_columns(conn: sqlite3.Connection, table: str, left: str = "main", right: str = "inc") -> str:
+        # Явный список столбцов: после миграций порядок столбцов в файлах может отличаться.
+        left_columns = [str(row[1]) for row in conn.execute(f"PRAGMA {left}.table_info({table});")]
+        right_columns = {str(row[1]) for row in conn.execute(f"PRAGMA {right}.table_info({table});")}
+        return ", ".join(column for column in left_columns if column in right_columns)
+
+    def step_name(self, index: int, kind: str) -> str:
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        return f"{index:04d}-{kind}-{stamp}.db"
+
+    def create_base(self, pages_per_step: Optional[int] = None) -> BackupStep:
+        # Новая базовая копия начинает цепочку заново; прежние файлы удаляются
+        # только после того, как манифест уже указывает на новую базу.
+        self.directory.mkdir(parents=True, exist_ok=True)
+        previous = self.load_manifest()["steps"] if self.manifest_path.exists() else []
+        name = self.step_name(0, "full")
+        captured: list[BackupWatermark] = []
+        self.db.backup(
+            self.directory / name,
+            pages_per_step=pages_per_step,
+            on_snapshot=lambda conn: captured.append(self.read_watermark(conn)),
+        )
+        step = BackupStep(
+            file=name,
+            kind="full",
+            created_at=now_iso(),
+            watermark=captured[0],
+            size=(self.directory / name).stat().st_size,
+            changed_entries=captured[0].entry_count,
+        )
+        self.save_manifest(
+            {"format": self.format_version, "schema_version": self.db.SCHEMA_VERSION, "steps": [step.to_dict()]}
+        )
+        for item in previous:
+            if item["file"] != name:
+                (self.directory / item["file"]).unlink(missing_ok=True)
+        return step
+
+    def create_increment(self) -> BackupStep:
+        manifest = self.load_manifest()
+        steps = [BackupStep.from_dict(item) for item in manifest["steps"]]
+        if not steps:
+            raise ValueError("Нет базовой копии: сначала создай полную резервную копию.")
+        if int(manifest.get("schema_version", 0)) != self.db.SCHEMA_VERSION:
+            raise ValueError("Схема базы изменилась после базовой копии: создай новую полную копию.")
+        previous = steps[-1].watermark
+        previous_path = self.directory / steps[-1].file
+        if not previous_path.is_file():
+            raise ValueError(f"Файл цепочки резервных копий не найден: {steps[-1].file}.")
+
+        name = self.step_name(len(steps), "incr")
+        target = self.directory / name
+        partial = target.with_name(name + ".part")
+        partial.unlink(missing_ok=True)
+        with sqlite3.connect(partial) as increment:
+            increment.executescript(SCHEMA + self.increment_schema)
+            increment.execute(f"PRAGMA user_version = {self.db.SCHEMA_VERSION};")
+        increment.close()
+
+        source = sqlite3.connect(self.db.db_path)
+        try:
+            source.execute("PRAGMA busy_timeout = 5000;")
+            source.execute("ATTACH DATABASE ? AS inc;", (str(partial),))
+            source.execute("ATTACH DATABASE ? AS prev;", (str(previous_path),))
+            previous_ids = self.step_entry_ids(source, steps[-1].kind)
+            # Одна транзакция: main читается снимком и писателей не блокирует, пишется только inc.
+            # UNION вместо OR: каждая ветка идет по своему индексу, а не полным проходом.
+            source.execute("BEGIN;")
+            watermark = self.read_watermark(source)
+            entry_columns = self.shared_columns(source, "vault_entries")
+            source.execute(
+                f"""
+                INSERT INTO inc.vault_entries ({entry_columns})
+                SELECT {entry_columns}
+                FROM main.vault_entries
+                WHERE id IN (
+                    SELECT id FROM main.vault_entries WHERE updated_at >= ?
+                    UNION SELECT id FROM main.vault_entries WHERE id > ?
+                    UNION SELECT id FROM main.vault_entries WHERE key_generation > ?
+                )
+                """,
+                (previous.entries_since, previous.entries_max_id, previous.key_generation),
+            )
+            token_columns = self.shared_columns(source, "search_tokens")
+            source.execute(
+                f"""
+                INSERT INTO inc.search_tokens ({token_columns})
+                SELECT {token_columns}
+                FROM main.search_tokens
+                WHERE entry_id IN (SELECT id FROM inc.vault_entries)
+                """
+            )
+            deleted_columns = self.shared_columns(source, "deleted_entries")
+            # Корзина тоже перешифровывается на месте: такие строки берутся по key_generation.
+            source.execute(
+                f"""
+                INSERT INTO inc.deleted_entries ({deleted_columns})
+                SELECT {deleted_columns}
+                FROM main.deleted_entries
+                WHERE id > ? OR key_generation > ?
+                """,
+                (previous.deleted_max_id, previous.key_generation),
+            )
+            if int(source.execute(f"SELECT COUNT(*) FROM ({previous_ids})").fetchone()[0]) != previous.entry_count:
+                raise ValueError("Цепочка резервных копий не согласована: создай новую полную копию.")
+            source.execute("INSERT INTO inc.entry_ids (id) SELECT id FROM main.vault_entries")
+            source.execute(
+                f"""
+                INSERT INTO inc.removed_entries (entry_id)
+                {previous_ids}
+                EXCEPT SELECT id FROM inc.entry_ids
+                """
+            )
+            source.execute("INSERT INTO inc.trash_ids (id) SELECT id FROM main.deleted_entries")
+            audit_columns = self.shared_columns(source, "audit_log")
+            source.execute(
+                f"INSERT INTO inc.audit_log ({audit_columns}) SELECT {audit_columns} FROM main.audit_log WHERE id > ?",
+                (previous.audit_max_id,),
+            )
+            for table in self.replaced_tables:
+                columns = self.shared_columns(source, table)
+                source.execute(f"INSERT INTO inc.{table} ({columns}) SELECT {columns} FROM main.{table}")
+            changed = int(source.execute("SELECT COUNT(*) FROM inc.vault_entries").fetchone()[0])
+            removed = int(source.execute("SELECT COUNT(*) FROM inc.removed_entries").fetchone()[0])
+            source.commit()
+            source.execute("DETACH DATABASE prev;")
+            source.execute("DETACH DATABASE inc;")
+        except Exception:
+            source.close()
+            partial.unlink(missing_ok=True)
+            raise
+        source.close()
+
+        Database.restrict_file_permissions(partial)
+        os.replace(partial, target)
+        step = BackupStep(
+            file=name,
+            kind="incr",
+            created_at=now_iso(),
+            watermark=watermark,
+            size=target.stat().st_size,
+            changed_entries=changed,
+            removed_entries=removed,
+        )
+        manifest["steps"].append(step.to_dict())
+        self.save_manifest(manifest)
+        return step
+
+    @staticmethod
+    def step_entry_ids(conn: sqlite3.Connection, kind: str) -> str:
+        # Запрос id записей предыдущего шага, подключенного как prev: у полной
+        # копии это сама таблица, у инкремента - сохраненное множество entry_ids.
+        if kind == "full":
+            return "SELECT id FROM prev.vault_entries"
+        row = conn.execute("SELECT 1 FROM prev.sqlite_master WHERE type = 'table' AND name = 'entry_ids'").fetchone()
+        if row is None:
+            raise ValueError("Инкремент создан прежней версией без списка записей: создай новую полную копию.")
+        return "SELECT id FROM prev.entry_ids"
+
+    def apply_increment(self, conn: sqlite3.Connection, path: Path) -> None:
+        conn.execute("ATTACH DATABASE ? AS inc;", (str(path),))
+        try:
+            conn.execute("BEGIN;")
+            conn.execute(
+                """
+                DELETE FROM main.search_tokens
+                WHERE entry_id IN (SELECT entry_id FROM inc.removed_entries UNION SELECT id FROM inc.vault_entries)
+                """
+            )
+            conn.execute("DELETE FROM main.vault_entries WHERE id IN (SELECT entry_id FROM inc.removed_entries)")
+            for table, statement in (
+                ("vault_entries", "INSERT OR REPLACE"),
+                ("search_tokens", "INSERT OR IGNORE"),
+                ("deleted_entries", "INSERT OR REPLACE"),
+                ("audit_log", "INSERT OR IGNORE"),
+            ):
+                columns = self.shared_columns(conn, table)
+                conn.execute(f"{statement} INTO main.{table} ({columns}) SELECT {columns} FROM inc.{table}")
+            conn.execute("DELETE FROM main.deleted_entries WHERE id NOT IN (SELECT id FROM inc.trash_ids)")
+            for table in self.replaced_tables:
+                columns = self.shared_columns(conn, table)
+                conn.execute(f"DELETE FROM main.{table}")
+                conn.execute(f"INSERT INTO main.{table} ({columns}) SELECT {columns} FROM inc.{table}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.execute("DETACH DATABASE inc;")
+
+    def restore(self, upto: Optional[int] = None) -> BackupStep:
+        # База и инкременты собираются во временном файле рядом с рабочей базой,
+        # а подмена рабочего файла идет через Database.restore с его проверками.
+        steps = self.steps()
+        if not steps or steps[0].kind != "full":
+            raise ValueError("Цепочка резервных копий пуста или не начинается с полной копии.")
+        chosen = steps[: (upto + 1) if upto is not None else len(steps)]
+        for step in chosen:
+            if not (self.directory / step.file).is_file():
+                raise ValueError(f"Файл цепочки резервных копий не найден: {step.file}.")
+
+        staged = self.db.db_path.with_name(self.db.db_path.name + ".chain")
+        staged.unlink(missing_ok=True)
+        try:
+            shutil.copyfile(self.directory / chosen[0].file, staged)
+            conn = sqlite3.connect(staged, isolation_level=None)
+            try:
+                for step in chosen[1:]:
+                    self.apply_increment(conn, self.directory / step.file)
+                count = int(conn.execute("SELECT COUNT(*) FROM vault_entries").fetchone()[0])
+            finally:
+                conn.close()
+            if count != chosen[-1].watermark.entry_count:
+                raise ValueError("Цепочка резервных копий не согласована: создай новую полную копию.")
+            self.db.restore(staged)
+        finally:
+            staged.unlink(missing_ok=True)
+        return chosen[-1]
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    # Без Qt и без мастер-пароля: копируются только шифротексты.
+    # python -m database.backup_chain {full,incremental,restore} <каталог> (из каталога src).
+    from core.vault.headless import resolve_db_path
+
+    parser = argparse.ArgumentParser(description="Цепочка резервных копий CryptoSafe: полная копия и инкременты.")
+    parser.add_argument("command", choices=("full", "incremental", "restore"))
+    parser.add_argument("directory", type=Path)
+    parser.add_argument("--db", type=Path, default=None, help="путь к базе; по умолчанию из конфига")
+    parser.add_argument("--upto", type=int, default=None, help="восстановить до шага с этим номером")
+    args = parser.parse_args(argv)
+
+    db = Database(resolve_db_path(args.db))
+    try:
+        if args.command != "restore":
+            db.connect()
+        chain = BackupChain(db, args.directory)
+        if args.command == "full":
+            step = chain.create_base()
+        elif args.command == "incremental":
+            step = chain.create_increment()
+        else:
+            step = chain.restore(upto=args.upto)
+    except ValueError as exc:
+        print(exc, file=sys.stderr)
+        return 1
+    finally:
+        db.close()
+    print(f"{step.kind}: {step.file}, записей изменено {step.changed_entries}, удалено {step.removed_entries}.")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
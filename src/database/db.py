@@ -1,15 +1,20 @@
 import base64
 import os
 import queue
+import re
 import sqlite3
 import stat
 import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Iterator
+from typing import Callable, Iterator, Optional
 
-from database.models import SCHEMA
+from database.models import SCHEMA, SEARCH_TOKENS_SCHEMA
+from database.pool_stats import PoolMetrics, PoolStats
 
 
 def b64_text(value: object) -> str:
@@ -20,28 +25,162 @@ def b64_text(value: object) -> str:
     raise TypeError("Неподдерживаемый тип для base64-текста")
 
 
-def key_payload_as_text(value: object) -> str:
+def ciphertext_blob(value: object) -> Optional[bytes]:
+    if value is None:
+        return None
     if isinstance(value, (bytes, bytearray, memoryview)):
-        return base64.b64encode(bytes(value)).decode("utf-8")
+        return bytes(value)
     if isinstance(value, str):
-        return value
-    raise TypeError("Неподдерживаемый тип key_data")
+        if not value:
+            return b""
+        try:
+            return base64.b64decode(value.encode("utf-8"), validate=True)
+        except Exception:
+            return value.encode("utf-8")
+    raise TypeError("Неподдерживаемый тип шифротекста")
+
+
+def key_payload_as_blob(value: object) -> bytes:
+    # Та же логика, что и в KeyManager.decode_key_data_from_storage для текстовых значений.
+    blob = ciphertext_blob(value)
+    if blob is None:
+        raise TypeError("Неподдерживаемый тип key_data")
+    return blob
+
+
+def token_blob(value: object) -> Optional[bytes]:
+    if isinstance(value, str):
+        try:
+            return bytes.fromhex(value)
+        except ValueError:
+            return value.encode("utf-8")
+    return ciphertext_blob(value)
+
+
+def iter_rows(cursor: sqlite3.Cursor, batch_size: int = 500) -> Iterator[sqlite3.Row]:
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            return
+        yield from rows
 
 
 def now_iso() -> str:
     return datetime.now(timezone.utc).isoformat(timespec="seconds")
 
 
-class Database:
-    SCHEMA_VERSION = 5
+class PooledConnection(sqlite3.Connection):
+    # Поколение пула и время последнего возврата: по ним пул отбрасывает
+    # соединения закрытого пула и проверяет долго простаивавшие.
+    pool_generation = 0
+    last_used = 0.0
+
 
-    def __init__(self, db_path: Path):
+class Database:
+    # Пул из pool_size соединений только для чтения (PRAGMA query_only) и одно
+    # соединение-писатель. Запись сериализуется блокировкой писателя, чтение идет
+    # параллельно: в WAL читатели видят свой снимок и запись не задерживают.
+    SCHEMA_VERSION = 10
+    pool_size = 4
+    acquire_timeout_sec = 30.0
+    # Простаивавшее дольше соединение перед выдачей проверяется SELECT 1.
+    health_check_idle_sec = 60.0
+    connection_pragmas = {
+        "foreign_keys": "ON",
+        "journal_mode": "WAL",
+        "busy_timeout": "5000",
+        "synchronous": "NORMAL",
+    }
+    pragma_value_pattern = re.compile(r"^-?[A-Za-z0-9_]+$")
+    backup_pages_per_step = 1024
+    backup_sleep_sec = 0.0
+    backup_required_tables = ("vault_entries", "deleted_entries", "audit_log", "settings", "key_store")
+    # Сколько restore() ждет возврата соединений, выданных другим потокам.
+    restore_drain_timeout_sec = 10.0
+
+    def __init__(
+        self,
+        db_path: Path,
+        pool_size: Optional[int] = None,
+        acquire_timeout_sec: Optional[float] = None,
+        pragmas: Optional[dict[str, object]] = None,
+    ):
         self.db_path = Path(db_path)
         self.lock = threading.Lock()
-        self.pool: "queue.Queue[sqlite3.Connection]" = queue.Queue()
-        self.pool_size = 4
+        self.pool: "queue.Queue[PooledConnection]" = queue.Queue()
+        self.pool_size = max(1, int(pool_size or self.pool_size))
+        self.acquire_timeout_sec = max(
+            0.0, float(acquire_timeout_sec if acquire_timeout_sec is not None else self.acquire_timeout_sec)
+        )
+        self.pragmas = {**self.connection_pragmas, **(pragmas or {})}
+        for name, value in self.pragmas.items():
+            if not str(name).isidentifier() or not self.pragma_value_pattern.match(str(value)):
+                raise ValueError(f"Недопустимая PRAGMA: {name} = {value}.")
+        self.pool_generation = 0
+        self.metrics = PoolMetrics()
+        self.writer: Optional[PooledConnection] = None
+        self.writer_lock = threading.Lock()
+        self.writer_owner: Optional[int] = None
+        self.writer_metrics = PoolMetrics()
+        self.executor: Optional[ThreadPoolExecutor] = None
+        self.executor_lock = threading.Lock()
+        self.restore_listeners: list[Callable[[], Optional[Callable[[], None]]]] = []
         self.initialized = False
 
+    def add_restore_listener(self, listener: Callable[[], None]) -> None:
+        # После restore() под открытыми объектами лежит другой файл: слушатели
+        # сбрасывают все, что построено по прежнему (кэши, ключ сессии).
+        # Держатся слабо, как слушатели кэша ключа.
+        if hasattr(listener, "__self__") and hasattr(listener, "__func__"):
+            ref: Callable[[], Optional[Callable[[], None]]] = weakref.WeakMethod(listener)
+        else:
+            ref = lambda: listener
+        with self.lock:
+            self.restore_listeners.append(ref)
+
+    def notify_restore_listeners(self) -> None:
+        with self.lock:
+            refs = list(self.restore_listeners)
+        alive: list[Callable[[], Optional[Callable[[], None]]]] = []
+        for ref in refs:
+            listener = ref()
+            if listener is None:
+                continue
+            alive.append(ref)
+            listener()
+        with self.lock:
+            self.restore_listeners = alive
+
+    def get_executor(self) -> ThreadPoolExecutor:
+        # Потоки для асинхронного фасада: по одному на читателя и один на писателя,
+        # больше пул соединений все равно не обслужит одновременно.
+        with self.executor_lock:
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(
+                    max_workers=self.pool_size + 1,
+                    thread_name_prefix="cryptosafe-db",
+                )
+            return self.executor
+
+    def shutdown_executor(self) -> None:
+        # Без ожидания: close() может прийти из потока этого же пула (restore).
+        with self.executor_lock:
+            executor = self.executor
+            self.executor = None
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+    def open_connection(self, read_only: bool = False) -> PooledConnection:
+        conn = sqlite3.connect(self.db_path, check_same_thread=False, factory=PooledConnection)
+        conn.row_factory = sqlite3.Row
+        for name, value in self.pragmas.items():
+            conn.execute(f"PRAGMA {name} = {value};")
+        if read_only:
+            conn.execute("PRAGMA query_only = ON;")
+        conn.pool_generation = self.pool_generation
+        conn.last_used = time.monotonic()
+        return conn
+
     def connect(self) -> None:
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
 
@@ -49,26 +188,27 @@ class Database:
             if self.initialized:
                 return
 
+            self.pool_generation += 1
+            # Писатель первым: он создает файл и переводит базу в WAL.
+            self.writer = self.open_connection()
             for _ in range(self.pool_size):
-                conn = sqlite3.connect(self.db_path, check_same_thread=False)
-                conn.row_factory = sqlite3.Row
-                conn.execute("PRAGMA foreign_keys = ON;")
-                conn.execute("PRAGMA journal_mode = WAL;")
-                conn.execute("PRAGMA busy_timeout = 5000;")
-                conn.execute("PRAGMA synchronous = NORMAL;")
-                self.pool.put(conn)
+                self.pool.put(self.open_connection(read_only=True))
 
             self.initialized = True
 
-            try:
-                self.apply_permissions()
-                self.ensure_schema()
-            except Exception:
-                self.close()
-                raise
+        # Вне self.lock: close() берет ту же блокировку, и сбой миграции иначе
+        # оставил бы connect() висеть вместо ошибки.
+        try:
+            self.apply_permissions()
+            self.ensure_schema()
+        except Exception:
+            self.close()
+            raise
 
     def close(self) -> None:
+        # Соединения, которые сейчас в работе, закроются при возврате: их поколение устарело.
         with self.lock:
+            self.pool_generation += 1
             while not self.pool.empty():
                 try:
                     conn = self.pool.get_nowait()
@@ -78,41 +218,272 @@ class Database:
                     conn.close()
                 except Exception:
                     pass
+            if self.writer is not None and self.writer_lock.acquire(blocking=False):
+                try:
+                    self.writer.close()
+                except Exception:
+                    pass
+                finally:
+                    self.writer = None
+                    self.writer_lock.release()
             self.initialized = False
+        self.shutdown_executor()
+
+    def drain_for_restore(self) -> None:
+        # close() закрывает только свободные соединения, а выданные другим потокам
+        # (очистка корзины, перешифрование, аудит, GUI) писали бы в подмененный файл.
+        # Здесь забираются писатель и все pool_size читателей: новые выдачи ждут,
+        # а если соединения не вернулись за restore_drain_timeout_sec, restore
+        # отказывает. После успеха писатель остается заблокированным до подмены файла.
+        busy = "Восстановление невозможно: база занята другими операциями, повторите позже."
+        if self.writer_owner == threading.get_ident():
+            raise ValueError("Восстановление невозможно внутри открытой сессии записи.")
+        deadline = time.monotonic() + self.restore_drain_timeout_sec
+        if not self.writer_lock.acquire(timeout=self.restore_drain_timeout_sec):
+            raise ValueError(busy)
+        readers: list[PooledConnection] = []
+        try:
+            if self.initialized:
+                while len(readers) < self.pool_size:
+                    readers.append(self.pool.get(timeout=max(0.0, deadline - time.monotonic())))
+            if self.writer is not None:
+                checkpoint = self.writer.execute("PRAGMA wal_checkpoint(TRUNCATE);").fetchone()
+                if checkpoint is not None and int(checkpoint[0]) != 0:
+                    raise ValueError(busy)
+        except (queue.Empty, sqlite3.Error, ValueError) as exc:
+            for conn in readers:
+                self.pool.put(conn)
+            self.writer_lock.release()
+            if isinstance(exc, ValueError):
+                raise
+            raise ValueError(busy) from exc
+
+        with self.lock:
+            self.pool_generation += 1
+            for conn in readers:
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+            if self.writer is not None:
+                try:
+                    self.writer.close()
+                except Exception:
+                    pass
+                self.writer = None
+            self.initialized = False
+        self.shutdown_executor()
+
+    def checked_connection(self, conn: PooledConnection, metrics: PoolMetrics, read_only: bool) -> PooledConnection:
+        metrics.count("health_checks")
+        try:
+            conn.execute("SELECT 1;").fetchone()
+            return conn
+        except sqlite3.Error:
+            pass
+        try:
+            conn.close()
+        except Exception:
+            pass
+        replacement = self.open_connection(read_only=read_only)
+        metrics.count("replaced")
+        return replacement
+
+    def acquire(self) -> PooledConnection:
+        started = time.perf_counter()
+        try:
+            conn = self.pool.get(timeout=self.acquire_timeout_sec)
+        except queue.Empty:
+            self.metrics.count("timeouts")
+            raise TimeoutError(
+                f"Нет свободного соединения с БД за {self.acquire_timeout_sec:g} с (пул {self.pool_size})."
+            ) from None
+        self.metrics.record_acquire(time.perf_counter() - started)
+        if time.monotonic() - conn.last_used >= self.health_check_idle_sec:
+            try:
+                conn = self.checked_connection(conn, self.metrics, read_only=True)
+            except Exception:
+                # Вернем место в пуле хотя бы закрытым соединением: следующая выдача его заменит.
+                self.metrics.record_release(0.0)
+                conn.last_used = float("-inf")
+                self.pool.put(conn)
+                raise
+        return conn
+
+    def release(self, conn: PooledConnection, broken: bool = False) -> None:
+        if not broken and conn.pool_generation == self.pool_generation:
+            conn.last_used = time.monotonic()
+            self.pool.put(conn)
+            return
+        try:
+            conn.close()
+        except Exception:
+            pass
+        if conn.pool_generation != self.pool_generation:
+            return
+        # Сломанное соединение заменяется новым, чтобы пул не усыхал.
+        try:
+            replacement = self.open_connection(read_only=True)
+        except sqlite3.Error:
+            conn.last_used = float("-inf")
+            self.pool.put(conn)
+            return
+        self.metrics.count("replaced")
+        self.pool.put(replacement)
+
+    def acquire_writer(self) -> PooledConnection:
+        started = time.perf_counter()
+        if not self.writer_lock.acquire(timeout=self.acquire_timeout_sec):
+            self.writer_metrics.count("timeouts")
+            raise TimeoutError(f"Писатель БД занят дольше {self.acquire_timeout_sec:g} с.")
+        self.writer_metrics.record_acquire(time.perf_counter() - started)
+        try:
+            conn = self.writer
+            if conn is None or conn.pool_generation != self.pool_generation:
+                conn = self.open_connection()
+                self.writer_metrics.count("replaced")
+            elif time.monotonic() - conn.last_used >= self.health_check_idle_sec:
+                conn = self.checked_connection(conn, self.writer_metrics, read_only=False)
+        except Exception:
+            self.writer_metrics.record_release(0.0)
+            self.writer_lock.release()
+            raise
+        self.writer = conn
+        self.writer_owner = threading.get_ident()
+        return conn
+
+    def release_writer(self, conn: PooledConnection, broken: bool = False) -> None:
+        self.writer_owner = None
+        try:
+            if broken or conn.pool_generation != self.pool_generation:
+                # Сломанный писатель переоткроется при следующей выдаче.
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+                if self.writer is conn:
+                    self.writer = None
+                return
+            conn.last_used = time.monotonic()
+        finally:
+            self.writer_lock.release()
+
+    def pool_stats(self) -> PoolStats:
+        return self.metrics.snapshot(size=self.pool_size, idle=self.pool.qsize())
+
+    def writer_stats(self) -> PoolStats:
+        return self.writer_metrics.snapshot(size=1, idle=0 if self.writer_lock.locked() else 1)
+
+    def reset_pool_stats(self) -> None:
+        self.metrics.reset()
+        self.writer_metrics.reset()
+
+    @contextmanager
+    def read_session(self) -> Iterator[sqlite3.Connection]:
+        # Соединение с query_only: запись в нем падает с ошибкой, commit не нужен.
+        if not self.initialized:
+            raise RuntimeError("База данных не подключена. Вызови connect().")
+
+        conn = self.acquire()
+        started = time.perf_counter()
+        broken = False
+        try:
+            yield conn
+        finally:
+            try:
+                if conn.in_transaction:
+                    conn.rollback()
+            except sqlite3.Error:
+                broken = True
+            self.metrics.record_release(time.perf_counter() - started)
+            self.release(conn, broken=broken)
 
     @contextmanager
     def session(self) -> Iterator[sqlite3.Connection]:
+        # Сессия записи. Вложенная сессия того же потока присоединяется к внешней
+        # транзакции: второго писателя SQLite все равно не пустит.
         if not self.initialized:
             raise RuntimeError("База данных не подключена. Вызови connect().")
 
-        conn = self.pool.get()
+        if self.writer_owner == threading.get_ident() and self.writer is not None:
+            yield self.writer
+            return
+
+        conn = self.acquire_writer()
+        started = time.perf_counter()
+        transaction_sec: Optional[float] = None
+        broken = False
         try:
             yield conn
+            writing = conn.in_transaction
             conn.commit()
+            if writing:
+                transaction_sec = time.perf_counter() - started
         except Exception:
-            conn.rollback()
+            try:
+                conn.rollback()
+            except sqlite3.Error:
+                broken = True
             raise
         finally:
-            self.pool.put(conn)
+            self.writer_metrics.record_release(time.perf_counter() - started, transaction_sec)
+            self.release_writer(conn, broken=broken)
 
     def ensure_schema(self) -> None:
         with self.session() as conn:
             current_version = int(conn.execute("PRAGMA user_version;").fetchone()[0])
 
             if current_version == 0:
-                conn.executescript(SCHEMA)
-                conn.execute(f"PRAGMA user_version = {self.SCHEMA_VERSION};")
+                self.run_migration(conn, self.create_schema)
                 return
 
             if current_version in (1, 2, 3, 4):
-                self.migrate_legacy_to_v5(conn)
+                self.run_migration(conn, self.migrate_legacy_to_v5)
                 return
 
+            if current_version == 5:
+                self.run_migration(conn, self.migrate_v5_to_v6)
+                current_version = 6
+
+            if current_version == 6:
+                self.run_migration(conn, self.migrate_v6_to_v7)
+                current_version = 7
+
+            if current_version == 7:
+                self.run_migration(conn, self.migrate_v7_to_v8)
+                current_version = 8
+
+            if current_version == 8:
+                self.run_migration(conn, self.migrate_v8_to_v9)
+                current_version = 9
+
+            if current_version == 9:
+                self.run_migration(conn, self.migrate_v9_to_v10)
+                current_version = 10
+
             if current_version != self.SCHEMA_VERSION:
                 raise RuntimeError(
                     f"Несовместимая версия схемы БД: {current_version} (ожидается {self.SCHEMA_VERSION})."
                 )
 
+    @staticmethod
+    def run_migration(conn: sqlite3.Connection, migration: Callable[[sqlite3.Connection], None]) -> None:
+        # Каждый шаг версии - отдельная транзакция: сбой откатывает шаг целиком,
+        # и user_version остается прежней. Поэтому миграции выполняют схему через
+        # execute_statements(), а не executescript(), который коммитит сам.
+        if not conn.in_transaction:
+            conn.execute("BEGIN IMMEDIATE;")
+        try:
+            migration(conn)
+        except Exception:
+            conn.rollback()
+            raise
+        conn.commit()
+
+    def create_schema(self, conn: sqlite3.Connection) -> None:
+        self.execute_statements(conn, SCHEMA)
+        conn.execute(f"PRAGMA user_version = {self.SCHEMA_VERSION};")
+
     @staticmethod
     def table_exists(conn: sqlite3.Connection, table: str) -> bool:
         row = conn.execute(
@@ -138,21 +509,21 @@ class Database:
                 conn.execute(f"ALTER TABLE {name} RENAME TO {old_name};")
                 old_tables[name] = old_name
 
-        conn.executescript(SCHEMA)
+        self.execute_statements(conn, SCHEMA)
 
         if "vault_entries" in old_tables:
             source_columns = self.table_columns(conn, "vault_entries_old")
-            rows = conn.execute(
+            cursor = conn.execute(
                 """
                 SELECT *
                 FROM vault_entries_old
                 """
-            ).fetchall()
-            for row in rows:
+            )
+            for row in iter_rows(cursor):
                 if "encrypted_data" in source_columns and row["encrypted_data"] is not None:
-                    encrypted_data = str(row["encrypted_data"])
+                    encrypted_data = ciphertext_blob(row["encrypted_data"])
                 else:
-                    encrypted_data = ""
+                    encrypted_data = b""
                 enc_password = None
                 if "encrypted_password" in source_columns and row["encrypted_password"] is not None:
                     enc_password = b64_text(row["encrypted_password"])
@@ -193,8 +564,8 @@ class Database:
 
         if "deleted_entries" in old_tables:
             source_columns = self.table_columns(conn, "deleted_entries_old")
-            rows = conn.execute("SELECT * FROM deleted_entries_old").fetchall()
-            for row in rows:
+            cursor = conn.execute("SELECT * FROM deleted_entries_old")
+            for row in iter_rows(cursor):
                 conn.execute(
                     """
                     INSERT INTO deleted_entries (
@@ -210,7 +581,7 @@ class Database:
                     """,
                     (
                         int(row["source_entry_id"]) if "source_entry_id" in source_columns else int(row["id"]),
-                        str(row["encrypted_data"]) if "encrypted_data" in source_columns and row["encrypted_data"] else "",
+                        ciphertext_blob(row["encrypted_data"]) if "encrypted_data" in source_columns and row["encrypted_data"] else b"",
                         row["tags"] if "tags" in source_columns else None,
                         row["created_at"] if "created_at" in source_columns and row["created_at"] else now_iso(),
                         row["updated_at"] if "updated_at" in source_columns and row["updated_at"] else now_iso(),
@@ -220,13 +591,13 @@ class Database:
                 )
 
         if "audit_log" in old_tables:
-            rows = conn.execute(
+            cursor = conn.execute(
                 """
                 SELECT id, action, timestamp, entry_id, details, signature
                 FROM audit_log_old
                 """
-            ).fetchall()
-            for row in rows:
+            )
+            for row in iter_rows(cursor):
                 signature = b64_text(row["signature"]) if row["signature"] is not None else None
                 conn.execute(
                     """
@@ -237,13 +608,13 @@ class Database:
                 )
 
         if "settings" in old_tables:
-            rows = conn.execute(
+            cursor = conn.execute(
                 """
                 SELECT id, setting_key, setting_value, encrypted
                 FROM settings_old
                 """
-            ).fetchall()
-            for row in rows:
+            )
+            for row in iter_rows(cursor):
                 conn.execute(
                     """
                     INSERT INTO settings (id, setting_key, setting_value, encrypted)
@@ -254,9 +625,8 @@ class Database:
 
         if "key_store" in old_tables:
             columns = self.table_columns(conn, "key_store_old")
-            rows = conn.execute("SELECT * FROM key_store_old").fetchall()
-
-            for row in rows:
+            cursor = conn.execute("SELECT * FROM key_store_old")
+            for row in iter_rows(cursor):
                 if {"key_type", "key_data", "version", "created_at"}.issubset(columns):
                     conn.execute(
                         """
@@ -267,7 +637,7 @@ class Database:
                         """,
                         (
                             row["key_type"],
-                            key_payload_as_text(row["key_data"]),
+                            key_payload_as_blob(row["key_data"]),
                             int(row["version"]),
                             row["created_at"] or now_iso(),
                         ),
@@ -287,7 +657,7 @@ class Database:
                         """,
                         (
                             f"legacy:{key_type}:salt",
-                            key_payload_as_text(row["salt"]),
+                            key_payload_as_blob(row["salt"]),
                             1,
                             created,
                         ),
@@ -303,7 +673,7 @@ class Database:
                         """,
                         (
                             f"legacy:{key_type}:hash",
-                            key_payload_as_text(row["hash"]),
+                            key_payload_as_blob(row["hash"]),
                             1,
                             created,
                         ),
@@ -312,9 +682,9 @@ class Database:
                 if "params" in columns and row["params"] is not None:
                     params_val = row["params"]
                     if isinstance(params_val, str):
-                        raw_params = params_val
+                        raw_params = params_val.encode("utf-8")
                     else:
-                        raw_params = key_payload_as_text(params_val)
+                        raw_params = key_payload_as_blob(params_val)
                     conn.execute(
                         """
                         INSERT INTO key_store (key_type, key_data, version, created_at)
@@ -335,15 +705,269 @@ class Database:
 
         conn.execute(f"PRAGMA user_version = {self.SCHEMA_VERSION};")
 
+    def migrate_v5_to_v6(self, conn: sqlite3.Connection) -> None:
+        # v6: секретные поля записи хранятся отдельным шифротекстом encrypted_secret.
+        for table in ("vault_entries", "deleted_entries"):
+            if "encrypted_secret" not in self.table_columns(conn, table):
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN encrypted_secret TEXT;")
+        conn.execute("PRAGMA user_version = 6;")
+
+    def migrate_v6_to_v7(self, conn: sqlite3.Connection) -> None:
+        # v7: слепой индекс поиска; заполняется лениво при первом поиске после входа.
+        self.execute_statements(conn, SEARCH_TOKENS_SCHEMA)
+        conn.execute("PRAGMA user_version = 7;")
+
+    def migrate_v7_to_v8(self, conn: sqlite3.Connection) -> None:
+        # v8: шифротексты и key_data хранятся сырыми BLOB вместо base64-текста.
+        conn.create_function("ciphertext_blob", 1, ciphertext_blob, deterministic=True)
+        conn.create_function("key_payload_as_blob", 1, key_payload_as_blob, deterministic=True)
+        conn.create_function("token_blob", 1, token_blob, deterministic=True)
+
+        conn.execute("DROP TABLE IF EXISTS temp.search_tokens_v7;")
+        conn.execute("CREATE TEMP TABLE search_tokens_v7 AS SELECT token_blob(token) AS token, entry_id FROM search_tokens;")
+        conn.execute("DROP TABLE search_tokens;")
+
+        rebuilt = ("vault_entries", "deleted_entries", "key_store")
+        for name in rebuilt:
+            index_rows = conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL",
+                (name,),
+            ).fetchall()
+            for index_row in index_rows:
+                conn.execute(f"DROP INDEX {index_row['name']};")
+            conn.execute(f"ALTER TABLE {name} RENAME TO {name}_v7;")
+
+        self.execute_statements(conn, SCHEMA)
+
+        conn.execute(
+            """
+            INSERT INTO vault_entries (
+                id, encrypted_data, encrypted_secret, title, username, encrypted_password, url, notes,
+                created_at, updated_at, tags
+            )
+            SELECT
+                id, ciphertext_blob(encrypted_data), ciphertext_blob(encrypted_secret), title, username,
+                encrypted_password, url, notes, created_at, updated_at, tags
+            FROM vault_entries_v7
+            """
+        )
+        conn.execute(
+            """
+            INSERT INTO deleted_entries (
+                id, source_entry_id, encrypted_data, encrypted_secret, tags, created_at, updated_at, deleted_at, expires_at
+            )
+            SELECT
+                id, source_entry_id, ciphertext_blob(encrypted_data), ciphertext_blob(encrypted_secret), tags,
+                created_at, updated_at, deleted_at, expires_at
+            FROM deleted_entries_v7
+            """
+        )
+        conn.execute(
+            """
+            INSERT INTO key_store (id, key_type, key_data, version, created_at)
+            SELECT id, key_type, key_payload_as_blob(key_data), version, created_at
+            FROM key_store_v7
+            """
+        )
+        conn.execute(
+            """
+            INSERT OR IGNORE INTO search_tokens (token, entry_id)
+            SELECT token, entry_id
+            FROM temp.search_tokens_v7
+            WHERE entry_id IN (SELECT id FROM vault_entries)
+            """
+        )
+
+        for name in rebuilt:
+            # Счетчик AUTOINCREMENT переносится со старой таблицы, иначе id удаленных
+            # записей выдались бы заново и совпали с source_entry_id в корзине.
+            self.carry_sequence(conn, f"{name}_v7", name)
+            conn.execute(f"DROP TABLE {name}_v7;")
+        conn.execute("DROP TABLE temp.search_tokens_v7;")
+        conn.execute("PRAGMA user_version = 8;")
+
+    @staticmethod
+    def carry_sequence(conn: sqlite3.Connection, source: str, target: str) -> None:
+        row = conn.execute(
+            "SELECT MAX(seq) AS seq FROM sqlite_sequence WHERE name IN (?, ?)",
+            (source, target),
+        ).fetchone()
+        if row["seq"] is None:
+            return
+        conn.execute("DELETE FROM sqlite_sequence WHERE name = ?", (target,))
+        conn.execute("INSERT INTO sqlite_sequence (name, seq) VALUES (?, ?)", (target, int(row["seq"])))
+
+    @staticmethod
+    def execute_statements(conn: sqlite3.Connection, script: str) -> None:
+        # Аналог executescript() без неявного COMMIT: скрипт выполняется по одной
+        # инструкции внутри текущей транзакции.
+        statement = ""
+        for line in script.splitlines(keepends=True):
+            statement += line
+            if sqlite3.complete_statement(statement):
+                conn.execute(statement)
+                statement = ""
+        if statement.strip():
+            conn.execute(statement)
+
+    def migrate_v8_to_v9(self, conn: sqlite3.Connection) -> None:
+        # v9: поколение ключа данных у каждой строки и контрольная точка перешифрования.
+        for table in ("vault_entries", "deleted_entries"):
+            if "key_generation" not in self.table_columns(conn, table):
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN key_generation INTEGER NOT NULL DEFAULT 1;")
+        self.execute_statements(conn, SCHEMA)
+        conn.execute("PRAGMA user_version = 9;")
+
+    def migrate_v9_to_v10(self, conn: sqlite3.Connection) -> None:
+        # v10: индекс корзины по deleted_at для постраничного просмотра.
+        self.execute_statements(conn, SCHEMA)
+        conn.execute("PRAGMA user_version = 10;")
+
     def apply_permissions(self) -> None:
+        self.restrict_file_permissions(self.db_path)
+
+    @staticmethod
+    def create_private_file(path: Path) -> None:
+        # Файл создается сразу с правами 0600: копия базы ни на миг не видна
+        # другим пользователям, даже до restrict_file_permissions.
+        os.close(os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, stat.S_IRUSR | stat.S_IWUSR))
+
+    @staticmethod
+    def restrict_file_permissions(path: Path) -> None:
         try:
-            if os.name != "nt" and self.db_path.exists():
-                os.chmod(self.db_path, stat.S_IRUSR | stat.S_IWUSR)
+            if os.name != "nt" and path.exists():
+                os.chmod(path, stat.S_IRUSR | stat.S_IWUSR)
         except Exception:
             pass
 
-    def backup(self, backup_path: Path) -> None:
-        raise NotImplementedError("Backup будет реализован в следующих спринтах.")
+    def backup(
+        self,
+        backup_path: Path,
+        pages_per_step: Optional[int] = None,
+        sleep_sec: Optional[float] = None,
+        progress_callback: Optional[Callable[[int, int], None]] = None,
+        on_snapshot: Optional[Callable[[sqlite3.Connection], None]] = None,
+    ) -> Path:
+        # Копия снимается онлайн-API SQLite отдельным соединением, не из пула.
+        # Источник держит одну читающую транзакцию: в WAL писатели не блокируются,
+        # а копия остается согласованным снимком без перезапусков backup.
+        target = Path(backup_path)
+        if target.resolve() == self.db_path.resolve():
+            raise ValueError("Резервная копия не может перезаписать рабочую базу.")
+        target.parent.mkdir(parents=True, exist_ok=True)
+        partial = target.with_name(target.name + ".part")
+        partial.unlink(missing_ok=True)
+        pages = max(1, int(pages_per_step or self.backup_pages_per_step))
+        pause = max(0.0, float(self.backup_sleep_sec if sleep_sec is None else sleep_sec))
+
+        def on_step(_status: int, remaining: int, total: int) -> None:
+            if progress_callback is not None:
+                progress_callback(total - remaining, total)
+            if pause and remaining:
+                time.sleep(pause)
+
+        source = sqlite3.connect(self.db_path, check_same_thread=False)
+        try:
+            source.execute("PRAGMA busy_timeout = 5000;")
+            source.execute("BEGIN;")
+            source.execute("SELECT COUNT(*) FROM sqlite_master;").fetchone()
+            if on_snapshot is not None:
+                # Видит ровно тот снимок, который попадет в копию.
+                on_snapshot(source)
+            self.create_private_file(partial)
+            destination = sqlite3.connect(partial)
+            try:
+                source.backup(destination, pages=pages, progress=on_step)
+                destination.execute("PRAGMA journal_mode = DELETE;")
+            finally:
+                destination.close()
+            source.rollback()
+        except Exception:
+            partial.unlink(missing_ok=True)
+            raise
+        finally:
+            source.close()
+
+        self.restrict_file_permissions(partial)
+        os.replace(partial, target)
+        return target
 
-    def restore(self, backup_path: Path) -> None:
-        raise NotImplementedError("Restore будет реализован в следующих спринтах.")
+    def validate_backup_file(self, candidate: Path) -> int:
+        try:
+            conn = sqlite3.connect(f"file:{Path(candidate).as_posix()}?mode=ro", uri=True)
+        except sqlite3.Error as exc:
+            raise ValueError("Не удалось открыть резервную копию.") from exc
+        try:
+            version = int(conn.execute("PRAGMA user_version;").fetchone()[0])
+            check = conn.execute("PRAGMA quick_check;").fetchone()[0]
+            tables = {str(row[0]) for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        except sqlite3.DatabaseError as exc:
+            raise ValueError("Файл не является базой CryptoSafe.") from exc
+        finally:
+            conn.close()
+        if check != "ok":
+            raise ValueError("Резервная копия повреждена.")
+        if version < 1 or version > self.SCHEMA_VERSION:
+            raise ValueError(f"Неподдерживаемая версия схемы в резервной копии: {version}.")
+        missing = set(self.backup_required_tables) - tables
+        if missing:
+            raise ValueError(f"В резервной копии нет таблиц: {', '.join(sorted(missing))}.")
+        return version
+
+    def restore(
+        self,
+        backup_path: Path,
+        pages_per_step: Optional[int] = None,
+        progress_callback: Optional[Callable[[int, int], None]] = None,
+    ) -> None:
+        # Копия сначала переносится рядом с рабочей базой и проверяется; рабочий
+        # файл подменяется одним os.replace только после успешной проверки.
+        # Затем слушатели restore сбрасывают кэши записей и ключ сессии.
+        source_path = Path(backup_path)
+        if not source_path.is_file():
+            raise ValueError("Файл резервной копии не найден.")
+        self.validate_backup_file(source_path)
+
+        staged = self.db_path.with_name(self.db_path.name + ".restore")
+        staged.unlink(missing_ok=True)
+        pages = max(1, int(pages_per_step or self.backup_pages_per_step))
+
+        def on_step(_status: int, remaining: int, total: int) -> None:
+            if progress_callback is not None:
+                progress_callback(total - remaining, total)
+
+        try:
+            source = sqlite3.connect(f"file:{source_path.as_posix()}?mode=ro", uri=True)
+            try:
+                self.create_private_file(staged)
+                destination = sqlite3.connect(staged)
+                try:
+                    source.backup(destination, pages=pages, progress=on_step)
+                    destination.execute("PRAGMA journal_mode = DELETE;")
+                finally:
+                    destination.close()
+            finally:
+                source.close()
+            self.validate_backup_file(staged)
+        except Exception:
+            staged.unlink(missing_ok=True)
+            raise
+
+        was_initialized = self.initialized
+        try:
+            self.drain_for_restore()
+        except Exception:
+            staged.unlink(missing_ok=True)
+            raise
+        try:
+            # WAL и shm принадлежат старому файлу: после контрольной точки они уже
+            # перенесены в базу, а с новым файлом SQLite применил бы их по ошибке.
+            for suffix in ("-wal", "-shm"):
+                Path(f"{self.db_path}{suffix}").unlink(missing_ok=True)
+            self.restrict_file_permissions(staged)
+            os.replace(staged, self.db_path)
+        finally:
+            self.writer_lock.release()
+        if was_initialized:
+            self.connect()
+        self.notify_restore_listeners()
@@ -1,7 +1,18 @@
+SEARCH_TOKENS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS search_tokens (
+    token BLOB NOT NULL,
+    entry_id INTEGER NOT NULL REFERENCES vault_entries(id) ON DELETE CASCADE,
+    PRIMARY KEY (token, entry_id)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_search_tokens_entry_id ON search_tokens(entry_id);
+"""
+
 SCHEMA = """
 CREATE TABLE IF NOT EXISTS vault_entries (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
-    encrypted_data TEXT NOT NULL,
+    encrypted_data BLOB NOT NULL,
+    encrypted_secret BLOB,
     title TEXT,
     username TEXT,
     encrypted_password TEXT,
@@ -9,7 +20,8 @@ CREATE TABLE IF NOT EXISTS vault_entries (
     notes TEXT,
     created_at TEXT NOT NULL,
     updated_at TEXT NOT NULL,
-    tags TEXT
+    tags TEXT,
+    key_generation INTEGER NOT NULL DEFAULT 1
 );
 
 CREATE INDEX IF NOT EXISTS idx_vault_title ON vault_entries(title);
@@ -17,19 +29,23 @@ CREATE INDEX IF NOT EXISTS idx_vault_created_at ON vault_entries(created_at);
 CREATE INDEX IF NOT EXISTS idx_vault_updated_at ON vault_entries(updated_at);
 CREATE INDEX IF NOT EXISTS idx_vault_username ON vault_entries(username);
 CREATE INDEX IF NOT EXISTS idx_vault_tags ON vault_entries(tags);
+CREATE INDEX IF NOT EXISTS idx_vault_key_generation ON vault_entries(key_generation, id);
 
 CREATE TABLE IF NOT EXISTS deleted_entries (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     source_entry_id INTEGER NOT NULL,
-    encrypted_data TEXT NOT NULL,
+    encrypted_data BLOB NOT NULL,
+    encrypted_secret BLOB,
     tags TEXT,
     created_at TEXT NOT NULL,
     updated_at TEXT NOT NULL,
     deleted_at TEXT NOT NULL,
-    expires_at TEXT NOT NULL
+    expires_at TEXT NOT NULL,
+    key_generation INTEGER NOT NULL DEFAULT 1
 );
 
 CREATE INDEX IF NOT EXISTS idx_deleted_entries_expires_at ON deleted_entries(expires_at);
+CREATE INDEX IF NOT EXISTS idx_deleted_entries_deleted_at ON deleted_entries(deleted_at);
 
 CREATE TABLE IF NOT EXISTS audit_log (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -54,11 +70,22 @@ CREATE INDEX IF NOT EXISTS idx_settings_key ON settings(setting_key);
 CREATE TABLE IF NOT EXISTS key_store (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     key_type TEXT NOT NULL,
-    key_data TEXT NOT NULL,
+    key_data BLOB NOT NULL,
     version INTEGER NOT NULL DEFAULT 1,
     created_at TIMESTAMP NOT NULL,
     UNIQUE(key_type, version)
 );
 
 CREATE INDEX IF NOT EXISTS idx_key_store_type ON key_store(key_type);
-"""
+
+CREATE TABLE IF NOT EXISTS reencryption_checkpoint (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    from_generation INTEGER NOT NULL,
+    to_generation INTEGER NOT NULL,
+    last_entry_id INTEGER NOT NULL DEFAULT 0,
+    processed INTEGER NOT NULL DEFAULT 0,
+    total INTEGER NOT NULL DEFAULT 0,
+    started_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+""" + SEARCH_TOKENS_SCHEMA
@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import threading
+from bisect import bisect_left
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass(frozen=True)
+class HistogramSnapshot:
+    count: int
+    total_sec: float
+    max_sec: float
+    # (верхняя граница корзины в мс, число наблюдений); последняя граница - inf.
+    buckets: tuple[tuple[float, int], ...]
+
+    @property
+    def mean_ms(self) -> float:
+        return self.total_sec * 1000 / self.count if self.count else 0.0
+
+    def percentile_ms(self, q: float) -> float:
+        # Оценка сверху: граница корзины, в которую попал q-й процентиль, но не больше максимума.
+        if not self.count:
+            return 0.0
+        rank = max(1, int(round(self.count * min(max(q, 0.0), 100.0) / 100)))
+        seen = 0
+        for bound, hits in self.buckets:
+            seen += hits
+            if seen >= rank:
+                return min(bound, self.max_sec * 1000)
+        return self.max_sec * 1000
+
+
+class LatencyHistogram:
+    # Без своей блокировки: обновляется под блокировкой PoolMetrics.
+    bounds_ms = (0.1, 0.5, 1.0, 2.0, 5.0, 10.0, 25.0, 50.0, 100.0, 250.0, 500.0, 1000.0, 5000.0)
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        self.counts = [0] * (len(self.bounds_ms) + 1)
+        self.count = 0
+        self.total_sec = 0.0
+        self.max_sec = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.counts[bisect_left(self.bounds_ms, seconds * 1000)] += 1
+        self.count += 1
+        self.total_sec += seconds
+        if seconds > self.max_sec:
+            self.max_sec = seconds
+
+    def snapshot(self) -> HistogramSnapshot:
+        return HistogramSnapshot(
+            count=self.count,
+            total_sec=self.total_sec,
+            max_sec=self.max_sec,
+            buckets=tuple(zip((*self.bounds_ms, float("inf")), self.counts)),
+        )
+
+
+@dataclass(frozen=True)
+class PoolStats:
+    size: int
+    idle: int
+    in_use: int
+    acquired: int
+    timeouts: int
+    replaced: int
+    health_checks: int
+    acquire_wait: HistogramSnapshot
+    hold: HistogramSnapshot
+    transaction: HistogramSnapshot
+
+
+class PoolMetrics:
+    # acquire_wait - ожидание свободного соединения, hold - сколько сессия держит
+    # соединение, transaction - сессии с открытой транзакцией записи до конца commit.
+    # Одна блокировка на выдачу и одна на возврат: учет не должен стать узким местом пула.
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.acquire_wait = LatencyHistogram()
+        self.hold = LatencyHistogram()
+        self.transaction = LatencyHistogram()
+        self.acquired = 0
+        self.timeouts = 0
+        self.replaced = 0
+        self.health_checks = 0
+        self.in_use = 0
+
+    def record_acquire(self, wait_sec: float) -> None:
+        with self.lock:
+            self.acquire_wait.observe(wait_sec)
+            self.acquired += 1
+            self.in_use += 1
+
+    def record_release(self, hold_sec: float, transaction_sec: Optional[float] = None) -> None:
+        with self.lock:
+            self.hold.observe(hold_sec)
+            if transaction_sec is not None:
+                self.transaction.observe(transaction_sec)
+            self.in_use -= 1
+
+    def count(self, name: str, delta: int = 1) -> None:
+        with self.lock:
+            setattr(self, name, getattr(self, name) + delta)
+
+    def reset(self) -> None:
+        with self.lock:
+            self.acquired = 0
+            self.timeouts = 0
+            self.replaced = 0
+            self.health_checks = 0
+            for histogram in (self.acquire_wait, self.hold, self.transaction):
+                histogram.reset()
+
+    def snapshot(self, size: int, idle: int) -> PoolStats:
+        with self.lock:
+            return PoolStats(
+                size=size,
+                idle=idle,
+                in_use=self.in_use,
+                acquired=self.acquired,
+                timeouts=self.timeouts,
+                replaced=self.replaced,
+                health_checks=self.health_checks,
+                acquire_wait=self.acquire_wait.snapshot(),
+                hold=self.hold.snapshot(),
+                transaction=self.transaction.snapshot(),
+            )
@@ -2,11 +2,15 @@ import base64
 import json
 from dataclasses import dataclass
 from datetime import datetime, timezone
+from pathlib import Path
 from typing import Callable, List, Optional
 
 from core.crypto.abstract import EncryptionService
 from core.events import EventBus
 from core.vault.entry_manager import EntryManager
+from core.vault.exporter import ArchiveVerification, ExportReport, VaultArchiveReader, VaultExporter
+from core.vault.health import VaultHealthAnalyzer, VaultHealthReport
+from core.vault.importer import ImportReport, VaultImporter
 from core.vault.password_generator import PasswordGenerator
 from database.db import Database
 
@@ -42,13 +46,14 @@ class VaultRepository:
     def __init__(self, db: Database, crypto: EncryptionService, bus: Optional[EventBus] = None):
         self.db = db
         self.crypto = crypto
+        self.password_generator = PasswordGenerator()
         self.entry_manager = EntryManager(
             db=db,
             key_manager=crypto.key_manager,
             bus=bus,
             legacy_crypto=crypto,
+            password_generator=self.password_generator,
         )
-        self.password_generator = PasswordGenerator()
 
     def add(
         self,
@@ -73,6 +78,12 @@ class VaultRepository:
         )
         return int(result["id"])
 
+    def add_many(self, items: List[dict], chunk_size: Optional[int] = None) -> List[int]:
+        return [int(result["id"]) for result in self.entry_manager.create_entries(items, chunk_size=chunk_size)]
+
+    def update_many(self, changes: dict[int, dict], chunk_size: Optional[int] = None) -> None:
+        self.entry_manager.update_entries(changes, chunk_size=chunk_size)
+
     def list(self) -> List[VaultEntry]:
         return self.make_entry_list(
             self.entry_manager.get_all_entries(
@@ -81,6 +92,27 @@ class VaultRepository:
             )
         )
 
+    def list_page(
+        self,
+        limit: int,
+        after: Optional[tuple[str, int]] = None,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+        include_passwords: bool = False,
+    ) -> tuple[List[VaultEntry], Optional[tuple[str, int]]]:
+        rows, next_cursor = self.entry_manager.get_page(
+            limit=limit,
+            after=after,
+            include_sensitive=include_passwords,
+            include_notes=False,
+            date_from=date_from,
+            date_to=date_to,
+        )
+        return self.make_entry_list(rows), next_cursor
+
+    def count(self, date_from: Optional[str] = None, date_to: Optional[str] = None) -> int:
+        return self.entry_manager.count_entries(date_from=date_from, date_to=date_to)
+
     def make_entry_list(self, rows: List[dict]) -> List[VaultEntry]:
         return [
             VaultEntry(
@@ -103,29 +135,33 @@ class VaultRepository:
         date_from: Optional[str] = None,
         date_to: Optional[str] = None,
         min_password_strength: int = 0,
+        limit: Optional[int] = None,
+        offset: int = 0,
+        ranked: bool = False,
     ) -> List[VaultEntry]:
-        rows = self.entry_manager.search_entries(
-            query=query,
-            tags=tags,
-            date_from=date_from,
-            date_to=date_to,
-        )
         normalized_category = str(category or "").strip().lower()
         min_strength = max(0, min(4, int(min_password_strength)))
 
-        filtered: list[dict] = []
-        for row in rows:
+        def entry_filter(row: dict) -> bool:
             if normalized_category and normalized_category != "all":
                 row_category = str(row.get("category") or "").strip().lower()
                 if row_category != normalized_category:
-                    continue
-            if min_strength > 0:
-                password_value = self.get_password(int(row.get("id", 0) or 0)) or ""
-                score = self.password_generator.estimate_strength_score(password_value)
-                if score < min_strength:
-                    continue
-            filtered.append(row)
-        return self.make_entry_list(filtered)
+                    return False
+            if min_strength > 0 and self.entry_manager.password_strength(row) < min_strength:
+                return False
+            return True
+
+        rows = self.entry_manager.search_entries(
+            query=query,
+            tags=tags,
+            date_from=date_from,
+            date_to=date_to,
+            entry_filter=entry_filter,
+            ranked=ranked,
+            limit=limit,
+            offset=offset,
+        )
+        return self.make_entry_list(rows)
 
     def get_by_id(self, entry_id: int) -> Optional[dict]:
         try:
@@ -168,13 +204,76 @@ class VaultRepository:
     def delete(self, entry_id: int) -> None:
         self.entry_manager.delete_entry(int(entry_id), soft_delete=True)
 
+    def restore(self, entry_id: int) -> None:
+        self.entry_manager.restore_entry(int(entry_id))
+
+    def restore_many(self, entry_ids: List[int]) -> List[int]:
+        return self.entry_manager.restore_entries(entry_ids)
+
+    def list_deleted(self, limit: int, after: Optional[tuple[str, int]] = None) -> List[dict]:
+        return self.entry_manager.list_deleted(limit, after=after)
+
+    def count_deleted(self) -> int:
+        return self.entry_manager.count_deleted()
+
+    def health_report(self, max_password_age_days: int = 365) -> VaultHealthReport:
+        analyzer = VaultHealthAnalyzer(
+            self.entry_manager,
+            password_generator=self.password_generator,
+            max_password_age_days=max_password_age_days,
+        )
+        return analyzer.analyze()
+
+    def import_file(
+        self,
+        path: Path,
+        file_format: Optional[str] = None,
+        chunk_size: int = 1000,
+        progress_callback: Optional[Callable[[int, int], None]] = None,
+    ) -> ImportReport:
+        importer = VaultImporter(self.entry_manager, chunk_size=chunk_size)
+        return importer.import_file(path, file_format=file_format, progress_callback=progress_callback)
+
+    def export_archive(
+        self,
+        path: Path,
+        passphrase: str,
+        chunk_entries: int = 500,
+        progress_callback: Optional[Callable[[int], None]] = None,
+    ) -> ExportReport:
+        exporter = VaultExporter(self.entry_manager, chunk_entries=chunk_entries)
+        return exporter.export_to(path, passphrase, progress_callback=progress_callback)
+
+    @staticmethod
+    def verify_archive(path: Path, passphrase: str) -> ArchiveVerification:
+        return VaultArchiveReader().verify(path, passphrase)
+
+    def begin_key_rotation(self, password: str) -> int:
+        return self.entry_manager.begin_key_rotation(password)
+
+    def pending_reencryption(self) -> Optional[dict[str, int]]:
+        return self.entry_manager.pending_reencryption()
+
     def reencrypt_all_entries(
+        self,
+        progress_callback: Optional[Callable[[int, int], None]] = None,
+        chunk_size: Optional[int] = None,
+        should_stop: Optional[Callable[[], bool]] = None,
+    ) -> bool:
+        return self.entry_manager.reencrypt_all_entries(
+            progress_callback=progress_callback,
+            legacy_crypto=self.crypto,
+            chunk_size=chunk_size,
+            should_stop=should_stop,
+        )
+
+    def reencrypt_entries_with_keys(
         self,
         old_key: bytes,
         new_key: bytes,
         progress_callback: Optional[Callable[[int, int], None]] = None,
     ) -> None:
-        self.entry_manager.reencrypt_all_entries(
+        self.entry_manager.reencrypt_entries_with_keys(
             old_key=old_key,
             new_key=new_key,
             progress_callback=progress_callback,
@@ -188,7 +287,7 @@ class SettingsRepository:
         self.crypto = crypto
 
     def get(self, key: str, default: Optional[str] = None) -> Optional[str]:
-        with self.db.session() as conn:
+        with self.db.read_session() as conn:
             row = conn.execute(
                 "SELECT setting_value, encrypted FROM settings WHERE setting_key = ?",
                 (key,),
@@ -248,8 +347,28 @@ class AuditRepository:
                 (action, now_iso(), entry_id, json.dumps(details, ensure_ascii=False), None),
             )
 
-    def last(self, limit: int = 50) -> List[AuditRecord]:
+    def write_many(self, records: List[tuple[str, str, Optional[int], dict]]) -> None:
+        # records: (action, timestamp, entry_id, details) - время фиксируется в момент события.
+        if not records:
+            return
         with self.db.session() as conn:
+            conn.executemany(
+                """
+                INSERT INTO audit_log (action, timestamp, entry_id, details, signature)
+                VALUES (?, ?, ?, ?, ?)
+                """,
+                [
+                    (action, timestamp, entry_id, json.dumps(details, ensure_ascii=False), None)
+                    for action, timestamp, entry_id, details in records
+                ],
+            )
+
+    def flush(self) -> None:
+        # Запись здесь сразу фиксируется; метод нужен для совместимости с BufferedAuditWriter.
+        return None
+
+    def last(self, limit: int = 50) -> List[AuditRecord]:
+        with self.db.read_session() as conn:
             rows = conn.execute(
                 """
                 SELECT id, action, details, timestamp
@@ -8,12 +8,16 @@ from PySide6.QtCore import Qt
 from PySide6.QtWidgets import QApplication, QDialog, QMessageBox, QWidget
 
 from core.audit_logger import AuditLogger
+from core.audit_writer import BufferedAuditWriter
 from core.config import ConfigManager
 from core.crypto.authentication import AuthenticationService
 from core.crypto.placeholder import AES256Placeholder
-from core.events import EventBus
+from core.events import EventBus, UserLoggedIn, UserLoggedOut
 from core.key_manager import KeyManager
 from core.state_manager import StateManager
+from core.vault.reencryption import ReencryptionResumer
+from core.vault.trash import TrashPurgeScheduler
+from database.audit_archive import AuditArchive
 from database.db import Database
 from database.repositories import AuditRepository, SettingsRepository, VaultRepository
 from gui.login_dialog import LoginDialog
@@ -128,14 +132,24 @@ class CryptoSafeApp:
         vault_repo = runtime["vault_repo"]
         settings_repo = runtime["settings_repo"]
 
-        audit = AuditLogger(bus, audit_repo)
+        audit_writer = BufferedAuditWriter(audit_repo)
+        audit_writer.start()
+        audit = AuditLogger(bus, audit_writer)
         audit.start()
+        purger = TrashPurgeScheduler(vault_repo.entry_manager)
+        purger.start()
+        # Вход уже выполнен при открытии базы, поэтому первое продолжение запускается
+        # сразу; после повторного входа (блокировка по таймауту) - по событию.
+        resumer = ReencryptionResumer(vault_repo)
+        resumer.start()
+        bus.subscribe(UserLoggedIn, lambda _event: resumer.start())
+        bus.subscribe(UserLoggedOut, lambda _event: resumer.stop())
 
         main = MainWindow(
             bus=bus,
             state=state,
             auth_service=auth,
-            audit_repo=audit_repo,
+            audit_repo=audit_writer,
             vault_repo=vault_repo,
             settings_repo=settings_repo,
         )
@@ -144,7 +158,8 @@ class CryptoSafeApp:
         auth_holder = {"auth": auth}
 
         def switch_database(new_path: Path) -> tuple[bool, str]:
-            nonlocal db, state, key_manager, auth, audit_repo, vault_repo, settings_repo
+            nonlocal db, state, key_manager, auth, audit_repo, vault_repo, settings_repo, purger, audit_writer
+            nonlocal resumer
 
             target_path = Path(new_path).resolve()
             if db.db_path.resolve() == target_path:
@@ -161,6 +176,8 @@ class CryptoSafeApp:
 
             old_db = db
             old_auth = auth
+            purger.stop()
+            resumer.stop()
 
             try:
                 old_auth.logout(emit_event=True)
@@ -175,17 +192,35 @@ class CryptoSafeApp:
             vault_repo = new_runtime["vault_repo"]
             settings_repo = new_runtime["settings_repo"]
 
-            audit.audit = audit_repo
+            # Сначала новый писатель, потом остановка старого: его stop() сбрасывает
+            # остаток очереди (включая UserLoggedOut) в старую базу до ее закрытия.
+            old_audit_writer = audit_writer
+            audit_writer = BufferedAuditWriter(audit_repo)
+            audit_writer.start()
+            audit.audit = audit_writer
+            try:
+                old_audit_writer.stop()
+            except Exception:
+                pass
             auth_holder["auth"] = auth
             main.apply_runtime_context(
                 state=state,
                 auth_service=auth,
-                audit_repo=audit_repo,
+                audit_repo=audit_writer,
                 vault_repo=vault_repo,
                 settings_repo=settings_repo,
                 db_path=db.db_path,
             )
 
+            purger = TrashPurgeScheduler(vault_repo.entry_manager)
+            purger.start()
+            resumer = ReencryptionResumer(vault_repo)
+            resumer.start()
+
+            try:
+                AuditArchive(old_db).rotate(max_segments=5)
+            except Exception:
+                pass
             try:
                 old_db.close()
             except Exception:
@@ -214,7 +249,13 @@ class CryptoSafeApp:
             return int(code)
         finally:
             try:
+                purger.stop()
+                resumer.stop()
                 auth_holder["auth"].logout(emit_event=True)
                 bus.shutdown()
+                audit_writer.stop()
+                # Ротация при выходе: после сброса очереди аудита, пока база еще открыта;
+                # не больше пяти сегментов за раз, чтобы большой журнал не задерживал выход.
+                AuditArchive(db).rotate(max_segments=5)
             finally:
                 db.close()
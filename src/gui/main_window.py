@@ -1,9 +1,10 @@
 from __future__ import annotations
 
 import json
+from dataclasses import replace
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from typing import Callable, Optional
+from typing import Callable, Optional, Union
 
 from PySide6.QtCore import QDate, QStringListModel, Qt, Slot
 from PySide6.QtGui import QKeySequence, QShortcut
@@ -30,6 +31,7 @@ from PySide6.QtWidgets import (
     QWidget,
 )
 
+from core.audit_writer import BufferedAuditWriter
 from core.crypto.authentication import AuthenticationService
 from core.events import ClipboardCleared, ClipboardCopied, EventBus
 from core.state_manager import StateManager
@@ -48,7 +50,7 @@ class MainWindow(QMainWindow):
             bus: EventBus,
             state: StateManager,
             auth_service: AuthenticationService,
-            audit_repo: AuditRepository,
+            audit_repo: Union[AuditRepository, BufferedAuditWriter],
             vault_repo: VaultRepository,
             settings_repo: SettingsRepository,
             open_database_handler: Optional[Callable[[Path], tuple[bool, str]]] = None,
@@ -382,16 +384,60 @@ class MainWindow(QMainWindow):
         tags = self.collect_tag_filters()
         date_from, date_to = self.collect_date_range_filter()
 
-        results = self.vault.search(
-            query=query,
-            tags=tags,
-            category=category,
-            date_from=date_from,
-            date_to=date_to,
-            min_password_strength=min_strength,
-        )
+        if not query and not tags and category == "all" and min_strength <= 0:
+            # Без поиска и фильтров по содержимому таблица читает хранилище страницами:
+            # расшифровываются только строки, до которых дошла прокрутка.
+            def fetch_page(
+                limit: int,
+                after: Optional[tuple[str, int]],
+            ) -> tuple[list[VaultRow], Optional[tuple[str, int]]]:
+                entries, next_cursor = self.vault.list_page(
+                    limit,
+                    after=after,
+                    date_from=date_from,
+                    date_to=date_to,
+                    include_passwords=self.show_passwords_globally,
+                )
+                return self.make_table_rows(entries), next_cursor
 
-        rows = [
+            self.secure_table.set_page_source(fetch_page)
+            total = self.vault.count(date_from=date_from, date_to=date_to)
+        else:
+            # Выдача поиска тоже грузится страницами по размеру страницы таблицы:
+            # ранжирование сортирует только префикс до offset + limit.
+            def fetch_results(limit: int, offset: Optional[int]) -> tuple[list[VaultRow], Optional[int]]:
+                start = int(offset or 0)
+                results = self.vault.search(
+                    query=query,
+                    tags=tags,
+                    category=category,
+                    date_from=date_from,
+                    date_to=date_to,
+                    min_password_strength=min_strength,
+                    limit=limit,
+                    offset=start,
+                    ranked=bool(query),
+                )
+                rows = self.make_table_rows(results)
+                if self.show_passwords_globally:
+                    rows = [
+                        replace(row, password=self.vault.get_password(row.entry_id) or "")
+                        for row in rows
+                    ]
+                return rows, (start + limit if len(results) >= limit else None)
+
+            self.secure_table.set_page_source(fetch_results)
+            # Полное число совпадений не считается: это свело бы на нет постраничность.
+            loaded = self.secure_table.loaded_row_count()
+            total = f"{loaded}+" if self.secure_table.has_more_rows() else loaded
+        self.secure_table.set_show_all_passwords(self.show_passwords_globally)
+        self.exit_locked_mode()
+        self.lbl_vault.setText(
+            f"Хранилище: {'открыто' if self.state.is_unlocked() else 'закрыто'} | Записей: {total}")
+
+    @staticmethod
+    def make_table_rows(entries) -> list[VaultRow]:
+        return [
             VaultRow(
                 entry_id=int(entry.id),
                 title=entry.title,
@@ -401,15 +447,8 @@ class MainWindow(QMainWindow):
                 tags=entry.tags,
                 updated_at=entry.updated_at,
             )
-            for entry in results
+            for entry in entries
         ]
-        self.secure_table.set_rows(rows)
-        if self.show_passwords_globally:
-            self.load_passwords_for_all_rows()
-        self.secure_table.set_show_all_passwords(self.show_passwords_globally)
-        self.exit_locked_mode()
-        self.lbl_vault.setText(
-            f"Хранилище: {'открыто' if self.state.is_unlocked() else 'закрыто'} | Записей: {len(rows)}")
 
     def enter_locked_mode(self) -> None:
         already_locked = self.locked_ui_mode
@@ -473,7 +512,7 @@ class MainWindow(QMainWindow):
             self,
             state: StateManager,
             auth_service: AuthenticationService,
-            audit_repo: AuditRepository,
+            audit_repo: Union[AuditRepository, BufferedAuditWriter],
             vault_repo: VaultRepository,
             settings_repo: SettingsRepository,
             db_path: Path,
@@ -701,7 +740,7 @@ class MainWindow(QMainWindow):
             QMessageBox.warning(self, "CryptoSafe", "Новый пароль и подтверждение не совпадают.")
             return
 
-        progress = QProgressDialog("Перешифрование хранилища...", "", 0, 100, self)
+        progress = QProgressDialog("Смена мастер-пароля...", "", 0, 100, self)
         progress.setWindowModality(Qt.WindowModal)
         progress.setCancelButton(None)
         progress.setValue(0)
@@ -720,7 +759,6 @@ class MainWindow(QMainWindow):
                 current_password=data.current_password,
                 new_password=data.new_password,
                 db=self.vault.db,
-                crypto=self.vault.crypto,
                 progress_callback=update_progress,
             )
             progress.setValue(100)
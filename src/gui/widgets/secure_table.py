@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 from datetime import datetime
-from typing import List
+from typing import Any, Callable, List, Optional
 from urllib.parse import urlparse
 
 from PySide6.QtCore import Qt, QAbstractTableModel, QModelIndex, Signal
@@ -21,22 +21,78 @@ class VaultRow:
     updated_at: str
 
 
+# Источник страниц отдает строки и курсор следующей страницы (None - страниц больше нет).
+# Курсор модели непрозрачен: у списка это (updated_at, id), у поиска - смещение выдачи.
+PageFetcher = Callable[[int, Optional[Any]], tuple[List[VaultRow], Optional[Any]]]
+
+
 class VaultTableModel(QAbstractTableModel):
+    default_page_size = 200
+    page_order_column = 4
+
     def __init__(self, rows: List[VaultRow]):
         super().__init__()
         self.rows = rows
         self.headers = ["Название", "Логин", "Пароль", "Домен", "Обновлено", "Теги"]
         self.visible_password_entry_ids: set[int] = set()
         self.show_all_passwords = False
+        self.page_fetcher: Optional[PageFetcher] = None
+        self.page_size = self.default_page_size
+        self.page_cursor: Optional[Any] = None
+        self.has_more_pages = False
 
     def set_rows(self, rows: List[VaultRow]) -> None:
         self.beginResetModel()
+        self.page_fetcher = None
+        self.page_cursor = None
+        self.has_more_pages = False
         self.rows = rows
         visible_ids = {entry_id for entry_id in self.visible_password_entry_ids}
         row_ids = {row.entry_id for row in rows}
         self.visible_password_entry_ids = visible_ids.intersection(row_ids)
         self.endResetModel()
 
+    def set_page_source(self, fetcher: PageFetcher, page_size: Optional[int] = None) -> None:
+        # Строки подгружаются страницами по мере прокрутки: представление само
+        # вызывает canFetchMore/fetchMore, когда доходит до конца загруженного.
+        self.beginResetModel()
+        self.page_fetcher = fetcher
+        self.page_size = max(1, int(page_size or self.default_page_size))
+        self.page_cursor = None
+        self.has_more_pages = True
+        self.rows = self.fetch_page()
+        self.endResetModel()
+
+    def fetch_page(self) -> List[VaultRow]:
+        # Пустая страница при непустом курсоре (все строки не расшифровались)
+        # не конец данных: берется следующая.
+        while self.page_fetcher is not None and self.has_more_pages:
+            page, self.page_cursor = self.page_fetcher(self.page_size, self.page_cursor)
+            self.has_more_pages = self.page_cursor is not None
+            if page:
+                return list(page)
+        return []
+
+    def canFetchMore(self, parent: QModelIndex = QModelIndex()) -> bool:
+        if parent.isValid():
+            return False
+        return self.page_fetcher is not None and self.has_more_pages
+
+    def fetchMore(self, parent: QModelIndex = QModelIndex()) -> None:
+        if not self.canFetchMore(parent):
+            return
+        page = self.fetch_page()
+        if not page:
+            return
+        first = len(self.rows)
+        self.beginInsertRows(QModelIndex(), first, first + len(page) - 1)
+        self.rows.extend(page)
+        self.endInsertRows()
+
+    def fetch_all_pages(self) -> None:
+        while self.canFetchMore():
+            self.fetchMore()
+
     def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
         del parent
         return len(self.rows)
@@ -278,6 +334,9 @@ class VaultTableModel(QAbstractTableModel):
 
     def sort(self, column: int, order: Qt.SortOrder = Qt.AscendingOrder) -> None:
         reverse = order == Qt.DescendingOrder
+        if column != self.page_order_column or not reverse:
+            # Страницы приходят по убыванию "Обновлено"; любой другой порядок требует всех строк.
+            self.fetch_all_pages()
         self.layoutAboutToBeChanged.emit()
         if column == 0:
             self.rows.sort(key=lambda item: item.title.lower(), reverse=reverse)
@@ -336,6 +395,15 @@ class SecureTable(QWidget):
     def set_rows(self, rows: List[VaultRow]) -> None:
         self.model.set_rows(rows)
 
+    def set_page_source(self, fetcher: PageFetcher, page_size: Optional[int] = None) -> None:
+        self.model.set_page_source(fetcher, page_size)
+
+    def loaded_row_count(self) -> int:
+        return self.model.rowCount()
+
+    def has_more_rows(self) -> bool:
+        return self.model.canFetchMore()
+
     def table_view(self) -> QTableView:
         return self.table
 
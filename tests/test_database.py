@@ -1,6 +1,12 @@
 from __future__ import annotations
 
+import os
+import sqlite3
+import threading
 from pathlib import Path
+from typing import Optional
+
+import pytest
 
 from database.db import Database
 
@@ -65,3 +71,402 @@ def test_schema_tables_and_columns(tmp_path: Path):
             assert c in key_cols
 
     db.close()
+
+
+V5_SCHEMA = """
+CREATE TABLE vault_entries (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    encrypted_data TEXT NOT NULL,
+    title TEXT,
+    username TEXT,
+    encrypted_password TEXT,
+    url TEXT,
+    notes TEXT,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    tags TEXT
+);
+CREATE INDEX idx_vault_updated_at ON vault_entries(updated_at);
+CREATE TABLE deleted_entries (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    source_entry_id INTEGER NOT NULL,
+    encrypted_data TEXT NOT NULL,
+    tags TEXT,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    deleted_at TEXT NOT NULL,
+    expires_at TEXT NOT NULL
+);
+CREATE TABLE audit_log (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    action TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    entry_id INTEGER,
+    details TEXT,
+    signature TEXT
+);
+CREATE TABLE settings (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    setting_key TEXT NOT NULL UNIQUE,
+    setting_value TEXT,
+    encrypted INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE key_store (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    key_type TEXT NOT NULL,
+    key_data TEXT NOT NULL,
+    version INTEGER NOT NULL DEFAULT 1,
+    created_at TIMESTAMP NOT NULL,
+    UNIQUE(key_type, version)
+);
+"""
+
+
+def test_v5_database_is_migrated_to_current_schema(tmp_path: Path):
+    import base64
+    import sqlite3
+
+    path = tmp_path / "vault.db"
+    ciphertext = bytes(range(40))
+    raw = sqlite3.connect(path)
+    raw.executescript(V5_SCHEMA)
+    raw.execute(
+        "INSERT INTO vault_entries (encrypted_data, created_at, updated_at) VALUES (?, 'c', 'u')",
+        (base64.b64encode(ciphertext).decode("utf-8"),),
+    )
+    raw.execute(
+        "INSERT INTO key_store (key_type, key_data, version, created_at) VALUES ('enc_salt', ?, 1, 'c')",
+        (base64.b64encode(b"S" * 16).decode("utf-8"),),
+    )
+    raw.execute("PRAGMA user_version = 5;")
+    raw.commit()
+    raw.close()
+
+    db = Database(path)
+    db.connect()
+    with db.session() as conn:
+        assert int(conn.execute("PRAGMA user_version;").fetchone()[0]) == Database.SCHEMA_VERSION
+        assert "encrypted_secret" in columns(conn, "vault_entries")
+        assert "encrypted_secret" in columns(conn, "deleted_entries")
+        assert "key_generation" in columns(conn, "vault_entries")
+        tables = {r["name"] for r in conn.execute("SELECT name FROM sqlite_master WHERE type='table'").fetchall()}
+        assert "search_tokens" in tables
+        assert "reencryption_checkpoint" in tables
+        assert not any(name.endswith("_v7") for name in tables)
+        indexes = {r["name"] for r in conn.execute("SELECT name FROM sqlite_master WHERE type='index'").fetchall()}
+        assert "idx_vault_updated_at" in indexes
+        entry = conn.execute("SELECT encrypted_data, typeof(encrypted_data) AS t FROM vault_entries").fetchone()
+        assert entry["t"] == "blob"
+        assert entry["encrypted_data"] == ciphertext
+        key_row = conn.execute("SELECT key_data FROM key_store WHERE key_type = 'enc_salt'").fetchone()
+        assert key_row["key_data"] == b"S" * 16
+    db.close()
+
+
+
+def write_v5_database(path: Path, entries: int) -> None:
+    import base64
+
+    raw = sqlite3.connect(path)
+    raw.executescript(V5_SCHEMA)
+    raw.executemany(
+        "INSERT INTO vault_entries (encrypted_data, created_at, updated_at) VALUES (?, 'c', 'u')",
+        [(base64.b64encode(bytes([index]) * 40).decode("utf-8"),) for index in range(entries)],
+    )
+    raw.execute("PRAGMA user_version = 5;")
+    raw.commit()
+    raw.close()
+
+
+def test_v7_to_v8_rebuild_keeps_autoincrement_counter(tmp_path: Path):
+    path = tmp_path / "vault.db"
+    write_v5_database(path, 5)
+    raw = sqlite3.connect(path)
+    raw.execute("DELETE FROM vault_entries WHERE id IN (4, 5)")
+    raw.commit()
+    raw.close()
+
+    db = Database(path)
+    db.connect()
+    with db.session() as conn:
+        seq = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'vault_entries'").fetchone()
+        assert seq["seq"] == 5
+        new_id = conn.execute(
+            "INSERT INTO vault_entries (encrypted_data, created_at, updated_at) VALUES (x'00', 'c', 'u')"
+        ).lastrowid
+        assert new_id == 6
+    db.close()
+
+
+def test_v7_to_v8_failure_leaves_v7_database_untouched(tmp_path: Path, monkeypatch):
+    path = tmp_path / "vault.db"
+    write_v5_database(path, 3)
+
+    def fail(conn, source, target):
+        raise sqlite3.OperationalError("disk I/O error")
+
+    monkeypatch.setattr(Database, "carry_sequence", staticmethod(fail))
+    db = Database(path)
+    with pytest.raises(sqlite3.OperationalError):
+        db.connect()
+    db.close()
+
+    raw = sqlite3.connect(path)
+    assert int(raw.execute("PRAGMA user_version;").fetchone()[0]) == 7
+    tables = {r[0] for r in raw.execute("SELECT name FROM sqlite_master WHERE type='table'").fetchall()}
+    assert "vault_entries" in tables
+    assert not any(name.endswith("_v7") for name in tables)
+    assert raw.execute("SELECT typeof(encrypted_data) FROM vault_entries").fetchone()[0] == "text"
+    assert raw.execute("SELECT COUNT(*) FROM vault_entries").fetchone()[0] == 3
+    raw.close()
+
+
+
+@pytest.mark.parametrize(
+    ("migration", "from_version", "changed"),
+    [
+        ("migrate_v5_to_v6", 5, "SELECT encrypted_secret FROM vault_entries"),
+        ("migrate_v6_to_v7", 6, "SELECT entry_id FROM search_tokens"),
+        # v7 -> v8 пересобирает таблицы по текущей схеме: у v8 и v9 проверяется только версия.
+        ("migrate_v8_to_v9", 8, None),
+        ("migrate_v9_to_v10", 9, None),
+    ],
+)
+def test_failed_migration_step_rolls_back_to_previous_version(
+    tmp_path: Path, monkeypatch, migration: str, from_version: int, changed: Optional[str]
+):
+    path = tmp_path / "vault.db"
+    write_v5_database(path, 3)
+    original = getattr(Database, migration)
+
+    def migrate_then_fail(self, conn):
+        original(self, conn)
+        raise sqlite3.OperationalError("disk I/O error")
+
+    monkeypatch.setattr(Database, migration, migrate_then_fail)
+    db = Database(path)
+    with pytest.raises(sqlite3.OperationalError, match="disk I/O"):
+        db.connect()
+    db.close()
+
+    raw = sqlite3.connect(path)
+    assert int(raw.execute("PRAGMA user_version;").fetchone()[0]) == from_version
+    if changed is not None:
+        with pytest.raises(sqlite3.OperationalError):
+            raw.execute(changed)
+    assert raw.execute("SELECT COUNT(*) FROM vault_entries").fetchone()[0] == 3
+    raw.close()
+
+    monkeypatch.setattr(Database, migration, original)
+    db = Database(path)
+    db.connect()
+    with db.read_session() as conn:
+        assert int(conn.execute("PRAGMA user_version;").fetchone()[0]) == Database.SCHEMA_VERSION
+    db.close()
+
+
+def test_backup_is_consistent_snapshot_and_restore_swaps_it_in(tmp_path: Path):
+    db = Database(tmp_path / "vault.db")
+    db.connect()
+    with db.session() as conn:
+        conn.executemany(
+            "INSERT INTO settings (setting_key, setting_value, encrypted) VALUES (?, ?, 0)",
+            [(f"key-{index}", "x" * 2000) for index in range(300)],
+        )
+
+    progress: list[tuple[int, int]] = []
+
+    def write_during_backup(copied: int, total: int) -> None:
+        progress.append((copied, total))
+        if len(progress) == 1:
+            if os.name != "nt":
+                partial = tmp_path / "backups" / "vault.bak.part"
+                assert partial.stat().st_mode & 0o777 == 0o600
+            with db.session() as conn:
+                conn.execute("INSERT INTO settings (setting_key, setting_value, encrypted) VALUES ('late', '1', 0)")
+
+    backup_path = db.backup(tmp_path / "backups" / "vault.bak", pages_per_step=8, progress_callback=write_during_backup)
+    assert len(progress) > 2
+    assert progress[-1][0] == progress[-1][1]
+    assert not (tmp_path / "backups" / "vault.bak.part").exists()
+
+    with db.session() as conn:
+        conn.execute("DELETE FROM settings")
+    db.restore(backup_path)
+    with db.session() as conn:
+        keys = {row["setting_key"] for row in conn.execute("SELECT setting_key FROM settings")}
+        assert int(conn.execute("PRAGMA user_version;").fetchone()[0]) == Database.SCHEMA_VERSION
+    assert len(keys) == 300 and "late" not in keys
+    db.close()
+
+
+def test_restore_rejects_foreign_or_newer_files_without_touching_vault(tmp_path: Path):
+    db = Database(tmp_path / "vault.db")
+    db.connect()
+    with db.session() as conn:
+        conn.execute("INSERT INTO settings (setting_key, setting_value, encrypted) VALUES ('keep', '1', 0)")
+
+    garbage = tmp_path / "garbage.bak"
+    garbage.write_bytes(b"not a database" * 100)
+    foreign = tmp_path / "foreign.bak"
+    with sqlite3.connect(foreign) as conn:
+        conn.execute("CREATE TABLE other (id INTEGER)")
+        conn.execute("PRAGMA user_version = 3")
+    newer = db.backup(tmp_path / "newer.bak")
+    with sqlite3.connect(newer) as conn:
+        conn.execute(f"PRAGMA user_version = {Database.SCHEMA_VERSION + 1}")
+
+    for candidate, message in ((garbage, "не является"), (foreign, "нет таблиц"), (newer, "версия схемы")):
+        with pytest.raises(ValueError, match=message):
+            db.restore(candidate)
+    with pytest.raises(ValueError):
+        db.backup(tmp_path / "vault.db")
+
+    with db.session() as conn:
+        assert conn.execute("SELECT setting_value FROM settings WHERE setting_key = 'keep'").fetchone()[0] == "1"
+    assert not (tmp_path / "vault.db.restore").exists()
+    db.close()
+
+
+
+@pytest.mark.parametrize("session_kind", ["read_session", "session"])
+def test_restore_waits_for_sessions_held_by_other_threads(tmp_path: Path, session_kind: str):
+    db = Database(tmp_path / "vault.db", pool_size=2)
+    db.connect()
+    with db.session() as conn:
+        conn.execute("INSERT INTO settings (setting_key, setting_value, encrypted) VALUES ('backed-up', '1', 0)")
+    backup_path = db.backup(tmp_path / "vault.bak")
+    with db.session() as conn:
+        conn.execute("INSERT INTO settings (setting_key, setting_value, encrypted) VALUES ('current', '1', 0)")
+
+    acquired = threading.Event()
+    release = threading.Event()
+    errors: list[BaseException] = []
+
+    def hold_session() -> None:
+        try:
+            with getattr(db, session_kind)() as conn:
+                conn.execute("SELECT COUNT(*) FROM settings").fetchone()
+                acquired.set()
+                release.wait(5)
+        except BaseException as exc:
+            errors.append(exc)
+
+    # Соединение не вернулось за отведенное время: restore отказывает и базу не трогает.
+    db.restore_drain_timeout_sec = 0.1
+    holder = threading.Thread(target=hold_session)
+    holder.start()
+    assert acquired.wait(5)
+    with pytest.raises(ValueError, match="занята"):
+        db.restore(backup_path)
+    release.set()
+    holder.join(5)
+    assert not (tmp_path / "vault.db.restore").exists()
+    with db.read_session() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM settings WHERE setting_key = 'current'").fetchone()[0] == 1
+
+    # Сессия закрывается во время ожидания: restore дожидается ее и подменяет файл.
+    db.restore_drain_timeout_sec = 5.0
+    acquired.clear()
+    release.clear()
+    holder = threading.Thread(target=hold_session)
+    holder.start()
+    assert acquired.wait(5)
+    threading.Timer(0.2, release.set).start()
+    db.restore(backup_path)
+    holder.join(5)
+    assert errors == []
+    with db.session() as conn:
+        keys = {row["setting_key"] for row in conn.execute("SELECT setting_key FROM settings")}
+        assert conn.execute("PRAGMA integrity_check;").fetchone()[0] == "ok"
+    assert keys == {"backed-up"}
+    assert db.pool_stats().idle == db.pool_size
+    db.close()
+
+
+def test_pool_is_configurable_instrumented_and_replaces_broken_connections(tmp_path: Path):
+    db = Database(tmp_path / "vault.db", pool_size=2, acquire_timeout_sec=0.05, pragmas={"cache_size": -4000})
+    db.connect()
+    db.reset_pool_stats()
+
+    with db.session() as conn:
+        conn.execute("INSERT INTO settings (setting_key, setting_value, encrypted) VALUES ('a', '1', 0)")
+    with db.read_session() as conn:
+        assert conn.execute("PRAGMA cache_size;").fetchone()[0] == -4000
+        with db.read_session() as other:
+            assert db.pool_stats().in_use == 2
+            with pytest.raises(TimeoutError):
+                with db.read_session():
+                    pass
+            del other
+    stats = db.pool_stats()
+    assert (stats.size, stats.idle, stats.in_use) == (2, 2, 0)
+    assert (stats.acquired, stats.timeouts) == (2, 1)
+    assert stats.hold.count == 2 and stats.transaction.count == 0
+    assert sum(hits for _, hits in stats.acquire_wait.buckets) == 2
+    assert 0 < stats.hold.percentile_ms(50) <= stats.hold.max_sec * 1000
+    assert db.writer_stats().transaction.count == 1
+
+    # Соединение, закрытое в сессии, не возвращается в пул, а заменяется новым.
+    with pytest.raises(sqlite3.ProgrammingError):
+        with db.read_session() as conn:
+            conn.close()
+            conn.execute("SELECT 1")
+    # Простаивавшее соединение проверяется при выдаче и тоже заменяется, если умерло.
+    db.health_check_idle_sec = 0.0
+    db.pool.queue[0].close()
+    for _ in range(2):
+        with db.read_session() as conn:
+            assert conn.execute("SELECT setting_value FROM settings WHERE setting_key = 'a'").fetchone()[0] == "1"
+    stats = db.pool_stats()
+    assert stats.replaced == 2 and stats.health_checks == 2 and stats.idle == 2
+
+    with pytest.raises(ValueError):
+        Database(tmp_path / "other.db", pragmas={"journal_mode": "WAL; DROP TABLE settings"})
+    db.close()
+
+
+def test_reads_run_on_query_only_connections_beside_a_single_serialized_writer(tmp_path: Path):
+    db = Database(tmp_path / "vault.db", acquire_timeout_sec=0.05)
+    db.connect()
+
+    with db.read_session() as conn:
+        with pytest.raises(sqlite3.OperationalError):
+            conn.execute("INSERT INTO settings (setting_key, setting_value, encrypted) VALUES ('x', '1', 0)")
+
+    # Долгое чтение держит свой снимок и не мешает записи.
+    with db.read_session() as reader:
+        cursor = reader.execute("SELECT setting_key FROM settings")
+        with db.session() as conn:
+            conn.execute("INSERT INTO settings (setting_key, setting_value, encrypted) VALUES ('during', '1', 0)")
+            # Вложенная сессия того же потока пишет в ту же транзакцию.
+            with db.session() as nested:
+                assert nested is conn
+                nested.execute("INSERT INTO settings (setting_key, setting_value, encrypted) VALUES ('nested', '1', 0)")
+        assert cursor.fetchall() == []
+
+    with pytest.raises(ValueError):
+        with db.session() as conn:
+            conn.execute("INSERT INTO settings (setting_key, setting_value, encrypted) VALUES ('rolled', '1', 0)")
+            raise ValueError("boom")
+    with db.read_session() as conn:
+        keys = {row[0] for row in conn.execute("SELECT setting_key FROM settings")}
+    assert keys == {"during", "nested"}
+
+    # Второй поток ждет писателя не дольше acquire_timeout_sec.
+    errors: list[BaseException] = []
+
+    def write_from_other_thread() -> None:
+        try:
+            with db.session():
+                pass
+        except BaseException as exc:
+            errors.append(exc)
+
+    with db.session():
+        worker = threading.Thread(target=write_from_other_thread)
+        worker.start()
+        worker.join()
+    assert len(errors) == 1 and isinstance(errors[0], TimeoutError)
+    assert db.writer_stats().timeouts == 1
+    db.close()
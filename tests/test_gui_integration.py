@@ -220,3 +220,89 @@ def test_enter_locked_mode_clears_clipboard_only_on_first_transition(tmp_path: P
     window.close()
     bus.shutdown()
     db.close()
+
+
+def test_table_model_fetches_pages_on_demand(qapp):
+    from gui.widgets.secure_table import VaultRow, VaultTableModel
+
+    source = [
+        VaultRow(entry_id=index, title=f"t{index}", username="", password="", url="", tags="", updated_at="2024")
+        for index in range(25, 0, -1)
+    ]
+    calls: list[tuple[int, object]] = []
+
+    def fetch_page(limit, after):
+        calls.append((limit, after))
+        rows = source if after is None else [row for row in source if (row.updated_at, row.entry_id) < after]
+        # Строки с id 6..15 не расшифровались: вторая страница пуста, но курсор идет дальше.
+        page = [row for row in rows[:limit] if not 6 <= row.entry_id <= 15]
+        if len(rows) <= limit:
+            return page, None
+        return page, (rows[limit - 1].updated_at, rows[limit - 1].entry_id)
+
+    model = VaultTableModel([])
+    model.set_page_source(fetch_page, page_size=10)
+    assert model.rowCount() == 10
+    assert model.canFetchMore()
+
+    model.fetchMore()
+    assert model.rowCount() == 15
+    assert calls[-2:] == [(10, ("2024", 16)), (10, ("2024", 6))]
+    assert not model.canFetchMore()
+
+    model.sort(0)
+    assert model.rowCount() == 15
+    assert not model.canFetchMore()
+
+    model.set_rows([])
+    assert not model.canFetchMore()
+
+
+def test_main_window_search_loads_results_page_by_page(tmp_path: Path, qapp, monkeypatch):
+    del qapp
+    from gui.widgets.secure_table import VaultTableModel
+
+    db = Database(tmp_path / "vault.db")
+    db.connect()
+    bus = EventBus()
+    state = StateManager()
+    km = KeyManager(db)
+    auth = AuthenticationService(key_manager=km, state=state, bus=bus)
+    auth.setup_master_password("UltraSafeA1!Key", username="nak")
+    crypto = AES256Placeholder(km)
+    vault_repo = VaultRepository(db=db, crypto=crypto)
+    vault_repo.add_many([{"title": f"match-{index}", "password": "StrongPassA1!x"} for index in range(25)])
+
+    monkeypatch.setattr(VaultTableModel, "default_page_size", 10)
+    calls: list[tuple[object, int]] = []
+    original_search = vault_repo.search
+
+    def recording_search(*args, **kwargs):
+        calls.append((kwargs.get("limit"), kwargs.get("offset", 0)))
+        return original_search(*args, **kwargs)
+
+    monkeypatch.setattr(vault_repo, "search", recording_search)
+    window = MainWindow(
+        bus=bus,
+        state=state,
+        auth_service=auth,
+        audit_repo=AuditRepository(db),
+        vault_repo=vault_repo,
+        settings_repo=SettingsRepository(db=db, crypto=crypto),
+    )
+    calls.clear()
+    window.txt_search.setText("match")
+    window.reload_table()
+
+    model = window.secure_table.model
+    assert model.rowCount() == 10
+    assert calls[-1] == (10, 0)
+    assert "Записей: 10+" in window.lbl_vault.text()
+
+    model.fetch_all_pages()
+    assert model.rowCount() == 25
+    assert calls[-2:] == [(10, 10), (10, 20)]
+
+    window.close()
+    bus.shutdown()
+    db.close()
@@ -1,13 +1,19 @@
 from __future__ import annotations
 
+import time
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
 
+import pytest
+
 from core.audit_logger import AuditLogger
+from core.audit_writer import BufferedAuditWriter
 from core.crypto.authentication import AuthenticationService
 from core.crypto.placeholder import AES256Placeholder
-from core.events import EntryAdded, EntryDeleted, EventBus, UserLoggedIn
+from core.events import EntryAdded, EntryDeleted, EventBus, UserLoggedIn, UserLoggedOut
 from core.key_manager import KeyManager
 from core.state_manager import StateManager
+from database.audit_archive import AuditArchive
 from database.db import Database
 from database.repositories import AuditRepository, SettingsRepository, VaultRepository
 
@@ -83,3 +89,225 @@ def test_audit_logger_writes_on_events(tmp_path: Path):
 
     bus.shutdown()
     db.close()
+
+
+def test_bulk_add_and_update_emit_one_audit_record(tmp_path: Path):
+    db = Database(tmp_path / "vault.db")
+    db.connect()
+
+    state = StateManager()
+    km = KeyManager(db)
+    auth = AuthenticationService(key_manager=km, state=state)
+    auth.setup_master_password("UltraSafeA1!Key", username="nak")
+
+    bus = EventBus()
+    audit_repo = AuditRepository(db)
+    AuditLogger(bus, audit_repo).start()
+    repo = VaultRepository(db=db, crypto=AES256Placeholder(km), bus=bus)
+
+    first_id = repo.add(title="single", username="nak", password="StrongPassA1!0")
+    items = [
+        {"title": f"bulk-{index}", "username": "nak", "password": f"StrongPassA1!{index}", "tags": "bulk"}
+        for index in range(25)
+    ]
+    entry_ids = repo.add_many(items, chunk_size=10)
+    assert entry_ids == list(range(first_id + 1, first_id + 26))
+    assert repo.get_password(entry_ids[7]) == "StrongPassA1!7"
+    assert [entry.id for entry in repo.search(query="bulk-13")] == [entry_ids[13]]
+
+    repo.update_many({entry_id: {"title": "renamed", "password": "OtherPassA1!x"} for entry_id in entry_ids[:3]})
+    assert repo.get_by_id(entry_ids[0])["title"] == "renamed"
+    assert repo.get_password(entry_ids[2]) == "OtherPassA1!x"
+    assert repo.get_by_id(entry_ids[2])["tags"] == "bulk"
+
+    with pytest.raises(ValueError, match="Запись недоступна\\."):
+        repo.update_many({entry_ids[3]: {"title": "lost"}, 999999: {"title": "missing"}})
+    assert repo.get_by_id(entry_ids[3])["title"] == "bulk-3"
+
+    actions = [record.action for record in audit_repo.last(10)]
+    assert actions.count("EntriesCreated") == 1
+    assert actions.count("EntriesUpdated") == 1
+
+    # id порции не обязаны идти подряд: каждая запись получает свой id вставки.
+    with db.session() as conn:
+        conn.execute(
+            """
+            CREATE TRIGGER gap_ids AFTER INSERT ON vault_entries WHEN NEW.tags != 'filler'
+            BEGIN
+                INSERT INTO vault_entries (encrypted_data, created_at, updated_at, tags)
+                VALUES (x'00', NEW.created_at, NEW.created_at, 'filler');
+            END
+            """
+        )
+    gap_ids = repo.add_many([{"title": f"gap-{index}", "password": f"StrongPassA1!{index}"} for index in range(4)])
+    with db.session() as conn:
+        conn.execute("DROP TRIGGER gap_ids")
+        conn.execute("DELETE FROM vault_entries WHERE tags = 'filler'")
+    assert [gap_ids[index + 1] - gap_ids[index] for index in range(3)] == [2, 2, 2]
+    assert [repo.get_by_id(entry_id)["title"] for entry_id in gap_ids] == [f"gap-{index}" for index in range(4)]
+    assert [entry.id for entry in repo.search(query="gap-2")] == [gap_ids[2]]
+
+    bus.shutdown()
+    db.close()
+
+
+def test_buffered_audit_writer_batches_by_size_and_flushes_on_logout_and_stop(tmp_path: Path):
+    db = Database(tmp_path / "vault.db")
+    db.connect()
+
+    bus = EventBus()
+    audit_repo = AuditRepository(db)
+    writer = BufferedAuditWriter(audit_repo, max_batch=3, flush_interval_sec=60)
+    writer.start()
+    AuditLogger(bus, writer).start()
+
+    bus.publish(UserLoggedIn(username="nak"))
+    bus.publish(EntryAdded(title="first"))
+    assert writer.queue_depth() == 2
+    assert audit_repo.last(10) == []
+
+    # Третье событие добивает порцию до max_batch: поток пишет ее, не дожидаясь интервала.
+    bus.publish(EntryAdded(title="second"))
+    deadline = time.monotonic() + 5
+    while writer.stats().written < 3 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert [record.action for record in reversed(audit_repo.last(10))] == ["UserLoggedIn", "EntryAdded", "EntryAdded"]
+
+    bus.publish(EntryDeleted(title="first"))
+    bus.publish(UserLoggedOut(username="nak"))
+    assert writer.queue_depth() == 0
+    assert audit_repo.last(1)[0].action == "UserLoggedOut"
+
+    bus.publish(EntryAdded(title="after"))
+    writer.stop()
+    stats = writer.stats()
+    assert stats.queue_depth == 0
+    assert stats.written == 6
+    assert stats.batches == 3
+    assert stats.flush_latency.count == 3
+    records = audit_repo.last(10)
+    assert [record.action for record in records][:2] == ["EntryAdded", "UserLoggedOut"]
+    assert [record.timestamp for record in reversed(records)] == sorted(record.timestamp for record in records)
+
+    bus.shutdown()
+    db.close()
+
+
+def test_audit_archive_rotates_into_segments_and_queries_only_matching_ones(tmp_path: Path):
+    db = Database(tmp_path / "vault.db")
+    db.connect()
+    audit_repo = AuditRepository(db)
+    now = datetime.now(timezone.utc)
+    stamps = [(now - timedelta(days=25 - index, hours=1)).isoformat(timespec="seconds") for index in range(25)]
+    audit_repo.write_many([("Event", stamp, None, {"n": index}) for index, stamp in enumerate(stamps)])
+
+    archive = AuditArchive(db)
+    assert len(archive.rotate(keep_rows=5, segment_rows=8, max_segments=1)) == 1
+    segments = archive.segments() + archive.rotate(keep_rows=5, segment_rows=8)
+    assert [(segment.first_id, segment.last_id, segment.rows) for segment in segments] == [(1, 8, 8), (9, 16, 8), (17, 20, 4)]
+    assert archive.directory == tmp_path / "vault.db.audit"
+    assert [record.id for record in reversed(audit_repo.last(50))] == [21, 22, 23, 24, 25]
+
+    # Диапазон на стыке архива и базы: последний сегмент плюс живые строки, без дублей.
+    assert [record.id for record in archive.query(date_from=stamps[18])] == list(range(19, 26))
+
+    # Строка, вернувшаяся в базу (например, восстановлением из копии), дочищается ротацией.
+    with db.session() as conn:
+        conn.execute(
+            "INSERT INTO audit_log (id, action, timestamp, entry_id, details, signature) VALUES (3, 'Event', ?, NULL, ?, NULL)",
+            (stamps[2], '{"n": 2}'),
+        )
+    assert [record.id for record in archive.query(date_to=stamps[3])] == [1, 2, 3, 4]
+    assert archive.rotate(keep_rows=5, max_age_days=2) == [archive.segments()[-1]]
+    assert archive.segments()[-1].first_id == 21 and archive.segments()[-1].last_id == 24
+    assert [record.id for record in audit_repo.last(50)] == [25]
+
+    middle = archive.segments_between(stamps[9], stamps[12])
+    assert [segment.file for segment in middle] == [archive.segments()[1].file]
+    for segment in archive.segments():
+        if segment not in middle:
+            (archive.directory / segment.file).unlink()
+    records = archive.query(date_from=stamps[9], date_to=stamps[12], action="Event")
+    assert [record.id for record in records] == [10, 11, 12, 13]
+    assert records[0].details == '{"n": 9}'
+    with pytest.raises(ValueError, match="Сегмент архива аудита не найден"):
+        archive.query(date_to=stamps[2])
+
+    db.close()
+
+
+def test_audit_archive_keeps_rows_written_after_restore_under_reused_ids(tmp_path: Path):
+    db = Database(tmp_path / "vault.db")
+    db.connect()
+    audit_repo = AuditRepository(db)
+    archive = AuditArchive(db)
+    audit_repo.write_many([("Old", now_iso_offset(-3600 + index), None, {"n": index}) for index in range(3)])
+    backup_path = db.backup(tmp_path / "vault.bak")
+
+    audit_repo.write_many([("Later", now_iso_offset(-1800 + index), None, {"n": index}) for index in range(10)])
+    assert sum(segment.rows for segment in archive.rotate(keep_rows=0, max_age_days=None)) == 13
+    assert audit_repo.last(50) == []
+
+    # Копия старше архива: ее строки 1-3 уже в сегменте, а AUTOINCREMENT снова выдает id 4-8.
+    db.restore(backup_path)
+    audit_repo.write_many([("NEW", now_iso_offset(index), None, {"n": index}) for index in range(5)])
+    assert [record.id for record in audit_repo.last(50)] == [8, 7, 6, 5, 4, 3, 2, 1]
+    assert [record.action for record in archive.query(action="NEW")] == ["NEW"] * 5
+    assert len(archive.query()) == 18
+
+    assert archive.rotate(keep_rows=5, max_age_days=None) == []
+    live = audit_repo.last(50)
+    assert [record.action for record in live] == ["NEW"] * 5
+    assert min(record.id for record in live) > 13
+    assert [record.action for record in archive.query()] == ["Old"] * 3 + ["Later"] * 10 + ["NEW"] * 5
+    audit_repo.write("Next", {})
+    assert audit_repo.last(1)[0].id > max(record.id for record in live)
+
+    # Явный None отключает правило, значение по умолчанию - политика класса.
+    archive.keep_rows = 0
+    assert archive.rotate(keep_rows=None, max_age_days=None) == []
+    assert len(audit_repo.last(50)) == 6
+    assert sum(segment.rows for segment in archive.rotate(max_age_days=None)) == 6
+    assert audit_repo.last(50) == []
+    assert len(archive.query()) == 19
+
+    db.close()
+
+
+def now_iso_offset(seconds: int) -> str:
+    return (datetime.now(timezone.utc) + timedelta(seconds=seconds)).isoformat(timespec="seconds")
+
+
+def test_buffered_audit_writer_survives_busy_writer_and_quarantines_bad_records(tmp_path: Path):
+    db = Database(tmp_path / "vault.db", acquire_timeout_sec=0.05)
+    db.connect()
+    audit_repo = AuditRepository(db)
+    writer = BufferedAuditWriter(audit_repo, max_batch=2, flush_interval_sec=0.02)
+    writer.start()
+
+    # Долгая транзакция держит писателя дольше acquire_timeout_sec: сброс падает с
+    # TimeoutError, но поток жив и записывает очередь, когда писатель освободится.
+    with db.session():
+        writer.write("Busy", {"n": 1})
+        writer.write("Busy", {"n": 2})
+        deadline = time.monotonic() + 5
+        while writer.stats().failed_batches == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert writer.stats().failed_batches >= 1
+    deadline = time.monotonic() + 5
+    while writer.stats().written < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert writer.thread is not None and writer.thread.is_alive()
+    assert [record.action for record in audit_repo.last(10)] == ["Busy", "Busy"]
+
+    # details, которые не сериализуются, не застревают в очереди навсегда и не губят соседей.
+    writer.write("Good", {"n": 3})
+    writer.write("Bad", {"value": object()})
+    writer.write("Good", {"n": 4})
+    writer.stop()
+    stats = writer.stats()
+    assert (stats.queue_depth, stats.written, stats.quarantined) == (0, 4, 1)
+    assert [record[0] for record in writer.quarantine] == ["Bad"]
+    assert [record.action for record in reversed(audit_repo.last(10))] == ["Busy", "Busy", "Good", "Good"]
+
+    db.close()
@@ -86,7 +86,6 @@ def test_password_change_integration_with_ten_entries(tmp_path):
         current_password="UltraSafeA1!Key",
         new_password="UltraSafeB2!Key",
         db=db,
-        crypto=crypto,
     )
 
     auth.logout(emit_event=False)
@@ -103,3 +102,75 @@ def test_password_change_integration_with_ten_entries(tmp_path):
         assert row["notes"] == f"note-{i}"
 
     db.close()
+
+
+def test_password_change_rewraps_data_key_without_touching_entries(tmp_path):
+    db = Database(tmp_path / "vault.db")
+    db.connect()
+    state = StateManager()
+    km = KeyManager(db)
+    auth = AuthenticationService(key_manager=km, state=state)
+    auth.setup_master_password("UltraSafeA1!Key", username="nak")
+    crypto = AES256Placeholder(km)
+    vault = VaultRepository(db=db, crypto=crypto)
+
+    entry_id = vault.add(title="entry", username="nak", password="secret-value")
+    with db.session() as conn:
+        before = conn.execute("SELECT encrypted_data, updated_at FROM vault_entries WHERE id = ?", (entry_id,)).fetchone()
+    wrapped_before = km.load_key_data(km.data_key_type)
+
+    progress: list[tuple[int, int]] = []
+    auth.change_master_password(
+        current_password="UltraSafeA1!Key",
+        new_password="UltraSafeB2!Key",
+        db=db,
+        progress_callback=lambda current, total: progress.append((current, total)),
+    )
+
+    with db.session() as conn:
+        after = conn.execute("SELECT encrypted_data, updated_at FROM vault_entries WHERE id = ?", (entry_id,)).fetchone()
+    assert after["encrypted_data"] == before["encrypted_data"]
+    assert after["updated_at"] == before["updated_at"]
+    assert km.load_key_data(km.data_key_type) != wrapped_before
+    assert progress[-1] == (1, 1)
+
+    auth.logout(emit_event=False)
+    assert auth.authenticate("UltraSafeB2!Key", username="nak").success is True
+    row = vault.get_by_id(entry_id)
+    assert row is not None
+    assert row["password"] == "secret-value"
+
+    db.close()
+
+
+def test_vault_without_data_key_is_migrated_on_login(tmp_path):
+    db = Database(tmp_path / "vault.db")
+    db.connect()
+    km = KeyManager(db)
+    km.setup_master_password("UltraSafeA1!Key")
+    km.cache_encryption_key(km.derive_master_encryption_key("UltraSafeA1!Key"))
+    crypto = AES256Placeholder(km)
+    vault = VaultRepository(db=db, crypto=crypto)
+    entry_id = vault.add(title="legacy", username="nak", password="legacy-secret")
+    assert km.load_key_data(km.data_key_type) is None
+
+    km.clear_cached_key()
+    auth = AuthenticationService(key_manager=km, state=StateManager())
+    assert auth.authenticate("UltraSafeA1!Key", username="nak").success is True
+    assert km.load_key_data(km.data_key_type) is not None
+    row = vault.get_by_id(entry_id)
+    assert row is not None
+    assert row["password"] == "legacy-secret"
+
+    auth.change_master_password(
+        current_password="UltraSafeA1!Key",
+        new_password="UltraSafeB2!Key",
+        db=db,
+    )
+    auth.logout(emit_event=False)
+    assert auth.authenticate("UltraSafeB2!Key", username="nak").success is True
+    row = vault.get_by_id(entry_id)
+    assert row is not None
+    assert row["password"] == "legacy-secret"
+
+    db.close()
@@ -111,3 +111,108 @@ def test_generic_entry_error_message_does_not_leak_existence(tmp_path: Path):
         vault.entry_manager.delete_entry(999999)
 
     db.close()
+
+
+def test_warm_metadata_cache_skips_decryption(tmp_path: Path):
+    db, auth, vault = make_runtime(tmp_path)
+    del auth
+
+    fill_entries(vault, 30)
+    manager = vault.entry_manager
+    calls: list[int] = []
+    original_decrypt = manager.encryption_service.decrypt_with_cipher
+
+    def counting_decrypt(*args, **kwargs):
+        calls.append(1)
+        return original_decrypt(*args, **kwargs)
+
+    manager.encryption_service.decrypt_with_cipher = counting_decrypt
+
+    assert len(vault.list()) == 30
+    cold_calls = len(calls)
+    assert cold_calls == 30
+
+    assert len(vault.list()) == 30
+    assert len(vault.search(query="title-7")) == 1
+    assert len(calls) == cold_calls
+
+    target = vault.list()[0]
+    vault.update(
+        entry_id=target.id,
+        title="renamed",
+        username=target.username,
+        password="StrongPassA1!renamed",
+    )
+    calls_after_update = len(calls)
+    assert any(row.title == "renamed" for row in vault.list())
+    assert len(calls) == calls_after_update + 1
+
+    db.close()
+
+
+def test_metadata_cache_cleared_with_session_key(tmp_path: Path):
+    db, auth, vault = make_runtime(tmp_path)
+
+    fill_entries(vault, 5)
+    vault.list()
+    assert len(vault.entry_manager.metadata_cache) == 5
+
+    auth.logout(emit_event=False)
+    assert vault.entry_manager.metadata_cache == {}
+    assert vault.list() == []
+
+    db.close()
+
+
+def test_strength_filter_uses_stored_scores(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    db, auth, vault = make_runtime(tmp_path)
+    del auth
+    manager = vault.entry_manager
+    weak_id = vault.add(title="weak", username="u", password="short")
+    strong_id = vault.add(title="strong", username="u", password="VeryLongStrongPassA1!Word")
+    with db.session() as conn:
+        conn.execute("UPDATE vault_entries SET updated_at = '2000-01-01T00:00:00+00:00' WHERE id = ?", (weak_id,))
+
+    calls = {"get_entry": 0}
+    original_get_entry = manager.get_entry
+
+    def counting_get_entry(entry_id: int):
+        calls["get_entry"] += 1
+        return original_get_entry(entry_id)
+
+    monkeypatch.setattr(manager, "get_entry", counting_get_entry)
+    assert [entry.id for entry in vault.search(query="", min_password_strength=3)] == [strong_id]
+    assert calls["get_entry"] == 0
+
+    legacy_row = dict(manager.get_all_entries()[1])
+    legacy_row.pop("password_strength")
+    assert manager.password_strength(legacy_row) == 0
+    assert manager.password_strength(legacy_row) == 0
+    assert calls["get_entry"] == 1
+    db.close()
+
+
+def test_iter_entries_streams_in_bounded_batches(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    db, auth, vault = make_runtime(tmp_path)
+    del auth
+    fill_entries(vault, count=7)
+    manager = vault.entry_manager
+
+    batch_sizes: list[int] = []
+    original_build = manager.build_entries_from_rows
+
+    def recording_build(rows, include_sensitive, include_notes):
+        batch_sizes.append(len(rows))
+        return original_build(rows, include_sensitive, include_notes)
+
+    monkeypatch.setattr(manager, "build_entries_from_rows", recording_build)
+    streamed = manager.iter_entries(batch_size=3)
+    first = next(streamed)
+    assert batch_sizes == [3]
+    # Между пачками соединение чтения возвращено в пул.
+    stats = db.pool_stats()
+    assert stats.idle == stats.size
+    rest = list(streamed)
+    assert batch_sizes == [3, 3, 1]
+    assert [entry["id"] for entry in [first, *rest]] == [entry["id"] for entry in manager.get_all_entries()]
+    db.close()
@@ -1,12 +1,17 @@
 from __future__ import annotations
 
+import sqlite3
+import time
 from pathlib import Path
 
+import pytest
+
 from core.crypto.authentication import AuthenticationService
 from core.crypto.placeholder import AES256Placeholder
 from core.key_manager import KeyManager
 from core.state_manager import StateManager
 from core.vault.password_generator import PasswordGenerationConfig, PasswordGenerator
+from core.vault.reencryption import ReencryptionResumer
 from database.db import Database
 from database.repositories import VaultRepository
 
@@ -23,7 +28,7 @@ def make_runtime(tmp_path: Path) -> tuple[Database, AuthenticationService, Vault
     return db, auth, vault
 
 
-def test_entry_roundtrip_uses_encrypted_data_text(tmp_path: Path):
+def test_entry_roundtrip_uses_encrypted_data_blob(tmp_path: Path):
     db, auth, vault = make_runtime(tmp_path)
     del auth
 
@@ -50,10 +55,10 @@ def test_entry_roundtrip_uses_encrypted_data_text(tmp_path: Path):
         ).fetchone()
     assert row is not None
     encrypted_data = row["encrypted_data"]
-    assert isinstance(encrypted_data, str)
-    assert row["t"] == "text"
-    assert "GitHub" not in encrypted_data
-    assert "VeryStrongA1!Password" not in encrypted_data
+    assert isinstance(encrypted_data, bytes)
+    assert row["t"] == "blob"
+    assert b"GitHub" not in encrypted_data
+    assert b"VeryStrongA1!Password" not in encrypted_data
     assert row["encrypted_password"] is None
     assert row["notes"] is None
 
@@ -138,14 +143,14 @@ def test_password_generator_profile_and_history():
     assert len(set(generated)) >= 990
 
 
-def test_key_store_values_are_text_not_blob(tmp_path: Path):
+def test_key_store_values_are_blob(tmp_path: Path):
     db, auth, vault = make_runtime(tmp_path)
     del auth
     del vault
     with db.session() as conn:
         rows = conn.execute("SELECT typeof(key_data) as key_data_type FROM key_store").fetchall()
     assert rows
-    assert all(row["key_data_type"] == "text" for row in rows)
+    assert all(row["key_data_type"] == "blob" for row in rows)
     db.close()
 
 
@@ -196,3 +201,781 @@ def test_search_fulltext_fuzzy_and_field_filters(tmp_path: Path):
     assert len(strong_only) == 2
 
     db.close()
+
+
+def test_entry_secrets_stored_in_separate_ciphertext(tmp_path: Path):
+    db, auth, vault = make_runtime(tmp_path)
+    del auth
+
+    entry_id = vault.add(
+        title="Bank",
+        username="nak",
+        password="BankSecretA1!Value",
+        url="https://bank.example",
+        notes="pin in safe",
+    )
+    manager = vault.entry_manager
+    key = manager.key_manager.get_active_key()
+    with db.session() as conn:
+        row = conn.execute("SELECT encrypted_data, encrypted_secret FROM vault_entries WHERE id = ?", (entry_id,)).fetchone()
+    metadata = manager.encryption_service.decrypt_payload(
+        row["encrypted_data"],
+        key,
+        associated_data=manager.metadata_associated_data,
+    )
+    secret = manager.encryption_service.decrypt_payload(
+        row["encrypted_secret"],
+        key,
+        associated_data=manager.secret_associated_data,
+    )
+    assert metadata["title"] == "Bank"
+    assert "password" not in metadata
+    assert secret["password"] == "BankSecretA1!Value"
+
+    decrypted_aad: list[object] = []
+    original_decrypt = manager.encryption_service.decrypt_with_cipher
+
+    def tracking_decrypt(cipher, encrypted_data, associated_data=None):
+        decrypted_aad.append(associated_data)
+        return original_decrypt(cipher, encrypted_data, associated_data=associated_data)
+
+    manager.encryption_service.decrypt_with_cipher = tracking_decrypt
+    assert [entry.title for entry in vault.search(query="bank")] == ["Bank"]
+    assert manager.secret_associated_data not in decrypted_aad
+    assert vault.get_password(entry_id) == "BankSecretA1!Value"
+    assert manager.secret_associated_data in decrypted_aad
+
+    db.close()
+
+
+def test_single_blob_rows_remain_readable(tmp_path: Path):
+    db, auth, vault = make_runtime(tmp_path)
+    del auth
+
+    manager = vault.entry_manager
+    payload = manager.normalize_entry_payload(
+        {"title": "Old format", "username": "nak", "password": "OldSecretA1!Value", "notes": "n"}
+    )
+    encrypted_data = manager.encryption_service.encrypt_payload(payload, manager.key_manager.get_active_key())
+    with db.session() as conn:
+        cur = conn.execute(
+            """
+            INSERT INTO vault_entries (encrypted_data, created_at, updated_at, tags)
+            VALUES (?, ?, ?, ?)
+            """,
+            (encrypted_data, payload["created_at"], payload["created_at"], ""),
+        )
+        entry_id = int(cur.lastrowid)
+
+    assert [entry.title for entry in vault.list()] == ["Old format"]
+    row = vault.get_by_id(entry_id)
+    assert row is not None
+    assert row["password"] == "OldSecretA1!Value"
+
+    vault.update(entry_id, title="Old format", username="nak", password="NewSecretA1!Value")
+    with db.session() as conn:
+        stored = conn.execute("SELECT encrypted_secret FROM vault_entries WHERE id = ?", (entry_id,)).fetchone()
+    assert stored["encrypted_secret"]
+    assert vault.get_password(entry_id) == "NewSecretA1!Value"
+
+    db.close()
+
+
+def test_blind_index_narrows_search_and_follows_entry_lifecycle(tmp_path: Path):
+    db, auth, vault = make_runtime(tmp_path)
+    del auth
+
+    manager = vault.entry_manager
+    keep_id = vault.add(title="Github Work", username="nak.dev", password="StrongPassA1!Git", url="https://github.com")
+    drop_id = vault.add(title="Gitlab", username="nak", password="StrongPassA1!Lab", url="https://gitlab.com")
+    for index in range(20):
+        vault.add(title=f"other-{index}", username="someone", password=f"StrongPassA1!{index}")
+
+    with db.session() as conn:
+        tokens = conn.execute("SELECT token FROM search_tokens WHERE entry_id = ?", (keep_id,)).fetchall()
+        assert tokens
+        assert all(isinstance(row["token"], bytes) and b"github" not in row["token"] for row in tokens)
+        assert manager.search_index.candidate_ids(conn, "github") == [keep_id]
+
+    assert [entry.id for entry in vault.search(query="github")] == [keep_id]
+    assert {entry.id for entry in vault.search(query="git")} == {keep_id, drop_id}
+
+    vault.delete(drop_id)
+    with db.session() as conn:
+        remaining = conn.execute("SELECT COUNT(*) FROM search_tokens WHERE entry_id = ?", (drop_id,)).fetchone()[0]
+    assert remaining == 0
+
+    vault.update(keep_id, title="Codeberg", username="nak.dev", password="StrongPassA1!Git")
+    assert [entry.id for entry in vault.search(query="codeberg")] == [keep_id]
+    assert vault.search(query="github") == []
+
+    db.close()
+
+
+def test_blind_index_backfills_rows_without_tokens(tmp_path: Path):
+    db, auth, vault = make_runtime(tmp_path)
+
+    entry_id = vault.add(title="Backfill me", username="nak", password="StrongPassA1!Fill", notes="hidden words")
+    with db.session() as conn:
+        conn.execute("DELETE FROM search_tokens")
+
+    auth.logout(emit_event=False)
+    assert auth.authenticate("UltraSafeA1!Key", username="nak").success is True
+
+    assert [entry.id for entry in vault.search(query="backfill")] == [entry_id]
+    assert [entry.id for entry in vault.search(query="hidden")] == [entry_id]
+    with db.session() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM search_tokens").fetchone()[0] > 0
+
+    db.close()
+
+
+def test_key_rotation_reencrypts_in_chunks_and_resumes(tmp_path: Path):
+    db, auth, vault = make_runtime(tmp_path)
+
+    ids = [vault.add(title=f"rotate-{index}", username="nak", password=f"StrongPassA1!{index}") for index in range(7)]
+    assert vault.begin_key_rotation("UltraSafeA1!Key") == 2
+    assert vault.pending_reencryption()["total"] == 7
+
+    progress: list[tuple[int, int]] = []
+    calls = {"n": 0}
+
+    def stop_after_first_chunk() -> bool:
+        calls["n"] += 1
+        return calls["n"] > 1
+
+    assert vault.reencrypt_all_entries(lambda d, t: progress.append((d, t)), 3, stop_after_first_chunk) is False
+    assert progress == [(0, 7), (3, 7)]
+    with db.session() as conn:
+        generations = [row[0] for row in conn.execute("SELECT key_generation FROM vault_entries ORDER BY id")]
+    assert generations == [2, 2, 2, 1, 1, 1, 1]
+    assert vault.get_password(ids[5]) == "StrongPassA1!5"
+    assert [entry.id for entry in vault.search(query="rotate-6")] == [ids[6]]
+
+    auth.logout(emit_event=False)
+    assert auth.authenticate("UltraSafeA1!Key", username="nak").success is True
+    progress.clear()
+    assert vault.reencrypt_all_entries(lambda d, t: progress.append((d, t)), 3) is True
+    assert progress == [(3, 7), (6, 7), (7, 7)]
+    assert vault.pending_reencryption() is None
+    with db.session() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM vault_entries WHERE key_generation != 2").fetchone()[0] == 0
+    assert [vault.get_password(entry_id) for entry_id in ids] == [f"StrongPassA1!{index}" for index in range(7)]
+    db.close()
+
+
+def test_key_rotation_covers_trash_prunes_retired_keys_and_resumes_after_login(tmp_path: Path):
+    db, auth, vault = make_runtime(tmp_path)
+    manager = vault.entry_manager
+
+    ids = [vault.add(title=f"turn-{index}", username="nak", password=f"StrongPassA1!{index}") for index in range(5)]
+    vault.delete(ids[4])
+    vault.begin_key_rotation("UltraSafeA1!Key")
+    assert vault.pending_reencryption()["total"] == 5
+
+    # Пока задание не завершено, поиск идет полным проходом и не пересобирает индекс.
+    with db.session() as conn:
+        tokens_before = conn.execute("SELECT COUNT(*) FROM search_tokens").fetchone()[0]
+    assert [entry.id for entry in vault.search(query="turn-3")] == [ids[3]]
+    with db.session() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM search_tokens").fetchone()[0] == tokens_before
+
+    stops = {"n": 0}
+
+    def stop_after_two_chunks() -> bool:
+        stops["n"] += 1
+        return stops["n"] > 2
+
+    assert vault.reencrypt_all_entries(chunk_size=2, should_stop=stop_after_two_chunks) is False
+    # Возврат из корзины посреди задания: строка прежнего поколения не пропускается.
+    vault.restore(ids[4])
+    vault.delete(ids[0])
+
+    auth.logout(emit_event=False)
+    assert auth.authenticate("UltraSafeA1!Key", username="nak").success is True
+    resumer = ReencryptionResumer(vault, chunk_size=2)
+    resumer.start()
+    resumer.thread.join(10)
+    assert vault.pending_reencryption() is None
+
+    with db.session() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM vault_entries WHERE key_generation != 2").fetchone()[0] == 0
+        assert conn.execute("SELECT COUNT(*) FROM deleted_entries WHERE key_generation != 2").fetchone()[0] == 0
+        retired = conn.execute(
+            "SELECT COUNT(*) FROM key_store WHERE key_type = ?",
+            (manager.key_manager.retired_data_key_type,),
+        ).fetchone()[0]
+    assert retired == 0
+    assert [entry.id for entry in vault.search(query="turn-4")] == [ids[4]]
+    vault.restore(ids[0])
+    assert [vault.get_password(entry_id) for entry_id in ids] == [f"StrongPassA1!{index}" for index in range(5)]
+
+    key = manager.key_manager.get_active_key()
+    vault.reencrypt_entries_with_keys(key, key)
+    with db.session() as conn:
+        manager.reencrypt_entries_with_keys(key, key, conn=conn)
+    assert vault.get_password(ids[2]) == "StrongPassA1!2"
+    db.close()
+
+
+def test_fuzzy_index_matches_full_scan_and_follows_entry_lifecycle(tmp_path: Path):
+    db, auth, vault = make_runtime(tmp_path)
+    manager = vault.entry_manager
+
+    words = ["github", "gitlab", "gmail", "dropbox", "bitbucket", "keepass", "password", "netflix"]
+    for index, word in enumerate(words):
+        vault.add(title=f"{word} account", username=f"user{index}", password=f"StrongPassA1!{index}", notes=f"{word}-notes")
+
+    entries = manager.get_all_entries(include_sensitive=False, include_notes=True)
+    for query in ["githb", "gtihub", "dropbx", "bitbukket", "pasword", "netflx", "zzzzz", "gma", "accont"]:
+        texts = {entry["id"]: manager.searchable_text(entry) for entry in entries}
+        expected = sorted(
+            entry_id for entry_id, text in texts.items() if query not in text and manager.fuzzy_contains(text, query)
+        )
+        assert [entry_id for entry_id in manager.fuzzy_candidate_ids(query) if query not in texts[entry_id]] == expected
+
+    entry_id = vault.search(query="dropbox")[0].id
+    vault.update(entry_id, title="Onedrive", username="user", password="StrongPassA1!Drive")
+    assert vault.search(query="dropbx") == []
+    assert [entry.id for entry in vault.search(query="onedrve")] == [entry_id]
+
+    vault.delete(entry_id)
+    assert vault.search(query="onedrve") == []
+
+    auth.logout(emit_event=False)
+    assert manager.fuzzy_index.ready is False
+    assert manager.fuzzy_index.token_entries == {}
+    db.close()
+
+
+def test_ranked_search_orders_by_relevance_and_pages(tmp_path: Path):
+    db, auth, vault = make_runtime(tmp_path)
+    del auth
+
+    notes_id = vault.add(title="Misc", username="someone", password="StrongPassA1!N", notes="old bank login")
+    user_id = vault.add(title="Other", username="bank-admin", password="StrongPassA1!U")
+    prefix_id = vault.add(title="Bank of Nowhere", username="nak", password="StrongPassA1!P")
+    exact_id = vault.add(title="Bank", username="nak", password="StrongPassA1!E", category="Work")
+    word_id = vault.add(title="My bankroll", username="nak", password="StrongPassA1!W")
+
+    ranked = [entry.id for entry in vault.search(query="bank", ranked=True)]
+    assert ranked == [exact_id, prefix_id, word_id, user_id, notes_id]
+    assert [entry.id for entry in vault.search(query="bank", ranked=True, limit=2)] == ranked[:2]
+    assert [entry.id for entry in vault.search(query="bank", ranked=True, limit=2, offset=2)] == ranked[2:4]
+    assert vault.search(query="bank", ranked=True, limit=0) == []
+
+    recent = [entry.id for entry in vault.search(query="bank")]
+    assert recent[:2] == [entry.id for entry in vault.search(query="bank", limit=2)]
+    assert [entry.id for entry in vault.search(query="bank", category="Work", limit=5)] == [exact_id]
+    db.close()
+
+
+def test_list_page_walks_vault_with_keyset_cursor(tmp_path: Path):
+    db, auth, vault = make_runtime(tmp_path)
+    del auth
+
+    for index in range(23):
+        vault.add(title=f"title-{index}", username="nak", password=f"StrongPassA1!{index}")
+    with db.session() as conn:
+        conn.execute("UPDATE vault_entries SET updated_at = '2020-01-01T00:00:00+00:00' WHERE id % 3 = 0")
+
+    expected = [entry.id for entry in vault.list()]
+    pages: list[list[int]] = []
+    after = None
+    while True:
+        page, after = vault.list_page(5, after=after)
+        pages.append([entry.id for entry in page])
+        if after is None:
+            break
+    assert [len(page) for page in pages] == [5, 5, 5, 5, 3]
+    assert [entry_id for page in pages for entry_id in page] == expected
+    assert all(entry.password == "" for entry in vault.list_page(5)[0])
+    assert vault.list_page(1, include_passwords=True)[0][0].password.startswith("StrongPassA1!")
+
+    recent, recent_cursor = vault.list_page(50, date_from="2021-01-01T00:00:00+00:00")
+    assert len(recent) == vault.count(date_from="2021-01-01T00:00:00+00:00") == 23 - 7
+    assert recent_cursor is None
+
+    # Страница, где ни одна строка не расшифровалась, пуста, но курсор идет дальше.
+    with db.session() as conn:
+        conn.execute(
+            "UPDATE vault_entries SET encrypted_data = x'00' WHERE id IN (SELECT id FROM vault_entries WHERE id % 3 != 0 ORDER BY id DESC LIMIT 5)"
+        )
+    vault.entry_manager.clear_metadata_cache()
+    broken_page, broken_cursor = vault.list_page(5)
+    assert broken_page == []
+    assert broken_cursor is not None
+    assert len(vault.list_page(50, after=broken_cursor)[0]) == 23 - 5
+    assert vault.count() == 23
+    db.close()
+
+
+def test_health_report_flags_weak_reused_old_and_duplicate_entries(tmp_path: Path):
+    from datetime import datetime, timedelta, timezone
+
+    from core.vault.health import VaultHealthAnalyzer
+
+    db, auth, vault = make_runtime(tmp_path)
+    del auth
+
+    healthy_id = vault.add(title="Healthy", username="nak", password="UniqueStrongPassA1!", url="https://a.com")
+    weak_id = vault.add(title="Weak", username="nak", password="short", url="https://b.com")
+    reused_a = vault.add(title="Reused A", username="one", password="SharedStrongPassA1!", url="https://c.com")
+    reused_b = vault.add(title="Reused B", username="two", password="SharedStrongPassA1!", url="https://d.com")
+    duplicate_id = vault.add(title="A again", username="NAK", password="OtherStrongPassA1!", url="https://a.com/login")
+
+    vault.update(reused_b, title="Reused B", username="two", password="SharedStrongPassA1!", url="https://d.com")
+    entry = vault.entry_manager.get_entry(reused_b)
+    assert entry["password_changed_at"] == entry["created_at"]
+
+    report = vault.health_report()
+    assert report.total_entries == 5
+    assert report.weak_count == 1
+    assert report.reused_groups == ((reused_a, reused_b),)
+    assert report.duplicate_groups == ((healthy_id, duplicate_id),)
+    issues = {finding.entry_id: finding.issues for finding in report.findings}
+    assert issues == {
+        healthy_id: ("duplicate",),
+        weak_id: ("weak",),
+        reused_a: ("reused",),
+        reused_b: ("reused",),
+        duplicate_id: ("duplicate",),
+    }
+
+    later = datetime.now(timezone.utc) + timedelta(days=400)
+    aged = VaultHealthAnalyzer(vault.entry_manager, chunk_size=2).analyze(now=later)
+    assert aged.old_count == 5
+    assert all(finding.password_age_days >= 399 for finding in aged.findings)
+    db.close()
+
+
+def test_bulk_decrypt_preserves_order_and_reports_failures():
+    from core.vault.encryption_service import VaultEncryptionService
+
+    service = VaultEncryptionService(max_workers=4, bulk_chunk_size=7)
+    key = b"K" * 32
+    values = [service.encrypt_payload({"n": index}, key) for index in range(50)]
+    values[13] = service.encrypt_payload({"n": 13}, b"X" * 32)
+    values[31] = "not-base64!"
+
+    results = service.decrypt_many(values, key)
+    service.shutdown()
+
+    assert [result.index for result in results] == list(range(50))
+    assert [index for index, result in enumerate(results) if not result.ok] == [13, 31]
+    assert results[13].error
+    assert all(result.payload == {"n": index} for index, result in enumerate(results) if result.ok)
+
+    encrypted = service.encrypt_many([{"n": index} for index in range(20)], key, max_workers=2)
+    assert [service.decrypt_payload(value, key)["n"] for value in encrypted] == list(range(20))
+
+
+def test_compact_payload_codec_roundtrip_and_json_fallback():
+    import os
+    import struct
+
+    from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+    from core.vault.encryption_service import VaultEncryptionService
+
+    service = VaultEncryptionService(max_workers=1)
+    key = b"K" * 32
+    payload = {
+        "title": "Почта",
+        "username": "nak",
+        "version": 3,
+        "sharing_metadata": {"shared_with": ["a", "b"]},
+        "custom_field": [1, None, True],
+    }
+    plaintext = service.serialize_payload(payload)
+    assert plaintext[0] == service.codec.format_version
+    assert len(plaintext) < len(service.serialize_json_payload(payload))
+    assert service.deserialize_payload(plaintext) == payload
+    assert service.decrypt_payload(service.encrypt_payload(payload, key), key) == payload
+
+    nonce = os.urandom(service.nonce_size)
+    legacy = nonce + AESGCM(key).encrypt(nonce, service.serialize_json_payload(payload), None)
+    assert service.decrypt_payload(legacy, key) == payload
+
+    # Строки формата v1 (длины uint32 и общий текст) по-прежнему читаются.
+    values = ["Почта", "3"]
+    v1 = bytes((1, 2, 0, 5, 0, 1)) + struct.pack("<2I", *map(len, values)) + "".join(values).encode("utf-8")
+    assert service.deserialize_payload(v1) == {"title": "Почта", "version": 3}
+
+    # Ни одного поля и одно пустое значение дают одинаково пустое тело.
+    for edge in ({}, {"title": ""}):
+        assert service.deserialize_payload(service.serialize_payload(edge)) == edge
+        assert service.decrypt_payload(service.encrypt_payload(edge, key), key) == edge
+    with pytest.raises(ValueError):
+        service.codec.decode(service.codec.encode({}) + b"x")
+
+    with pytest.raises(ValueError):
+        service.deserialize_payload(plaintext[:-1] + b"\xff")
+    with pytest.raises(ValueError):
+        service.deserialize_payload(plaintext[:4])
+
+
+def test_import_streams_csv_and_jsonl_and_reports_rejected_rows(tmp_path: Path):
+    db, auth, vault = make_runtime(tmp_path)
+    del auth
+
+    csv_path = tmp_path / "export.csv"
+    csv_path.write_text(
+        "\ufeffname,login,password,website,folder,extra\n"
+        "GitHub,nak,StrongPassA1!g,https://github.com,Work,dev account\n"
+        "No password,nak,,https://x.com,,\n"
+        "Mail,nak,StrongPassA1!m,https://mail.com,,\n"
+        "Broken,nak,StrongPassA1!b,https://b.com,,,extra\n",
+        encoding="utf-8",
+    )
+    progress: list[tuple[int, int]] = []
+    report = vault.import_file(csv_path, chunk_size=1, progress_callback=lambda done, bad: progress.append((done, bad)))
+    assert (report.imported, report.rejected_count) == (2, 2)
+    assert [row.line for row in report.rejected] == [3, 5]
+    assert report.rejected[0].reason == "Поле password обязательно."
+    assert progress[-1] == (2, 2)
+
+    github = vault.search(query="GitHub")[0]
+    payload = vault.get_by_id(github.id)
+    assert payload["category"] == "Work"
+    assert payload["notes"] == "dev account"
+    assert payload["password"] == "StrongPassA1!g"
+
+    jsonl_path = tmp_path / "export.jsonl"
+    jsonl_path.write_text(
+        '{"title": "Bank", "password": "StrongPassA1!k", "tags": ["finance", "Finance", "main"]}\n'
+        "\n"
+        "not json\n"
+        '["array"]\n',
+        encoding="utf-8",
+    )
+    report = vault.import_file(jsonl_path)
+    assert (report.imported, report.rejected_count) == (1, 2)
+    assert [row.line for row in report.rejected] == [3, 4]
+    assert vault.search(query="Bank")[0].tags == "finance,main"
+    assert vault.count() == 3
+    db.close()
+
+
+def test_importer_runs_headless(tmp_path: Path, monkeypatch, capsys):
+    from core.vault.importer import main
+
+    db, auth, vault = make_runtime(tmp_path)
+    del auth, vault
+    db.close()
+    source = tmp_path / "export.jsonl"
+    source.write_text('{"title": "CLI", "password": "StrongPassA1!c"}\n', encoding="utf-8")
+    monkeypatch.setenv("CRYPTOSAFE_MASTER_PASSWORD", "UltraSafeA1!Key")
+
+    assert main([str(source), "--db", str(tmp_path / "vault.db")]) == 0
+    assert "Импортировано 1, отклонено 0." in capsys.readouterr().out
+
+    db = Database(tmp_path / "vault.db")
+    db.connect()
+    key_manager = KeyManager(db)
+    auth = AuthenticationService(key_manager=key_manager, state=StateManager())
+    assert auth.authenticate("UltraSafeA1!Key").success
+    vault = VaultRepository(db=db, crypto=AES256Placeholder(key_manager))
+    assert [entry.title for entry in vault.list()] == ["CLI"]
+    db.close()
+
+
+def test_export_archive_roundtrips_and_detects_tampering(tmp_path: Path):
+    from core.vault.exporter import VaultArchiveReader, VaultExporter
+
+    db, auth, vault = make_runtime(tmp_path)
+    del auth
+
+    vault.add_many(
+        [
+            {"title": f"title-{index}", "username": "nak", "password": f"StrongPassA1!{index}", "notes": f"n{index}"}
+            for index in range(23)
+        ]
+    )
+    archive_path = tmp_path / "escrow.csvx"
+    progress: list[int] = []
+    exporter = VaultExporter(vault.entry_manager, chunk_entries=5, max_workers=3)
+    report = exporter.export_to(archive_path, "escrow passphrase", progress_callback=progress.append)
+    assert (report.entries, report.chunks) == (23, 5)
+    assert report.bytes_written == archive_path.stat().st_size
+    assert progress == [5, 10, 15, 20, 23]
+    raw = archive_path.read_bytes()
+    assert b"StrongPassA1!" not in raw and b"title-" not in raw
+
+    verification = vault.verify_archive(archive_path, "escrow passphrase")
+    assert (verification.ok, verification.entries, verification.chunks) == (True, 23, 5)
+    entries = list(VaultArchiveReader().iter_entries(archive_path, "escrow passphrase"))
+    assert [entry["id"] for entry in entries] == [entry.id for entry in vault.list()]
+    assert {entry["password"] for entry in entries} == {f"StrongPassA1!{index}" for index in range(23)}
+    assert entries[0]["notes"].startswith("n")
+
+    assert not vault.verify_archive(archive_path, "wrong passphrase").ok
+    tampered = tmp_path / "tampered.csvx"
+    tampered.write_bytes(raw[:-40] + bytes([raw[-40] ^ 1]) + raw[-39:])
+    assert not vault.verify_archive(tampered, "escrow passphrase").ok
+    truncated = tmp_path / "truncated.csvx"
+    final_frame_size = 4 + len(b'{"entries": 23, "chunks": 5}') + 16
+    truncated.write_bytes(raw[:-final_frame_size])
+    result = vault.verify_archive(truncated, "escrow passphrase")
+    assert not result.ok and "финального кадра" in result.error
+
+    # Нерасшифровываемая запись или блокировка посреди экспорта - ошибка, а не архив без записей.
+    broken_id = entries[7]["id"]
+    with db.session() as conn:
+        conn.execute("UPDATE vault_entries SET encrypted_secret = ? WHERE id = ?", (b"\x00" * 40, broken_id))
+    failed_path = tmp_path / "failed.csvx"
+    with pytest.raises(ValueError, match=f"Запись {broken_id} не расшифровывается"):
+        exporter.export_to(failed_path, "escrow passphrase")
+    assert not failed_path.exists() and not failed_path.with_name("failed.csvx.part").exists()
+    with db.session() as conn:
+        conn.execute("DELETE FROM vault_entries WHERE id = ?", (broken_id,))
+
+    def lock_after_first_chunk(done: int) -> None:
+        vault.entry_manager.key_manager.clear_cached_key("logout")
+
+    with pytest.raises(RuntimeError, match="заблокировано"):
+        VaultExporter(vault.entry_manager, chunk_entries=2, max_workers=1).export_to(
+            failed_path, "escrow passphrase", progress_callback=lock_after_first_chunk
+        )
+    assert not failed_path.exists() and not failed_path.with_name("failed.csvx.part").exists()
+    db.close()
+
+
+
+def test_export_uses_single_pool_connection_during_rotation(tmp_path: Path):
+    from core.vault.exporter import VaultArchiveReader, VaultExporter
+
+    # Экспорт читает строки и ключи прежних поколений в своей транзакции: пула
+    # из одного соединения хватает, второго соединения он не ждет.
+    db = Database(tmp_path / "vault.db", pool_size=1, acquire_timeout_sec=0.5)
+    db.connect()
+    key_manager = KeyManager(db)
+    auth = AuthenticationService(key_manager=key_manager, state=StateManager())
+    auth.setup_master_password("UltraSafeA1!Key", username="nak")
+    vault = VaultRepository(db=db, crypto=AES256Placeholder(key_manager))
+    vault.add_many([{"title": f"title-{index}", "password": f"StrongPassA1!{index}"} for index in range(7)])
+    vault.begin_key_rotation("UltraSafeA1!Key")
+    checks: list[bool] = []
+
+    def stop_after_first_chunk() -> bool:
+        checks.append(True)
+        return len(checks) > 1
+
+    vault.reencrypt_all_entries(chunk_size=3, should_stop=stop_after_first_chunk)
+
+    archive_path = tmp_path / "escrow.csvx"
+    report = VaultExporter(vault.entry_manager, chunk_entries=2, max_workers=1).export_to(
+        archive_path, "escrow passphrase"
+    )
+    assert report.entries == 7
+    entries = list(VaultArchiveReader().iter_entries(archive_path, "escrow passphrase"))
+    assert {entry["password"] for entry in entries} == {f"StrongPassA1!{index}" for index in range(7)}
+    with db.read_session() as conn:
+        generations = {row[0] for row in conn.execute("SELECT key_generation FROM vault_entries")}
+    assert len(generations) == 2
+    db.close()
+
+
+def test_incremental_backup_chain_replays_changes_deletes_and_rotation(tmp_path: Path):
+    from database.backup_chain import BackupChain
+    from database.repositories import AuditRepository
+
+    db, auth, vault = make_runtime(tmp_path)
+    del auth
+    tables = ("vault_entries", "search_tokens", "deleted_entries", "audit_log", "settings", "key_store")
+
+    def dump() -> dict[str, list[tuple]]:
+        with db.session() as conn:
+            return {table: sorted(tuple(row) for row in conn.execute(f"SELECT * FROM {table}")) for table in tables}
+
+    ids = vault.add_many([{"title": f"base-{index}", "password": f"StrongPassA1!{index}"} for index in range(40)])
+    with db.session() as conn:
+        conn.execute("UPDATE vault_entries SET updated_at = '2024-01-01T00:00:00+00:00'")
+    chain = BackupChain(db, tmp_path / "chain")
+    chain.watermark_overlap_sec = 0
+    base = chain.create_base()
+    assert (base.kind, base.changed_entries) == ("full", 40)
+
+    new_ids = vault.add_many([{"title": f"new-{index}", "password": "StrongPassA1!new"} for index in range(3)])
+    vault.update(ids[0], title="renamed", username="", password="StrongPassA1!0", url="", notes="", tags="")
+    vault.delete(ids[1])
+    vault.delete(new_ids[0])
+    AuditRepository(db).write("Backup", {"step": 1})
+    first = chain.create_increment()
+    assert (first.changed_entries, first.removed_entries) == (3, 1)
+
+    vault.begin_key_rotation("UltraSafeA1!Key")
+    assert vault.reencrypt_all_entries(lambda done, total: None, 10) is True
+    second = chain.create_increment()
+    assert second.changed_entries == 41
+    expected = dump()
+
+    vault.add(title="after-chain", username="nak", password="StrongPassA1!late")
+    vault.delete(ids[2])
+    chain.restore()
+    assert dump() == expected
+    assert [step.kind for step in chain.steps()] == ["full", "incr", "incr"]
+
+    chain.restore(upto=1)
+    with db.session() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM vault_entries").fetchone()[0] == 41
+        assert conn.execute("SELECT title FROM vault_entries WHERE id = ?", (ids[0],)).fetchone() is not None
+        assert conn.execute("SELECT COUNT(*) FROM vault_entries WHERE id = ?", (ids[1],)).fetchone()[0] == 0
+
+    # Удаление мимо корзины попадает в инкремент разностью множеств id.
+    chain.restore()
+    with db.session() as conn:
+        conn.execute("DELETE FROM vault_entries WHERE id = ?", (ids[3],))
+    third = chain.create_increment()
+    assert third.removed_entries == 1
+    expected = dump()
+    with db.session() as conn:
+        conn.execute("DELETE FROM vault_entries WHERE id = ?", (ids[5],))
+    chain.restore()
+    assert dump() == expected
+
+    # Испорченный шаг цепочки обнаруживается при создании следующего инкремента, а не при восстановлении.
+    with sqlite3.connect(tmp_path / "chain" / third.file) as broken:
+        broken.execute("DELETE FROM entry_ids WHERE id = ?", (ids[4],))
+    broken.close()
+    with pytest.raises(ValueError, match="не согласована"):
+        chain.create_increment()
+    assert len(chain.steps()) == 4
+    db.close()
+
+
+def test_restore_drops_entry_caches_and_session_key(tmp_path: Path):
+    db, auth, vault = make_runtime(tmp_path)
+    manager = vault.entry_manager
+
+    kept_id = vault.add(title="kept-entry", username="nak", password="StrongPassA1!kept")
+    backup_path = db.backup(tmp_path / "vault.bak")
+    vault.add(title="later-entry", username="nak", password="StrongPassA1!late")
+    assert [entry.title for entry in vault.search(query="entry")] == ["later-entry", "kept-entry"]
+    assert vault.search(query="latr-entry")
+    assert manager.search_index_ready and manager.metadata_cache
+
+    db.restore(backup_path)
+    assert not manager.key_manager.has_cached_key()
+    assert not manager.search_index_ready
+    assert manager.metadata_cache == {}
+    assert not manager.fuzzy_index.ready
+
+    assert auth.authenticate("UltraSafeA1!Key", username="nak").success is True
+    assert [entry.id for entry in vault.search(query="entry")] == [kept_id]
+    assert vault.search(query="latr-entry") == []
+    db.close()
+
+
+def test_trash_restores_in_bulk_pages_by_deleted_at_and_purges_expired(tmp_path: Path, monkeypatch):
+    from core.vault.trash import TrashPurgeScheduler
+
+    db, auth, vault = make_runtime(tmp_path)
+    del auth
+
+    ids = vault.add_many([{"title": f"trash-{index}", "password": f"StrongPassA1!{index}"} for index in range(9)])
+    for entry_id in ids[:7]:
+        vault.delete(entry_id)
+    with db.session() as conn:
+        for offset, entry_id in enumerate(ids[:7]):
+            conn.execute(
+                "UPDATE deleted_entries SET deleted_at = ? WHERE source_entry_id = ?",
+                (f"2026-01-0{offset + 1}T00:00:00+00:00", entry_id),
+            )
+    assert vault.count_deleted() == 7
+
+    first = vault.list_deleted(3)
+    second = vault.list_deleted(3, after=(first[-1]["deleted_at"], first[-1]["trash_id"]))
+    third = vault.list_deleted(3, after=(second[-1]["deleted_at"], second[-1]["trash_id"]))
+    assert [item["id"] for item in first + second + third] == list(reversed(ids[:7]))
+    assert first[0]["title"] == "trash-6" and "password" not in first[0]
+
+    assert vault.restore_many([ids[0], ids[1]]) == [ids[0], ids[1]]
+    vault.restore(ids[2])
+    assert vault.get_password(ids[1]) == "StrongPassA1!1"
+    assert [entry.id for entry in vault.search(query="trash-2")] == [ids[2]]
+    assert vault.count_deleted() == 4
+    with pytest.raises(ValueError):
+        vault.restore_many([ids[3], ids[8]])
+    assert vault.count_deleted() == 4 and vault.get_by_id(ids[3]) is None
+
+    with db.session() as conn:
+        conn.execute(
+            "UPDATE deleted_entries SET expires_at = '2020-01-01T00:00:00+00:00' WHERE source_entry_id != ?",
+            (ids[6],),
+        )
+    purger = TrashPurgeScheduler(vault.entry_manager, batch_size=2, pause_sec=0)
+    assert purger.run_once() == 3
+    assert [item["id"] for item in vault.list_deleted(10)] == [ids[6]]
+    purger.start()
+    purger.stop()
+    assert purger.thread is None
+
+    # Занятый писатель (TimeoutError) не убивает поток очистки: следующий проход по расписанию.
+    calls: list[int] = []
+
+    def busy_then_idle(limit, now=None):
+        calls.append(limit)
+        if len(calls) == 1:
+            raise TimeoutError("writer busy")
+        return 0
+
+    monkeypatch.setattr(vault.entry_manager, "purge_expired_batch", busy_then_idle)
+    purger = TrashPurgeScheduler(vault.entry_manager, interval_sec=1, pause_sec=0)
+    purger.start()
+    deadline = time.monotonic() + 5
+    while len(calls) < 2 and time.monotonic() < deadline:
+        time.sleep(0.02)
+    assert len(calls) >= 2 and purger.thread.is_alive()
+    purger.stop()
+    db.close()
+
+
+def test_async_vault_runs_off_loop_and_cancels_between_chunks(tmp_path: Path):
+    import asyncio
+    import threading
+
+    from core.vault.async_vault import AsyncVault
+
+    db, auth, vault = make_runtime(tmp_path)
+    del auth
+    source = tmp_path / "bulk.jsonl"
+    source.write_text(
+        "".join(f'{{"title": "bulk-{index}", "password": "StrongPassA1!{index}"}}\n' for index in range(300)),
+        encoding="utf-8",
+    )
+
+    async def scenario() -> None:
+        loop_thread = threading.get_ident()
+        seen_threads: set[int] = set()
+        async with AsyncVault(vault, crypto_workers=2) as facade:
+            ids = await facade.add_many([{"title": f"async-{index}", "password": "StrongPassA1!x"} for index in range(25)])
+            first = await facade.add("single", "nak", "StrongPassA1!single")
+            entries = await asyncio.gather(*(facade.get_by_id(entry_id) for entry_id in ids))
+            assert [entry["title"] for entry in entries] == [f"async-{index}" for index in range(25)]
+            assert await facade.get_password(first) == "StrongPassA1!single"
+            assert [entry.id for entry in await facade.search("async-7")] == [ids[7]]
+            walked = [entry.id async for entry in facade.iter_entries(batch_size=10)]
+            assert sorted(walked) == sorted([*ids, first]) and len(walked) == 26
+            assert (await facade.health_report()).total_entries == 26
+
+            progress: list[tuple[int, int]] = []
+
+            def on_progress(imported: int, rejected: int) -> None:
+                seen_threads.add(threading.get_ident())
+                progress.append((imported, rejected))
+                task.cancel()
+
+            task = asyncio.create_task(facade.import_file(source, chunk_size=20, progress_callback=on_progress))
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+            assert task.cancelled()
+            assert progress[0] == (20, 0) and seen_threads == {loop_thread}
+            # Отмена дождалась потока: дальше первых порций импорт не ушел и сессии свободны.
+            assert 20 <= await facade.count() - 26 < 300
+            assert db.writer_stats().in_use == 0 and db.pool_stats().in_use == 0
+
+    asyncio.run(scenario())
+    db.close()